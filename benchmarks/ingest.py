@@ -0,0 +1,80 @@
+"""Throughput of the report ingestion fed by an in-process fake broker.
+
+Creates temporary boards and pins in the configured database (the broker
+is not involved, boards are inserted without provisioning):
+
+    python -m benchmarks.ingest --boards 50 --pins 20 --messages 20000
+"""
+import json
+import random
+import argparse
+from .utils import measure, setup_django
+
+
+class FakeBroker:
+    """Delivers pre-built messages straight to a subscriber callback."""
+
+    def __init__(self, messages: list[tuple[str, bytes]]) -> None:
+        self.messages = messages
+
+    def deliver(self, on_message) -> None:
+        for topic, payload in self.messages:
+            on_message(topic, payload)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--boards', type=int, default=50)
+    parser.add_argument('--pins', type=int, default=20)
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from microcontrollers.ingest import Ingestor
+    from microcontrollers.models import Board, Pin
+    from microcontrollers.verification import issue_session_token
+
+    boards = Board.objects.bulk_create(
+        Board(
+            name=f'bench-{i}',
+            secret=f'secret-{i}',
+            status=Board.Status.ACTIVATED,
+        )
+        for i in range(args.boards)
+    )
+    Pin.objects.bulk_create(
+        Pin(board=board, name=f'pin-{n}', number=n, value='OFF')
+        for board in boards
+        for n in range(args.pins)
+    )
+
+    try:
+        tokens = {board.pk: issue_session_token(board) for board in boards}
+        messages = []
+        for _ in range(args.messages):
+            board = random.choice(boards)
+            messages.append((
+                f'boards/{board.pk}/reports',
+                json.dumps({
+                    'token': tokens[board.pk],
+                    'pins': [{
+                        'number': random.randrange(args.pins),
+                        'value': random.choice(['ON', 'OFF']),
+                    }],
+                }).encode(),
+            ))
+
+        ingestor = Ingestor(batch_size=args.batch_size, interval=3600)
+        with measure('Ingestor', args.messages, 'msg'):
+            FakeBroker(messages).deliver(ingestor.handle)
+            ingestor.flush()
+
+        print(ingestor.stats())
+    finally:
+        Board.objects.filter(pk__in=[board.pk for board in boards]).delete()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Latency of the broker management calls against a local stand-in server.
+
+Compares the former module-level ``requests.put`` calls with the pooled
+session used by ``Manager``:
+
+    python -m benchmarks.management_api --requests 500
+"""
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from statistics import mean, quantiles
+from .utils import setup_django
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_PUT(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    request_queue_size = 128
+
+
+def report(name: str, latencies: list[float]) -> None:
+    latencies = [latency * 1000 for latency in latencies]
+    percentiles = quantiles(latencies, n=100)
+    print(f'{name:<24} mean {mean(latencies):7.3f}ms '
+          f'p50 {percentiles[49]:7.3f}ms p99 {percentiles[98]:7.3f}ms')
+
+
+def timed(func, times: int) -> list[float]:
+    latencies = []
+    for _ in range(times):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+
+    import requests
+    from cloudroom.mqtt import Manager
+
+    server = StandInServer(('127.0.0.1', 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = 'http://{}:{}/api'.format(*server.server_address)
+
+    manager = Manager()
+    manager._url = url
+
+    def module_level_put():
+        requests.put(
+            f'{url}/users/benchmark',
+            json={'password': 'benchmark', 'tags': ''},
+            auth=manager._authorization,
+        )
+
+    def session_put():
+        manager.create_user(username='benchmark', password='benchmark')
+
+    report('requests.put', timed(module_level_put, args.requests))
+    report('Manager (session)', timed(session_put, args.requests))
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Messages per second of the persistent publisher versus ``single()``.
+
+Needs the broker configured in the environment, e.g.:
+
+    python -m benchmarks.mqtt_publish --messages 1000 --qos 1
+"""
+import json
+import argparse
+from .utils import measure, setup_django
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--qos', type=int, default=1, choices=[0, 1, 2])
+    parser.add_argument('--topic', default='benchmarks/publish')
+    args = parser.parse_args()
+
+    setup_django()
+
+    import paho.mqtt.publish as paho
+    from django.conf import settings
+    from cloudroom.mqtt.publisher import get_publisher
+
+    payload = json.dumps({'number': 13, 'value': 'OFF', 'is_digital': True})
+    auth = {
+        'username': settings.MQTT_BROKER_USERNAME,
+        'password': settings.MQTT_BROKER_PASSWORD,
+    }
+
+    with measure('paho.publish.single', args.messages, 'msg'):
+        for _ in range(args.messages):
+            paho.single(
+                topic=args.topic,
+                payload=payload,
+                qos=args.qos,
+                retain=True,
+                hostname=settings.MQTT_BROKER_HOST,
+                port=int(settings.MQTT_BROKER_PORT),
+                auth=auth,
+            )
+
+    publisher = get_publisher()
+    publisher.publish(topic=args.topic, payload=payload, qos=args.qos)
+
+    with measure('Publisher.publish', args.messages, 'msg'):
+        for _ in range(args.messages):
+            publisher.publish(topic=args.topic, payload=payload, qos=args.qos)
+
+    publisher.close()
+
+
+if __name__ == '__main__':
+    main()
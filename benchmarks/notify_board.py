@@ -0,0 +1,63 @@
+"""Notification tasks per second, reading the pin from the database or not.
+
+Runs the task bodies in-process against the configured database, cache and
+MQTT broker. Creates a temporary board without provisioning it:
+
+    python -m benchmarks.notify_board --pins 2000
+"""
+import time
+import argparse
+from .utils import measure, setup_django
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pins', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from microcontrollers.models import Board, Pin
+    from microcontrollers.tasks import notify_board, publish_pin_state
+    from microcontrollers.utils import build_topic
+
+    board = Board.objects.bulk_create([
+        Board(name='bench-notify', secret='secret'),
+    ])[0]
+    Pin.objects.bulk_create(
+        Pin(board=board, name=f'pin-{n}', number=n, value='OFF')
+        for n in range(args.pins)
+    )
+    topic = build_topic(board_id=board.pk)
+
+    def toggle() -> list[Pin]:
+        # Every run publishes new states, none is dropped by the digests
+        pins = list(Pin.objects.filter(board=board))
+        for pin in pins:
+            pin.value = 'ON' if pin.value == 'OFF' else 'OFF'
+            pin.version += 1
+        Pin.objects.bulk_update(pins, ['value', 'version'])
+        return pins
+
+    try:
+        pins = toggle()
+        with measure('notify_board (DB read)', len(pins), 'tasks'):
+            for pin in pins:
+                notify_board(topic=topic, pin_id=pin.pk)
+
+        pins = toggle()
+        states = [pin.state for pin in pins]
+        changed = time.time()
+        with measure('publish_pin_state (inline)', len(states), 'tasks'):
+            for state in states:
+                publish_pin_state(
+                    board_id=board.pk,
+                    state=state,
+                    changed=changed,
+                )
+    finally:
+        Board.objects.filter(pk=board.pk).delete()
+
+
+if __name__ == '__main__':
+    main()
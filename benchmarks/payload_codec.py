@@ -0,0 +1,52 @@
+"""Encode speed and message size of the board payload codecs.
+
+    python -m benchmarks.payload_codec --pins 30 --iterations 20000
+"""
+import argparse
+import random
+from cloudroom.mqtt.codecs import CODECS
+from .utils import measure
+
+
+def build_payload(pins: int) -> dict:
+    return {
+        'pins': [
+            {
+                'number': number,
+                'value': (
+                    random.choice(['ON', 'OFF'])
+                    if number % 3 else str(random.randint(0, 1023))
+                ),
+                'is_digital': bool(number % 3),
+            }
+            for number in range(pins)
+        ]
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pins', type=int, default=30)
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    single = build_payload(1)['pins'][0]
+    many = build_payload(args.pins)
+
+    for name, codec in CODECS.items():
+        print(f'{name}: {len(codec.encode(single))} bytes for one pin, '
+              f'{len(codec.encode(many))} bytes for {args.pins} pins')
+
+    for name, codec in CODECS.items():
+        with measure(f'{name}.encode (1 pin)', args.iterations, 'msg'):
+            for _ in range(args.iterations):
+                codec.encode(single)
+
+        with measure(f'{name}.encode ({args.pins} pins)', args.iterations,
+                     'msg'):
+            for _ in range(args.iterations):
+                codec.encode(many)
+
+
+if __name__ == '__main__':
+    main()
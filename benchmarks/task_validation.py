@@ -0,0 +1,38 @@
+"""Validations per second of the periodic task serializer.
+
+Only validates, nothing is written to the database:
+
+    python -m benchmarks.task_validation --iterations 20000
+"""
+import json
+import argparse
+from .utils import measure, setup_django
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from cloudroom.serializers.celery import (
+        PeriodicTaskSerializer,
+        registered_tasks,
+    )
+
+    tasks = registered_tasks('microcontrollers')
+    attrs = {
+        'name': 'bench-validate',
+        'task': 'microcontrollers.tasks.change_pin_value',
+        'kwargs': json.dumps({'pin_id': 1, 'value': 'ON'}),
+    }
+
+    serializer = PeriodicTaskSerializer(tasks=tasks)
+    with measure('PeriodicTaskSerializer.validate', args.iterations, 'calls'):
+        for _ in range(args.iterations):
+            serializer.validate(attrs)
+
+
+if __name__ == '__main__':
+    main()
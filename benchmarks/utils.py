@@ -0,0 +1,19 @@
+import os
+import time
+from contextlib import contextmanager
+import django
+
+
+def setup_django() -> None:
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cloudroom.settings')
+    django.setup()
+
+
+@contextmanager
+def measure(name: str, operations: int, unit: str = 'ops'):
+    start = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - start
+    rate = operations / elapsed if elapsed else float('inf')
+    print(f'{name:<32} {operations:>8} {unit} in {elapsed:8.3f}s '
+          f'-> {rate:12.1f} {unit}/s')
@@ -1,8 +1,6 @@
 import os
-import django
-from channels.routing import get_default_application
+from django.core.asgi import get_asgi_application
 
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "cloudroom.settings")
-django.setup()
-application = get_default_application()
+application = get_asgi_application()
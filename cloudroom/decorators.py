@@ -1,3 +1,9 @@
+from functools import wraps
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+
 def false_on_exception(func):
     def run(*args, **kwargs):
         try:
@@ -5,3 +11,32 @@ def false_on_exception(func):
         except Exception:
             return False
     return run
+
+
+def conditional(etag_func):
+    """Answer a view handler with a 304 when ``If-None-Match`` matches.
+
+    ``etag_func`` is called with the view and the handler arguments, before
+    the handler, and returns the current ETag or ``None`` to skip the check.
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def run(view, request, *args, **kwargs):
+            etag = etag_func(view, request, *args, **kwargs)
+            if etag is None:
+                return handler(view, request, *args, **kwargs)
+
+            etags = parse_etags(request.headers.get('If-None-Match', ''))
+            if etag in etags or '*' in etags:
+                return Response(
+                    status=status.HTTP_304_NOT_MODIFIED,
+                    headers={'ETag': etag},
+                )
+
+            response = handler(view, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                response['ETag'] = etag
+
+            return response
+        return run
+    return decorator
@@ -1 +1,2 @@
 from .manager import Manager
+from .async_manager import AsyncManager
@@ -0,0 +1,169 @@
+import asyncio
+from contextlib import suppress
+from json.decoder import JSONDecodeError
+from typing import Any, Optional
+import httpx
+import aiomqtt
+from django.conf import settings
+from .codecs import JSONCodec, get_codec
+from .exceptions import (
+    BrokerRequestError,
+    BrokerPublishError,
+    BrokerUnavailableError,
+    InvalidPassword,
+    InvalidUsername,
+)
+
+
+class AsyncManager:
+    """Non-blocking counterpart of ``Manager`` for the event loop.
+
+    One instance keeps a pooled HTTP client and a single MQTT session, both
+    shared by every coroutine using it, so many operations can be awaited
+    concurrently (e.g. with ``asyncio.gather``).
+    """
+
+    def __init__(self) -> None:
+        self._url = f'{settings.MQTT_BROKER_MANAGEMENT_URL}/api'
+        self._hostname = settings.MQTT_BROKER_HOST
+        self._port = int(settings.MQTT_BROKER_PORT)
+        self._username = settings.MQTT_BROKER_USERNAME
+        self._password = settings.MQTT_BROKER_PASSWORD
+        self._max_inflight = settings.MQTT_PUBLISHER_MAX_INFLIGHT
+        self._publish_timeout = settings.MQTT_PUBLISHER_TIMEOUT
+
+        connect_timeout, read_timeout = settings.MQTT_BROKER_MANAGEMENT_TIMEOUT
+        pool_size = settings.MQTT_BROKER_MANAGEMENT_POOL_SIZE
+        self._http = httpx.AsyncClient(
+            auth=(self._username, self._password),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size,
+            ),
+            transport=httpx.AsyncHTTPTransport(
+                retries=settings.MQTT_BROKER_MANAGEMENT_RETRIES,
+            ),
+        )
+        self._mqtt: Optional[aiomqtt.Client] = None
+        self._mqtt_lock = asyncio.Lock()
+
+    async def __aenter__(self) -> 'AsyncManager':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _request(self, method: str, path: str, **kwargs):
+        try:
+            return await self._http.request(
+                method,
+                f'{self._url}{path}',
+                **kwargs,
+            )
+        except httpx.TransportError as e:
+            raise BrokerUnavailableError from e
+
+    def _raise_for_status(self, r: httpx.Response) -> None:
+        if not r.is_success:
+            body = {}
+            with suppress(JSONDecodeError):
+                body = r.json()
+
+            raise BrokerRequestError(r.status_code, body)
+
+    async def create_user(self, username: str, password: str) -> None:
+        if not username:
+            raise InvalidUsername
+
+        if not password:
+            raise InvalidPassword
+
+        r = await self._request(
+            'PUT',
+            f'/users/{username}',
+            json={'password': password, 'tags': ''},
+        )
+        self._raise_for_status(r)
+
+    async def grant_user_permissions(self, username: str) -> None:
+        if not username:
+            raise InvalidUsername
+
+        r = await self._request(
+            'PUT',
+            f'/permissions/%2F/{username}',
+            json={'configure': '.*', 'write': '.*', 'read': '.*'},
+        )
+        self._raise_for_status(r)
+
+    async def update_user_password(
+        self,
+        username: str,
+        new_password: str,
+    ) -> None:
+        await self.create_user(username, new_password)
+
+    async def delete_user(self, username: str) -> None:
+        if not username:
+            raise InvalidUsername
+
+        r = await self._request('DELETE', f'/users/{username}')
+        if r.status_code == 404:
+            return
+
+        self._raise_for_status(r)
+
+    async def _get_mqtt(self) -> aiomqtt.Client:
+        async with self._mqtt_lock:
+            if self._mqtt is None:
+                client = aiomqtt.Client(
+                    hostname=self._hostname,
+                    port=self._port,
+                    username=self._username,
+                    password=self._password,
+                    timeout=self._publish_timeout,
+                    max_inflight_messages=self._max_inflight,
+                    max_concurrent_outgoing_calls=self._max_inflight,
+                )
+                await client.__aenter__()
+                self._mqtt = client
+
+            return self._mqtt
+
+    async def _drop_mqtt(self, client: aiomqtt.Client) -> None:
+        async with self._mqtt_lock:
+            if self._mqtt is client:
+                self._mqtt = None
+                with suppress(aiomqtt.MqttError):
+                    await client.__aexit__(None, None, None)
+
+    async def publish(
+        self,
+        topic: str,
+        payload: dict[str, Any],
+        qos: int = 1,
+        codec: str = JSONCodec.name,
+    ) -> None:
+        try:
+            client = await self._get_mqtt()
+        except aiomqtt.MqttError as e:
+            raise BrokerPublishError from e
+
+        try:
+            await client.publish(
+                topic=topic,
+                payload=get_codec(codec).encode(payload),
+                qos=qos,
+                retain=True,
+            )
+        except aiomqtt.MqttError as e:
+            # The next publish opens a fresh session
+            await self._drop_mqtt(client)
+            raise BrokerPublishError from e
+
+    async def close(self) -> None:
+        if self._mqtt is not None:
+            await self._drop_mqtt(self._mqtt)
+
+        await self._http.aclose()
@@ -0,0 +1,141 @@
+import json
+import struct
+from typing import Any
+
+
+class JSONCodec:
+    name = 'json'
+
+    def encode(self, payload: Any) -> bytes:
+        return json.dumps(payload).encode()
+
+    def decode(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class BinaryPinCodec:
+    """Compact encoding of pin states for constrained microcontrollers.
+
+    Accepts a single pin (``{'number', 'value', 'is_digital'}``, plus an
+    optional ``version``) or many pins (``{'pins': [...]}``) and always
+    decodes to the latter. Layout, little endian:
+
+        uint8  version
+        uint8  flags (bit 0: pin numbers are uint16 instead of uint8,
+                      bit 1: pin versions follow the pins)
+        uint8  digital pin count (D)
+        D      digital pin numbers
+        ceil(D / 8) bytes, bitset of the digital values (bit set = ON)
+        D      uint32 digital pin versions, with bit 1
+        uint8  analog pin count (A)
+        A      (pin number, uint16 value) pairs, each followed by its uint32
+               pin version with bit 1
+
+    Boards keep the highest version of each pin and drop older states.
+    """
+
+    name = 'binary'
+    VERSION = 2
+    WIDE_NUMBERS = 0b1
+    PIN_VERSIONS = 0b10
+
+    def encode(self, payload: dict[str, Any]) -> bytes:
+        pins = payload['pins'] if 'pins' in payload else [payload]
+        digital = [pin for pin in pins if pin['is_digital']]
+        analog = [pin for pin in pins if not pin['is_digital']]
+
+        wide = any(pin['number'] > 0xFF for pin in pins)
+        versioned = any('version' in pin for pin in pins)
+        flags = (self.WIDE_NUMBERS if wide else 0) | \
+            (self.PIN_VERSIONS if versioned else 0)
+        number = 'H' if wide else 'B'
+        analog_format = f'{number}HI' if versioned else f'{number}H'
+
+        bitset = 0
+        for i, pin in enumerate(digital):
+            if pin['value'] == 'ON':
+                bitset |= 1 << i
+
+        analog_fields = []
+        for pin in analog:
+            analog_fields += [pin['number'], int(pin['value'])]
+            if versioned:
+                analog_fields.append(pin.get('version', 0))
+
+        digital_versions = [
+            pin.get('version', 0) for pin in digital
+        ] if versioned else []
+
+        return b''.join([
+            struct.pack('<BBB', self.VERSION, flags, len(digital)),
+            struct.pack(
+                f'<{len(digital)}{number}',
+                *(pin['number'] for pin in digital),
+            ),
+            bitset.to_bytes((len(digital) + 7) // 8, 'little'),
+            struct.pack(f'<{len(digital_versions)}I', *digital_versions),
+            struct.pack('<B', len(analog)),
+            struct.pack('<' + analog_format * len(analog), *analog_fields),
+        ])
+
+    def decode(self, data: bytes) -> dict[str, Any]:
+        version, flags, digital_count = struct.unpack_from('<BBB', data)
+        if version != self.VERSION:
+            raise ValueError(f'Unsupported payload version: {version}')
+
+        number = 'H' if flags & self.WIDE_NUMBERS else 'B'
+        versioned = bool(flags & self.PIN_VERSIONS)
+        offset = 3
+
+        numbers = struct.unpack_from(f'<{digital_count}{number}', data, offset)
+        offset += struct.calcsize(f'<{digital_count}{number}')
+
+        bitset_size = (digital_count + 7) // 8
+        bitset = int.from_bytes(data[offset:offset + bitset_size], 'little')
+        offset += bitset_size
+
+        pins = [
+            {
+                'number': pin_number,
+                'value': 'ON' if bitset >> i & 1 else 'OFF',
+                'is_digital': True,
+            }
+            for i, pin_number in enumerate(numbers)
+        ]
+
+        if versioned:
+            versions = struct.unpack_from(f'<{digital_count}I', data, offset)
+            offset += 4 * digital_count
+            for pin, version in zip(pins, versions):
+                pin['version'] = version
+
+        analog_count, = struct.unpack_from('<B', data, offset)
+        offset += 1
+        analog_format = f'{number}HI' if versioned else f'{number}H'
+        fields = struct.unpack_from(
+            '<' + analog_format * analog_count,
+            data,
+            offset,
+        )
+        step = len(analog_format)
+        for i in range(0, len(fields), step):
+            pin = {
+                'number': fields[i],
+                'value': str(fields[i + 1]),
+                'is_digital': False,
+            }
+            if versioned:
+                pin['version'] = fields[i + 2]
+            pins.append(pin)
+
+        return {'pins': pins}
+
+
+CODECS = {
+    codec.name: codec
+    for codec in (JSONCodec(), BinaryPinCodec())
+}
+
+
+def get_codec(name: str = JSONCodec.name):
+    return CODECS[name]
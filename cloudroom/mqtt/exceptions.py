@@ -10,6 +10,14 @@ class BrokerRequestError(Exception):
         return f'Broker returned a status code: {self.code}'
 
 
+class BrokerUnavailableError(BrokerRequestError):
+    def __init__(self) -> None:
+        super().__init__(code=None, body={})
+
+    def __str__(self) -> str:  # pragma: no cover
+        return 'Broker management API is unreachable'
+
+
 class BrokerPublishError(Exception):
     pass
 
@@ -1,17 +1,19 @@
-import json
 from contextlib import suppress
 from json.decoder import JSONDecodeError
-from typing import Any
-import requests
+from typing import Any, Iterable
 from django.conf import settings
-from requests.models import HTTPBasicAuth
-import paho.mqtt.publish as paho
+from requests.exceptions import RequestException
+from requests.models import HTTPBasicAuth, Response
+from .codecs import JSONCodec, get_codec
 from .exceptions import (
-    BrokerRequestError,
     BrokerPublishError,
+    BrokerRequestError,
+    BrokerUnavailableError,
     InvalidPassword,
     InvalidUsername,
 )
+from .publisher import Message, PublishResult, get_publisher
+from .session import get_session
 
 
 class Manager:
@@ -22,6 +24,27 @@ class Manager:
         self._username = settings.MQTT_BROKER_USERNAME
         self._password = settings.MQTT_BROKER_PASSWORD
         self._authorization = HTTPBasicAuth(self._username, self._password)
+        self._timeout = settings.MQTT_BROKER_MANAGEMENT_TIMEOUT
+
+    def _request(self, method: str, path: str, **kwargs) -> Response:
+        try:
+            return get_session().request(
+                method,
+                f'{self._url}{path}',
+                auth=self._authorization,
+                timeout=self._timeout,
+                **kwargs,
+            )
+        except RequestException as e:
+            raise BrokerUnavailableError from e
+
+    def _raise_for_status(self, r: Response) -> None:
+        if not r.ok:
+            body = {}
+            with suppress(JSONDecodeError):
+                body = r.json()
+
+            raise BrokerRequestError(r.status_code, body)
 
     def create_user(self, username: str, password: str) -> None:
         if not username:
@@ -30,33 +53,23 @@ class Manager:
         if not password:
             raise InvalidPassword
 
-        r = requests.put(
-            f'{self._url}/users/{username}',
+        r = self._request(
+            'PUT',
+            f'/users/{username}',
             json={'password': password, 'tags': ''},
-            auth=self._authorization,
         )
-        if not r.ok:
-            body = {}
-            with suppress(JSONDecodeError):
-                body = r.json()
-
-            raise BrokerRequestError(r.status_code, body)
+        self._raise_for_status(r)
 
     def grant_user_permissions(self, username: str) -> None:
         if not username:
             raise InvalidUsername
 
-        r = requests.put(
-            f'{self._url}/permissions/%2F/{username}',
+        r = self._request(
+            'PUT',
+            f'/permissions/%2F/{username}',
             json={'configure': '.*', 'write': '.*', 'read': '.*'},
-            auth=self._authorization,
         )
-        if not r.ok:
-            body = {}
-            with suppress(JSONDecodeError):
-                body = r.json()
-
-            raise BrokerRequestError(r.status_code, body)
+        self._raise_for_status(r)
 
     def update_user_password(self, username: str, new_password: str) -> None:
         self.create_user(username, new_password)
@@ -65,35 +78,40 @@ class Manager:
         if not username:
             raise InvalidUsername
 
-        r = requests.delete(
-            f'{self._url}/users/{username}',
-            auth=self._authorization,
-        )
-        if not r.ok:
-            if r.status_code == 404:
-                return
+        r = self._request('DELETE', f'/users/{username}')
+        if r.status_code == 404:
+            return
 
-            body = {}
-            with suppress(JSONDecodeError):
-                body = r.json()
-
-            raise BrokerRequestError(r.status_code, body)
+        self._raise_for_status(r)
 
     def publish(
         self,
         topic: str,
         payload: dict[str, Any],
         qos: int = 1,
+        codec: str = JSONCodec.name,
     ) -> None:
         try:
-            paho.single(
+            get_publisher().publish(
                 topic=topic,
-                payload=json.dumps(payload),
+                payload=get_codec(codec).encode(payload),
                 qos=qos,
                 retain=True,
-                hostname=self._hostname,
-                port=self._port,
-                auth={'username': self._username, 'password': self._password},
             )
-        except Exception as e:  # pragma: no cover
+        except BrokerPublishError:
+            raise
+        except Exception as e:
+            # An invalid topic or payload, rejected by paho or the codec
             raise BrokerPublishError from e
+
+    def publish_many(
+        self,
+        messages: Iterable[tuple[str, dict[str, Any], int, bool]],
+        codec: str = JSONCodec.name,
+    ) -> list[PublishResult]:
+        encoder = get_codec(codec)
+        publisher = get_publisher()
+        return publisher.publish_many(
+            Message(topic, encoder.encode(payload), qos, retain)
+            for topic, payload, qos, retain in messages
+        )
@@ -0,0 +1,244 @@
+import os
+import atexit
+import threading
+from typing import Iterable, NamedTuple, Optional, Union
+import paho.mqtt.client as mqtt
+from django.conf import settings
+from .exceptions import BrokerPublishError
+
+
+class Message(NamedTuple):
+    topic: str
+    payload: Union[str, bytes]
+    qos: int = 1
+    retain: bool = True
+
+
+class PublishResult(NamedTuple):
+    topic: str
+    published: bool
+    error: Optional[Exception] = None
+
+
+class Publisher:
+    """Long-lived MQTT connection shared by every publish of a process.
+
+    The network loop runs in a background thread that reconnects on its own,
+    and at most ``max_inflight`` messages wait for the broker acknowledgement
+    at the same time; further publishes block until the window has room.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: str,
+        password: str,
+        max_inflight: int = 20,
+        timeout: float = 10.0,
+        keepalive: int = 60,
+    ) -> None:
+        self._hostname = hostname
+        self._port = port
+        self._timeout = timeout
+        self._keepalive = keepalive
+        self._max_inflight = max_inflight
+        self._inflight = 0
+        self._window = threading.Condition()
+        self._connected = threading.Event()
+        self._lock = threading.Lock()
+        self._started = False
+
+        self._client = mqtt.Client(
+            mqtt.CallbackAPIVersion.VERSION2,
+            clean_session=True,
+        )
+        self._client.username_pw_set(username, password)
+        self._client.max_inflight_messages_set(max_inflight)
+        self._client.reconnect_delay_set(min_delay=1, max_delay=30)
+        self._client.on_connect = self._on_connect
+        self._client.on_disconnect = self._on_disconnect
+        self._client.on_publish = self._on_publish
+
+    def _on_connect(self, client, userdata, flags, reason, properties) -> None:
+        if not reason.is_failure:
+            self._connected.set()
+
+    def _on_disconnect(
+        self,
+        client,
+        userdata,
+        flags,
+        reason,
+        properties,
+    ) -> None:
+        self._connected.clear()
+
+    def _on_publish(self, client, userdata, mid, reason, properties) -> None:
+        self._release()
+
+    def _acquire(self) -> None:
+        with self._window:
+            has_room = self._window.wait_for(
+                lambda: self._inflight < self._max_inflight,
+                timeout=self._timeout,
+            )
+            if not has_room:
+                raise BrokerPublishError('In-flight window is full')
+
+            self._inflight += 1
+
+    def _release(self) -> None:
+        with self._window:
+            self._inflight = max(self._inflight - 1, 0)
+            self._window.notify()
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+
+            self._client.connect_async(
+                host=self._hostname,
+                port=self._port,
+                keepalive=self._keepalive,
+            )
+            self._client.loop_start()
+            self._started = True
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    def send(
+        self,
+        topic: str,
+        payload: Union[str, bytes],
+        qos: int = 1,
+        retain: bool = True,
+    ) -> mqtt.MQTTMessageInfo:
+        """Queue a message without waiting for its acknowledgement."""
+        self._start()
+        if not self._connected.wait(timeout=self._timeout):
+            raise BrokerPublishError('Broker connection unavailable')
+
+        self._acquire()
+        try:
+            info = self._client.publish(
+                topic=topic,
+                payload=payload,
+                qos=qos,
+                retain=retain,
+            )
+        except Exception:
+            self._release()
+            raise
+
+        # QoS > 0 messages are kept by paho and resent after a reconnection,
+        # so their slot is only given back when the broker acknowledges them
+        queued = qos > 0 and info.rc == mqtt.MQTT_ERR_NO_CONN
+        if info.rc != mqtt.MQTT_ERR_SUCCESS and not queued:
+            self._release()
+            raise BrokerPublishError(mqtt.error_string(info.rc))
+
+        return info
+
+    def wait(self, info: mqtt.MQTTMessageInfo) -> None:
+        try:
+            info.wait_for_publish(timeout=self._timeout)
+        except (ValueError, RuntimeError) as e:
+            raise BrokerPublishError(str(e)) from e
+
+        if not info.is_published():
+            raise BrokerPublishError('Broker did not acknowledge the message')
+
+    def publish(
+        self,
+        topic: str,
+        payload: Union[str, bytes],
+        qos: int = 1,
+        retain: bool = True,
+    ) -> None:
+        info = self.send(topic=topic, payload=payload, qos=qos, retain=retain)
+        self.wait(info)
+
+    def publish_many(
+        self,
+        messages: Iterable[Message],
+    ) -> list[PublishResult]:
+        """Stream every message over the shared session.
+
+        Messages are sent as soon as the in-flight window allows it and the
+        acknowledgements are only collected at the end, so a failure affects
+        the result of its own message alone.
+        """
+        sent = []
+        for message in messages:
+            message = Message(*message)
+            try:
+                info = self.send(*message)
+            except (BrokerPublishError, ValueError) as e:
+                sent.append((message.topic, None, e))
+            else:
+                sent.append((message.topic, info, None))
+
+        results = []
+        for topic, info, error in sent:
+            if info is not None:
+                try:
+                    self.wait(info)
+                except BrokerPublishError as e:
+                    error = e
+
+            results.append(PublishResult(
+                topic=topic,
+                published=error is None,
+                error=error,
+            ))
+
+        return results
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._started:
+                return
+
+            self._client.disconnect()
+            self._client.loop_stop()
+            self._connected.clear()
+            self._started = False
+
+
+_publisher: Optional[Publisher] = None
+_publisher_pid: Optional[int] = None
+_publisher_lock = threading.Lock()
+
+
+def get_publisher() -> Publisher:
+    """Return the publisher of the current process, creating it if needed.
+
+    A forked child (e.g. a Celery prefork worker) never reuses the socket
+    inherited from its parent, it opens its own connection instead.
+    """
+    global _publisher, _publisher_pid
+
+    with _publisher_lock:
+        if _publisher is None or _publisher_pid != os.getpid():
+            _publisher = Publisher(
+                hostname=settings.MQTT_BROKER_HOST,
+                port=int(settings.MQTT_BROKER_PORT),
+                username=settings.MQTT_BROKER_USERNAME,
+                password=settings.MQTT_BROKER_PASSWORD,
+                max_inflight=settings.MQTT_PUBLISHER_MAX_INFLIGHT,
+                timeout=settings.MQTT_PUBLISHER_TIMEOUT,
+                keepalive=settings.MQTT_PUBLISHER_KEEPALIVE,
+            )
+            _publisher_pid = os.getpid()
+
+        return _publisher
+
+
+@atexit.register
+def _close_publisher() -> None:  # pragma: no cover
+    if _publisher is not None and _publisher_pid == os.getpid():
+        _publisher.close()
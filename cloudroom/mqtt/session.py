@@ -0,0 +1,55 @@
+import os
+import threading
+from typing import Optional
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+
+
+_session: Optional[requests.Session] = None
+_session_pid: Optional[int] = None
+_session_lock = threading.Lock()
+
+
+def build_session(retries: int = 2, pool_size: int = 10) -> requests.Session:
+    """Keep-alive session for the broker management API.
+
+    Only connection failures and gateway errors are retried, and every call
+    made through it (PUT/DELETE) is idempotent on RabbitMQ's side.
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=0.2,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset(['GET', 'PUT', 'DELETE']),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=pool_size,
+        max_retries=retry,
+    )
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Return the management API session of the current process."""
+    global _session, _session_pid
+
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            _session = build_session(
+                retries=settings.MQTT_BROKER_MANAGEMENT_RETRIES,
+                pool_size=settings.MQTT_BROKER_MANAGEMENT_POOL_SIZE,
+            )
+            _session_pid = os.getpid()
+
+        return _session
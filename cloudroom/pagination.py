@@ -0,0 +1,33 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CreatedCursorPagination(CursorPagination):
+    """Newest first, paginated from the ``created`` of the last row.
+
+    DRF cursors hold a single position: rows sharing the ``created`` of the
+    boundary are stepped over with an offset, ``id`` only keeps their order
+    stable. Every page is a range scan on the (``created``, ``id``) index,
+    while the page number pagination counts the table and skips the
+    previous pages.
+    """
+    ordering = ('-created', '-id')
+
+
+class SelectablePaginationMixin:
+    """Lets the client ask for ``?pagination=cursor`` on a list.
+
+    The default pagination class is kept when it is missing.
+    """
+    pagination_query_param = 'pagination'
+    cursor_pagination_class = CreatedCursorPagination
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            mode = self.request.query_params.get(self.pagination_query_param)
+            if mode == 'cursor':
+                self._paginator = self.cursor_pagination_class()
+            else:
+                return super().paginator
+
+        return self._paginator
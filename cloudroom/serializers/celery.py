@@ -1,15 +1,70 @@
 import json
 from json.decoder import JSONDecodeError
-from typing import Optional
+from functools import lru_cache
+from typing import Any, NamedTuple, Optional
 from importlib import import_module
 from inspect import signature
 import pytz
+from celery import current_app
 from rest_framework import serializers
 from django.conf import settings
 from django_celery_beat.models import PeriodicTask, CrontabSchedule
 from rest_framework.exceptions import ValidationError
 
 
+class TaskSchema(NamedTuple):
+    """Arguments a task expects, read once from its signature."""
+    params: tuple[str, ...]
+    types: tuple[type, ...]
+
+    @classmethod
+    def of(cls, name: str) -> 'TaskSchema':
+        module, task = name.rsplit('.', 1)
+        parameters = signature(getattr(import_module(module), task)).parameters
+        return cls(
+            params=tuple(parameters.keys()),
+            types=tuple(specs.annotation for specs in parameters.values()),
+        )
+
+    def validate(self, task_kwargs: dict[str, Any]) -> None:
+        if tuple(task_kwargs.keys()) != self.params:
+            params = ', '.join(self.params)
+            m = f'This task needs the following arguments: {params}'
+            raise ValidationError(m)
+
+        for arg, type_ in zip(self.params, self.types):
+            if not isinstance(task_kwargs[arg], type_):
+                m = 'Argument "{arg}" must be of type "{type}"'.format(
+                    arg=arg,
+                    type=type_.__name__,
+                )
+                raise ValidationError(m)
+
+
+@lru_cache(maxsize=None)
+def task_schema(name: str) -> TaskSchema:
+    return TaskSchema.of(name)
+
+
+@lru_cache(maxsize=None)
+def registered_tasks(package: str) -> tuple[str, ...]:
+    """Sorted names of the celery tasks of a package.
+
+    Tasks are only registered when the process starts, so the list is built
+    once and the schema of each task is compiled along with it.
+    """
+    current_app.loader.import_default_modules()
+    tasks = tuple(sorted(
+        name
+        for name in current_app.tasks
+        if name.startswith(package)
+    ))
+    for name in tasks:
+        task_schema(name)
+
+    return tasks
+
+
 class CrontabScheduleSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         validated_data = {
@@ -36,8 +91,13 @@ class CrontabScheduleSerializer(serializers.ModelSerializer):
 
 
 class PeriodicTaskSerializer(serializers.ModelSerializer):
-    def __init__(self, tasks: Optional[list[str]] = None, *args, **kwargs):
-        self._tasks = tasks or list()
+    def __init__(
+        self,
+        tasks: Optional[tuple[str, ...]] = None,
+        *args,
+        **kwargs,
+    ):
+        self._tasks = tasks or tuple()
         super().__init__(*args, **kwargs)
 
     crontab = CrontabScheduleSerializer()
@@ -51,22 +111,7 @@ class PeriodicTaskSerializer(serializers.ModelSerializer):
         else:
             task_kwargs = {}
 
-        module, task = attrs['task'].rsplit('.', 1)
-        task_signature = signature(getattr(import_module(module), task))
-
-        if list(task_kwargs.keys()) != list(task_signature.parameters.keys()):
-            params = ', '.join(task_signature.parameters.keys())
-            m = f'This task needs the following arguments: {params}'
-            raise ValidationError(m)
-
-        for arg, specs in task_signature.parameters.items():
-            if not isinstance(task_kwargs[arg], specs.annotation):
-                m = 'Argument "{arg}" must be of type "{type}"'.format(
-                    arg=arg,
-                    type=specs.annotation.__name__,
-                )
-                raise ValidationError(m)
-
+        task_schema(attrs['task']).validate(task_kwargs)
         return super().validate(attrs)
 
     def get_fields(self):
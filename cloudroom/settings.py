@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/3.0/ref/settings/
 
 import os
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 
 
 # MQTT Configuration
@@ -24,6 +25,23 @@ MQTT_BROKER_MANAGEMENT_URL = 'http://{host}:{port}'.format(
     host=MQTT_BROKER_HOST,
     port=MQTT_BROKER_MANAGEMENT_PORT,
 )
+MQTT_BROKER_MANAGEMENT_TIMEOUT = (
+    float(os.environ.get('MQTT_BROKER_MANAGEMENT_CONNECT_TIMEOUT') or 3.05),
+    float(os.environ.get('MQTT_BROKER_MANAGEMENT_READ_TIMEOUT') or 10),
+)
+MQTT_BROKER_MANAGEMENT_RETRIES = int(
+    os.environ.get('MQTT_BROKER_MANAGEMENT_RETRIES') or 2
+)
+MQTT_BROKER_MANAGEMENT_POOL_SIZE = int(
+    os.environ.get('MQTT_BROKER_MANAGEMENT_POOL_SIZE') or 10
+)
+MQTT_PUBLISHER_MAX_INFLIGHT = int(
+    os.environ.get('MQTT_PUBLISHER_MAX_INFLIGHT') or 20
+)
+MQTT_PUBLISHER_TIMEOUT = float(os.environ.get('MQTT_PUBLISHER_TIMEOUT') or 10)
+MQTT_PUBLISHER_KEEPALIVE = int(
+    os.environ.get('MQTT_PUBLISHER_KEEPALIVE') or 60
+)
 
 RABBITMQ_URL = 'amqp://{user}:{password}@{host}:{port}'.format(
     user=os.environ['RABBITMQ_USER'],
@@ -32,10 +50,108 @@ RABBITMQ_URL = 'amqp://{user}:{password}@{host}:{port}'.format(
     port=os.environ['RABBITMQ_PORT'],
 )
 
+# Board notifications
+# Seconds during which the pin changes of a board are gathered into a single
+# message, 0 sends one message per save (and per bulk save). A window needs
+# CACHE_REDIS_URL, the buffer being shared by the API and the workers
+BOARD_NOTIFICATION_WINDOW = float(
+    os.environ.get('BOARD_NOTIFICATION_WINDOW') or 0
+)
+BOARD_NOTIFICATION_BUFFER_TTL = 60 * 60
+# Send the committed pin state in the task message instead of its id, the
+# worker then publishes without reading the database
+BOARD_NOTIFICATION_INLINE_STATE = int(
+    os.environ.get('BOARD_NOTIFICATION_INLINE_STATE') or 1
+)
+# Digests of the last published pin states, used to skip duplicated messages
+BOARD_NOTIFICATION_DIGEST_CACHE = 'digests'
+BOARD_NOTIFICATION_DIGEST_TTL = 24 * 60 * 60
+BOARD_NOTIFICATION_DIGEST_MAX_ENTRIES = int(
+    os.environ.get('BOARD_NOTIFICATION_DIGEST_MAX_ENTRIES') or 10000
+)
+
+# Board presence
+# Seconds without a heartbeat after which a board is considered offline
+BOARD_PRESENCE_TIMEOUT = int(os.environ.get('BOARD_PRESENCE_TIMEOUT') or 90)
+BOARD_PRESENCE_FLUSH_INTERVAL = 30
+# What notify_board does for offline boards: "publish", "defer" or "skip".
+# Anything but "publish" needs CACHE_REDIS_URL, presence being shared by the
+# ingest, the API and the workers
+BOARD_OFFLINE_POLICY = os.environ.get('BOARD_OFFLINE_POLICY') or 'publish'
+BOARD_OFFLINE_DEFER_DELAY = 30
+BOARD_OFFLINE_DEFER_MAX = 60 * 60
+
+# Bulk board provisioning, the threads share the management API pool
+BOARD_PROVISIONING_WORKERS = int(
+    os.environ.get('BOARD_PROVISIONING_WORKERS') or
+    MQTT_BROKER_MANAGEMENT_POOL_SIZE
+)
+BOARD_PROVISIONING_MAX_BATCH = 5000
+
+# Device twin, the desired pin states of each board kept in the cache
+BOARD_TWIN_TIMEOUT = int(os.environ.get('BOARD_TWIN_TIMEOUT') or 24 * 60 * 60)
+# Seconds between a report or reconnection and the publish of the pins whose
+# reported value differs from the desired one, grouping the reports meanwhile
+BOARD_RECONCILIATION_DELAY = int(
+    os.environ.get('BOARD_RECONCILIATION_DELAY') or 5
+)
+
+# Stream of the committed pin changes (/pins/changes/)
+PIN_CHANGE_FEED = int(os.environ.get('PIN_CHANGE_FEED') or 1)
+# Events a connection may fall behind before it is sent a snapshot instead
+PIN_CHANGE_FEED_BUFFER = int(os.environ.get('PIN_CHANGE_FEED_BUFFER') or 256)
+PIN_CHANGE_FEED_KEEPALIVE = 15
+
+# Device secrets
+# argon2 verifications run in a process pool; requests beyond the workers and
+# the queue depth are rejected with a 503
+SECRET_VERIFICATION_WORKERS = int(
+    os.environ.get('SECRET_VERIFICATION_WORKERS') or os.cpu_count() or 1
+)
+SECRET_VERIFICATION_QUEUE_DEPTH = int(
+    os.environ.get('SECRET_VERIFICATION_QUEUE_DEPTH') or
+    SECRET_VERIFICATION_WORKERS * 2
+)
+SECRET_VERIFICATION_TIMEOUT = 10
+# Lifetime in seconds of the session tokens given to validated devices
+DEVICE_SESSION_TTL = int(os.environ.get('DEVICE_SESSION_TTL') or 5 * 60)
+
+# Board reports ingestion (./manage.py ingest)
+INGEST_SHARED_GROUP = os.environ.get('INGEST_SHARED_GROUP') or None
+INGEST_BATCH_SIZE = int(os.environ.get('INGEST_BATCH_SIZE') or 500)
+INGEST_FLUSH_INTERVAL = float(os.environ.get('INGEST_FLUSH_INTERVAL') or 1)
+
+# Pin history
+PIN_HISTORY_RAW_RETENTION_DAYS = int(
+    os.environ.get('PIN_HISTORY_RAW_RETENTION_DAYS') or 7
+)
+PIN_HISTORY_MINUTE_RETENTION_DAYS = int(
+    os.environ.get('PIN_HISTORY_MINUTE_RETENTION_DAYS') or 30
+)
+PIN_HISTORY_HOUR_RETENTION_DAYS = int(
+    os.environ.get('PIN_HISTORY_HOUR_RETENTION_DAYS') or 365
+)
+# Most points returned by the history endpoint when choosing a resolution
+PIN_HISTORY_MAX_POINTS = 1000
+
+# Behavior scheduler (./manage.py schedule_behaviors)
+BEHAVIOR_SCHEDULER_RELOAD_INTERVAL = 10 * 60
+# Most pin changes sent in one message when behaviors fire together
+BEHAVIOR_BATCH_SIZE = 100
+
 # Celery variables
 CELERY_BROKER_URL = RABBITMQ_URL
 CELERY_TIMEZONE = 'America/Sao_Paulo'
-CELERY_BEAT_SCHEDULE = {}
+CELERY_BEAT_SCHEDULE = {
+    'prune-pin-history': {
+        'task': 'microcontrollers.tasks.prune_pin_history',
+        'schedule': 60 * 60,
+    },
+    'flush-board-presence': {
+        'task': 'microcontrollers.tasks.flush_board_presence',
+        'schedule': BOARD_PRESENCE_FLUSH_INTERVAL,
+    },
+}
 
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
@@ -56,6 +172,7 @@ ALLOWED_HOSTS = os.environ['DJANGO_ALLOWED_HOSTS'].split(',')
 # Application definition
 
 INSTALLED_APPS = [
+    'daphne',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -133,6 +250,53 @@ DATABASES = {
 }
 
 
+# Cache
+# Shared between the API and the workers when CACHE_REDIS_URL is set. The
+# versions behind the ETags and the device twin are written by every process,
+# so without a shared cache conditional GETs are not answered and the twin is
+# read from the database. Presence, written by the ingest, needs one too
+CACHE_SHARED = bool(os.environ.get('CACHE_REDIS_URL'))
+
+if CACHE_SHARED:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['CACHE_REDIS_URL'],
+        },
+        'digests': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['CACHE_REDIS_URL'],
+            'KEY_PREFIX': 'digests',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'digests': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'digests',
+            'OPTIONS': {
+                'MAX_ENTRIES': BOARD_NOTIFICATION_DIGEST_MAX_ENTRIES,
+            },
+        },
+    }
+    # The changes buffered by the API must be seen by the flushing worker
+    if BOARD_NOTIFICATION_WINDOW:
+        raise ImproperlyConfigured(
+            'BOARD_NOTIFICATION_WINDOW needs a cache shared by every '
+            'process, set CACHE_REDIS_URL',
+        )
+    # Presence is written by the ingest, the workers would never see a board
+    # online
+    if BOARD_OFFLINE_POLICY != 'publish':
+        raise ImproperlyConfigured(
+            'BOARD_OFFLINE_POLICY needs a cache shared by every process, '
+            'set CACHE_REDIS_URL',
+        )
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 
@@ -0,0 +1,30 @@
+import pytest
+from rest_framework.exceptions import ValidationError
+from ..serializers.celery import registered_tasks, task_schema
+
+
+class TestTaskRegistry:
+    def test_registered_tasks(self):
+        tasks = registered_tasks('microcontrollers')
+
+        assert 'microcontrollers.tasks.change_pin_value' in tasks
+        assert list(tasks) == sorted(tasks)
+        # Built once per process
+        assert registered_tasks('microcontrollers') is tasks
+
+    def test_task_schema(self):
+        schema = task_schema('microcontrollers.tasks.change_pin_value')
+
+        assert schema.params == ('pin_id', 'value')
+        schema.validate({'pin_id': 1, 'value': 'ON'})
+
+    @pytest.mark.parametrize('kwargs', [
+        {'pin_id': 1},
+        {'value': 'ON', 'pin_id': 1},
+        {'pin_id': '1', 'value': 'ON'},
+    ])
+    def test_task_schema_rejects_kwargs(self, kwargs):
+        schema = task_schema('microcontrollers.tasks.change_pin_value')
+
+        with pytest.raises(ValidationError):
+            schema.validate(kwargs)
@@ -0,0 +1,59 @@
+import pytest
+from ..mqtt.codecs import BinaryPinCodec, JSONCodec, get_codec
+
+
+class TestCodecs:
+    pins = {
+        'pins': [
+            {'number': 13, 'value': 'ON', 'is_digital': True},
+            {'number': 14, 'value': 'OFF', 'is_digital': True},
+            {'number': 2, 'value': '1023', 'is_digital': False},
+            {'number': 3, 'value': '0', 'is_digital': False},
+        ]
+    }
+
+    def test_json_round_trip(self):
+        codec = JSONCodec()
+        assert codec.decode(codec.encode(self.pins)) == self.pins
+
+    def test_binary_round_trip(self):
+        codec = BinaryPinCodec()
+        assert codec.decode(codec.encode(self.pins)) == self.pins
+
+    def test_binary_single_pin(self):
+        codec = BinaryPinCodec()
+        pin = {'number': 13, 'value': 'OFF', 'is_digital': True}
+
+        data = codec.encode(pin)
+
+        assert len(data) == 6
+        assert codec.decode(data) == {'pins': [pin]}
+
+    def test_binary_wide_pin_numbers(self):
+        codec = BinaryPinCodec()
+        pins = {'pins': [{'number': 300, 'value': '7', 'is_digital': False}]}
+        assert codec.decode(codec.encode(pins)) == pins
+
+    def test_binary_pin_versions(self):
+        codec = BinaryPinCodec()
+        pins = {
+            'pins': [
+                {'number': 13, 'value': 'ON', 'is_digital': True,
+                 'version': 7},
+                {'number': 300, 'value': '512', 'is_digital': False,
+                 'version': 70000},
+            ]
+        }
+        assert codec.decode(codec.encode(pins)) == pins
+
+    def test_binary_is_smaller_than_json(self):
+        assert len(BinaryPinCodec().encode(self.pins)) < \
+            len(JSONCodec().encode(self.pins))
+
+    def test_binary_unknown_version(self):
+        with pytest.raises(ValueError):
+            BinaryPinCodec().decode(b'\x01\x00\x00\x00')
+
+    def test_get_codec(self):
+        assert get_codec().name == 'json'
+        assert get_codec('binary').name == 'binary'
@@ -1,10 +1,16 @@
+import os
 import json
+import asyncio
 from copy import deepcopy
 import pytest
 import paho.mqtt.subscribe as subscribe
-from ..mqtt import Manager as MQTTManager
+from ..mqtt import AsyncManager, Manager as MQTTManager
+from ..mqtt.publisher import get_publisher
+from ..mqtt.session import get_session
 from ..mqtt.exceptions import (
+    BrokerPublishError,
     BrokerRequestError,
+    BrokerUnavailableError,
     InvalidPassword,
     InvalidUsername,
 )
@@ -19,6 +25,13 @@ class TestMQTTManager:
         manager._url += '/invalid-path'
         return manager
 
+    @pytest.fixture
+    def manager_unreachable(self):
+        manager = deepcopy(self.manager)
+        manager._url = 'http://127.0.0.1:9/api'
+        manager._timeout = (0.5, 0.5)
+        return manager
+
     @pytest.mark.order(1)
     def test_user_creation(self):
         self.manager.create_user(username='test', password='test')
@@ -76,6 +89,19 @@ class TestMQTTManager:
         with pytest.raises(BrokerRequestError):
             manager_modified.delete_user(username='test')
 
+    @pytest.mark.timeout(10)
+    def test_create_user_with_unreachable_broker(self, manager_unreachable):
+        with pytest.raises(BrokerUnavailableError):
+            manager_unreachable.create_user(username='test', password='test')
+
+    @pytest.mark.timeout(10)
+    def test_delete_user_with_unreachable_broker(self, manager_unreachable):
+        with pytest.raises(BrokerUnavailableError):
+            manager_unreachable.delete_user(username='test')
+
+    def test_management_session_is_reused(self):
+        assert get_session() is get_session()
+
     @pytest.mark.timeout(10)
     def test_send_message(self):
         topic = 'test'
@@ -97,3 +123,144 @@ class TestMQTTManager:
 
         assert msg.topic == topic
         assert json.loads(msg.payload) == payload
+
+    def test_publisher_is_shared_by_managers(self):
+        assert get_publisher() is get_publisher()
+
+    def test_publisher_is_not_inherited_by_forked_process(self, monkeypatch):
+        publisher = get_publisher()
+        monkeypatch.setattr(os, 'getpid', lambda: -1)
+        assert get_publisher() is not publisher
+
+    @pytest.mark.timeout(10)
+    def test_publisher_releases_inflight_window(self):
+        publisher = get_publisher()
+        for i in range(publisher._max_inflight * 2):
+            self.manager.publish(topic='test', payload={'i': i}, qos=1)
+
+        assert publisher.inflight == 0
+
+    @pytest.mark.timeout(10)
+    def test_publisher_reconnects(self):
+        publisher = get_publisher()
+        self.manager.publish(topic='test', payload={'foo': 'bar'})
+
+        publisher._client.reconnect()
+        self.manager.publish(topic='test', payload={'foo': 'baz'})
+        assert publisher._connected.is_set()
+
+    def test_publish_to_invalid_topic(self):
+        with pytest.raises(BrokerPublishError):
+            self.manager.publish(topic='test/#', payload={})
+
+    @pytest.mark.timeout(10)
+    def test_publish_many(self):
+        messages = [
+            (f'test/{i}', {'i': i}, 1, True)
+            for i in range(10)
+        ]
+
+        results = self.manager.publish_many(messages)
+
+        assert [r.topic for r in results] == [m[0] for m in messages]
+        assert all(r.published for r in results)
+
+    @pytest.mark.timeout(10)
+    def test_publish_many_with_partial_failure(self):
+        messages = [
+            ('test/valid', {'foo': 'bar'}, 1, True),
+            ('test/#', {'foo': 'bar'}, 1, True),
+            ('test/other', {'foo': 'bar'}, 0, False),
+        ]
+
+        results = self.manager.publish_many(messages)
+
+        assert [r.published for r in results] == [True, False, True]
+        assert results[1].error is not None
+
+
+class TestAsyncMQTTManager:
+    def run(self, coroutine_function):
+        async def wrapper():
+            async with AsyncManager() as manager:
+                return await coroutine_function(manager)
+
+        return asyncio.run(wrapper())
+
+    def test_user_lifecycle(self):
+        async def lifecycle(manager):
+            await manager.create_user(username='async-test', password='test')
+            await manager.grant_user_permissions(username='async-test')
+            await manager.update_user_password(
+                username='async-test',
+                new_password='new',
+            )
+            await manager.delete_user(username='async-test')
+
+        self.run(lifecycle)
+
+    def test_concurrent_user_creation(self):
+        async def provision(manager):
+            names = [f'async-test-{i}' for i in range(10)]
+            await asyncio.gather(*(
+                manager.create_user(username=name, password='test')
+                for name in names
+            ))
+            await asyncio.gather(*(
+                manager.delete_user(username=name)
+                for name in names
+            ))
+
+        self.run(provision)
+
+    def test_create_user_without_username(self):
+        async def create(manager):
+            await manager.create_user(username=None, password='test')
+
+        with pytest.raises(InvalidUsername):
+            self.run(create)
+
+    def test_grant_unknown_user_permission(self):
+        async def grant(manager):
+            await manager.grant_user_permissions(username='async-unknown')
+
+        with pytest.raises(BrokerRequestError):
+            self.run(grant)
+
+    def test_delete_invalid_user(self):
+        async def delete(manager):
+            await manager.delete_user(username='async-unknown')
+
+        self.run(delete)
+
+    @pytest.mark.timeout(10)
+    def test_concurrent_publish(self):
+        async def publish(manager):
+            await asyncio.gather(*(
+                manager.publish(topic=f'test/{i}', payload={'i': i})
+                for i in range(50)
+            ))
+            await manager.publish(topic='test', payload={'foo': 'bar'})
+
+        self.run(publish)
+
+        manager = MQTTManager()
+        msg = subscribe.simple(
+            topics='test',
+            msg_count=1,
+            qos=1,
+            hostname=manager._hostname,
+            port=manager._port,
+            auth={
+                'username': manager._username,
+                'password': manager._password,
+            },
+        )
+        assert json.loads(msg.payload) == {'foo': 'bar'}
+
+    def test_publish_to_invalid_topic(self):
+        async def publish(manager):
+            await manager.publish(topic='test/#', payload={})
+
+        with pytest.raises(ValueError):
+            self.run(publish)
@@ -5,8 +5,18 @@ class HashSecretError(Exception):
     pass
 
 
+class VerificationPoolFull(Exception):
+    pass
+
+
 class BrokerConnectionError(APIException):
     status_code = 503
     default_detail = \
         'MQTT Broker service temporarily unavailable, try again later'
     default_code = 'mqtt_broker_service_unavailable'
+
+
+class SecretVerificationUnavailable(APIException):
+    status_code = 503
+    default_detail = 'Too many secret validations, try again later'
+    default_code = 'secret_verification_unavailable'
@@ -0,0 +1,205 @@
+import time
+import asyncio
+import logging
+import threading
+import socket
+from typing import Any, Optional
+from celery import current_app
+from django.conf import settings
+from django.db import transaction
+from kombu import Exchange, Queue
+from kombu.exceptions import OperationalError
+from . import twin
+from .models import Board
+
+
+logger = logging.getLogger(__name__)
+
+FEED_EXCHANGE = Exchange(
+    'microcontrollers.pin_changes',
+    type='fanout',
+    durable=False,
+)
+# Queued in place of the events a connection could not keep up with
+SNAPSHOT = object()
+
+
+def publish(events: list[dict[str, Any]]) -> None:
+    """Send committed pin changes to the feed, after the commit.
+
+    An event holds the ``board_id`` and the state of the pin (``number``,
+    ``value``, ``is_digital`` and ``version``).
+    """
+    if not settings.PIN_CHANGE_FEED or not events:
+        return
+
+    def send():
+        try:
+            with current_app.producer_pool.acquire(block=True) as producer:
+                producer.publish(
+                    {'events': events},
+                    exchange=FEED_EXCHANGE,
+                    declare=[FEED_EXCHANGE],
+                    retry=True,
+                    retry_policy={'max_retries': 2},
+                )
+        except (OperationalError, OSError):
+            # Connected clients see the change in their next snapshot
+            logger.warning('Could not publish %d pin changes', len(events),
+                           exc_info=True)
+
+    transaction.on_commit(send)
+
+
+def snapshot() -> dict[str, Any]:
+    """Desired state of every board, read from the device twin."""
+    board_ids = Board.objects.values_list('pk', flat=True)
+    return {
+        'boards': [
+            {'id': board_id} | state
+            for board_id, state in twin.snapshots(board_ids).items()
+        ],
+    }
+
+
+class Subscription:
+    """Events waiting to be sent to one connection.
+
+    The queue is bounded: when a client falls behind, its pending events are
+    dropped for a ``SNAPSHOT`` marker, and further events are ignored until
+    the marker is read. The snapshot sent then covers every dropped event.
+    Events may arrive older than the snapshot, clients keep the highest
+    version of each pin.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, size: int) -> None:
+        self.loop = loop
+        self.dropped = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self._overflowed = False
+
+    def put(self, events: list[dict[str, Any]]) -> None:
+        """Queue events, from the event loop of the connection."""
+        if self._overflowed:
+            self.dropped += len(events)
+            return
+
+        for event in events:
+            try:
+                self._queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.resync()
+                return
+
+    def resync(self) -> None:
+        """Replace the pending events with a snapshot."""
+        if self._overflowed:
+            return
+
+        self._overflowed = True
+        while not self._queue.empty():
+            self._queue.get_nowait()
+            self.dropped += 1
+
+        self._queue.put_nowait(SNAPSHOT)
+
+    async def get(self) -> Any:
+        event = await self._queue.get()
+        if event is SNAPSHOT:
+            self._overflowed = False
+
+        return event
+
+
+class ChangeFeedHub:
+    """Fans the pin change feed out to the connections of this process.
+
+    A single broker consumer, started with the first subscription, runs in
+    a thread and hands every message to the event loop of each connection.
+    Connections only share that consumer, so a slow one fills its own queue
+    and never delays the others.
+    """
+
+    def __init__(self) -> None:
+        self._subscriptions: set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(
+            loop=asyncio.get_running_loop(),
+            size=settings.PIN_CHANGE_FEED_BUFFER,
+        )
+        with self._lock:
+            self._subscriptions.add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._consume,
+                    name='pin-change-feed',
+                    daemon=True,
+                )
+                self._thread.start()
+
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def _call(self, method: str, *args) -> None:
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(
+                    getattr(subscription, method),
+                    *args,
+                )
+            except RuntimeError:  # pragma: no cover
+                # Its loop is closed, the connection is gone
+                self.unsubscribe(subscription)
+
+    def dispatch(self, events: list[dict[str, Any]]) -> None:
+        self._call('put', events)
+
+    def resync(self) -> None:
+        self._call('resync')
+
+    def _on_message(self, body, message) -> None:
+        self.dispatch(body.get('events', []))
+        message.ack()
+
+    def _consume(self) -> None:  # pragma: no cover
+        connection_errors = current_app.connection().connection_errors
+        reconnecting = False
+        while True:
+            try:
+                with current_app.connection_for_read() as connection:
+                    queue = Queue(
+                        exchange=FEED_EXCHANGE,
+                        exclusive=True,
+                        auto_delete=True,
+                    )
+                    consumer = connection.Consumer(
+                        queue,
+                        callbacks=[self._on_message],
+                    )
+                    with consumer:
+                        if reconnecting:
+                            # Changes published meanwhile were missed
+                            self.resync()
+
+                        while True:
+                            try:
+                                connection.drain_events(timeout=1)
+                            except socket.timeout:
+                                pass
+            except connection_errors as e:
+                logger.warning('Change feed connection lost (%s), '
+                               'reconnecting', e)
+                reconnecting = True
+                time.sleep(1)
+
+
+hub = ChangeFeedHub()
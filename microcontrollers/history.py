@@ -0,0 +1,231 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Iterable, Iterator, Optional
+from django.conf import settings
+from django.db import connection
+from django.db.models import QuerySet
+from django.utils import timezone
+from .models import Pin, PinHistory, PinRollup
+
+
+RAW = 'raw'
+RESOLUTIONS = {
+    'minute': PinRollup.Resolution.MINUTE,
+    'hour': PinRollup.Resolution.HOUR,
+}
+
+
+def retention(resolution: Optional[int] = None) -> timedelta:
+    """How long samples of a resolution (raw when ``None``) are kept."""
+    Resolution = PinRollup.Resolution
+    days = {
+        None: settings.PIN_HISTORY_RAW_RETENTION_DAYS,
+        Resolution.MINUTE: settings.PIN_HISTORY_MINUTE_RETENTION_DAYS,
+        Resolution.HOUR: settings.PIN_HISTORY_HOUR_RETENTION_DAYS,
+    }[resolution]
+    return timedelta(days=days)
+
+
+def bucket_start(at: datetime, resolution: int) -> datetime:
+    timestamp = at.timestamp() // resolution * resolution
+    return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+
+
+def _split(
+    start: datetime,
+    end: datetime,
+    resolution: int,
+) -> Iterator[tuple[datetime, float]]:
+    """Spread the ``start``-``end`` interval over the buckets it covers."""
+    bucket = bucket_start(start, resolution)
+    step = timedelta(seconds=resolution)
+    while bucket < end:
+        next_bucket = bucket + step
+        seconds = (min(end, next_bucket) - max(start, bucket)).total_seconds()
+        if seconds > 0:
+            yield bucket, seconds
+
+        bucket = next_bucket
+
+
+def _upsert_rollups(rows: dict[tuple[int, int, datetime], dict]) -> None:
+    # Concurrent writers add to the same buckets, so the increments are done
+    # by the database instead of a read-modify-write in Python
+    table = connection.ops.quote_name(PinRollup._meta.db_table)
+    columns = [
+        'pin_id', 'resolution', 'bucket',
+        'samples', 'minimum', 'maximum', 'total', 'on_seconds',
+    ]
+    placeholders = ', '.join(
+        f'({", ".join(["%s"] * len(columns))})'
+        for _ in rows
+    )
+    params = []
+    for (pin_id, resolution, bucket), row in sorted(rows.items()):
+        params += [
+            pin_id, resolution, bucket,
+            row['samples'], row['minimum'], row['maximum'],
+            row['total'], row['on_seconds'],
+        ]
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ({", ".join(columns)}) '
+            f'VALUES {placeholders} '
+            f'ON CONFLICT (pin_id, resolution, bucket) DO UPDATE SET '
+            f'samples = {table}.samples + EXCLUDED.samples, '
+            f'minimum = LEAST({table}.minimum, EXCLUDED.minimum), '
+            f'maximum = GREATEST({table}.maximum, EXCLUDED.maximum), '
+            f'total = {table}.total + EXCLUDED.total, '
+            f'on_seconds = {table}.on_seconds + EXCLUDED.on_seconds',
+            params,
+        )
+
+
+def record_changes(pins: Iterable[Pin], at: Optional[datetime] = None) -> None:
+    """Append the current value of each pin to its history.
+
+    ``pins`` must hold distinct pins. The samples are written with one
+    insert and the minute/hour rollups of the buckets they fall in are
+    updated in the same statement batch; the time a digital pin stayed ON
+    since its previous sample is credited to the buckets it spans.
+    """
+    pins = list(pins)
+    if not pins:
+        return
+
+    at = at or timezone.now()
+    previous = {
+        sample.pin_id: sample
+        for sample in PinHistory.objects.filter(
+            pin_id__in=[pin.pk for pin in pins],
+        ).order_by('pin_id', '-recorded').distinct('pin_id')
+    }
+
+    PinHistory.objects.bulk_create([
+        PinHistory(pin_id=pin.pk, value=pin.value, recorded=at)
+        for pin in pins
+    ])
+
+    rows = defaultdict(lambda: {
+        'samples': 0,
+        'minimum': None,
+        'maximum': None,
+        'total': 0,
+        'on_seconds': 0.0,
+    })
+    for pin in pins:
+        for resolution in RESOLUTIONS.values():
+            row = rows[(pin.pk, resolution, bucket_start(at, resolution))]
+            row['samples'] += 1
+            if not pin.is_digital:
+                value = int(pin.value)
+                if row['minimum'] is None:
+                    row['minimum'] = row['maximum'] = value
+
+                row['minimum'] = min(row['minimum'], value)
+                row['maximum'] = max(row['maximum'], value)
+                row['total'] += value
+
+        last = previous.get(pin.pk)
+        if last is None or last.value != 'ON':
+            continue
+
+        for resolution in RESOLUTIONS.values():
+            # Buckets already past their retention would be pruned anyway
+            start = max(last.recorded, at - retention(resolution))
+            for bucket, seconds in _split(start, at, resolution):
+                rows[(pin.pk, resolution, bucket)]['on_seconds'] += seconds
+
+    _upsert_rollups(rows)
+
+
+def choose_resolution(start: datetime, end: datetime) -> Optional[int]:
+    """Finest resolution covering the range in at most the max points.
+
+    Returns ``None`` for the raw samples. A resolution whose retention does
+    not reach ``start`` is skipped for a coarser one.
+    """
+    now = timezone.now()
+    max_points = settings.PIN_HISTORY_MAX_POINTS
+    span = (end - start).total_seconds()
+
+    # Raw samples are counted as one per minute, pins rarely change faster
+    if start >= now - retention() and \
+            span <= max_points * PinRollup.Resolution.MINUTE:
+        return None
+
+    for resolution in RESOLUTIONS.values():
+        if start >= now - retention(resolution) and \
+                span / resolution <= max_points:
+            return resolution
+
+    return PinRollup.Resolution.HOUR
+
+
+def read_history(
+    pin: Pin,
+    start: datetime,
+    end: datetime,
+    resolution: Optional[str] = None,
+) -> tuple[str, QuerySet]:
+    """Return the resolution name and the samples of a pin in a range."""
+    if resolution is None:
+        chosen = choose_resolution(start, end)
+    else:
+        # Unknown names, like ``raw``, read the samples themselves
+        chosen = RESOLUTIONS.get(resolution)
+
+    if chosen is None:
+        samples = PinHistory.objects.filter(
+            pin=pin,
+            recorded__gte=start,
+            recorded__lt=end,
+        ).order_by('recorded')
+        return RAW, samples
+
+    rollups = PinRollup.objects.filter(
+        pin=pin,
+        resolution=chosen,
+        bucket__gte=bucket_start(start, chosen),
+        bucket__lt=end,
+    ).order_by('bucket')
+    return PinRollup.Resolution(chosen).label.lower(), rollups
+
+
+def _delete_in_batches(queryset: QuerySet, batch_size: int) -> int:
+    deleted = 0
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+
+        deleted += queryset.model.objects.filter(pk__in=pks).delete()[0]
+
+
+def prune(now: Optional[datetime] = None, batch_size: int = 10000) -> int:
+    """Drop the samples and rollups past their retention.
+
+    Cutoffs are aligned on whole hours, so every run removes complete
+    buckets and a chart never shows a partially pruned one. Deletions go in
+    batches to keep each transaction short.
+    """
+    now = now or timezone.now()
+    hour = PinRollup.Resolution.HOUR
+
+    deleted = _delete_in_batches(
+        PinHistory.objects.filter(
+            recorded__lt=bucket_start(now - retention(), hour),
+        ),
+        batch_size,
+    )
+    for resolution in RESOLUTIONS.values():
+        deleted += _delete_in_batches(
+            PinRollup.objects.filter(
+                resolution=resolution,
+                bucket__lt=bucket_start(now - retention(resolution), hour),
+            ),
+            batch_size,
+        )
+
+    return deleted
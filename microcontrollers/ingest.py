@@ -0,0 +1,260 @@
+import re
+import json
+import time
+import logging
+from collections import OrderedDict
+from json.decoder import JSONDecodeError
+from typing import Any, Optional
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from . import presence, reconciliation, versions
+from .models import Board, Pin
+from .validators import is_valid_pin_value
+from .verification import fingerprint, read_session_token
+
+
+logger = logging.getLogger(__name__)
+
+REPORT_TOPIC = 'boards/+/reports'
+REPORT_TOPIC_REGEX = re.compile(r'^boards/(\d+)/reports$')
+STATUS_TOPIC = 'boards/+/status'
+STATUS_TOPIC_REGEX = re.compile(r'^boards/(\d+)/status$')
+STATUS_PAYLOADS = {b'online': True, b'offline': False}
+
+
+def subscription_topic(
+    group: Optional[str] = None,
+    topic: str = REPORT_TOPIC,
+) -> str:
+    """Topic filter of the report subscription.
+
+    With a group, every ingest process joins the same MQTT shared
+    subscription and the broker spreads the reports among them.
+    """
+    if group:
+        return f'$share/{group}/{topic}'
+
+    return topic
+
+
+class Ingestor:
+    """Collects pin reports of the boards and stores them in batches.
+
+    A report is a JSON message published to ``boards/{id}/reports``:
+
+        {"token": "<session token>", "pins": [{"number": 13, "value": "ON"}]}
+
+    The token is the one returned by the ``validate-secret`` action, so the
+    sender is checked with a signature instead of an argon2 verification.
+    Reports are buffered (the latest value of each pin wins) and flushed
+    with one multi-row UPDATE once ``batch_size`` pins are waiting or
+    ``interval`` seconds have passed.
+
+    Reports are stored as the ``reported_value`` of the pins, the desired
+    ``value`` is only changed through the API. Boards reporting a value other
+    than the desired one, and boards coming back online (announced on their
+    status topic, or reporting while the presence table has them offline or
+    not at all), are reconciled: the mismatched pins are published again.
+
+    Every accepted report is a heartbeat of its board, and boards may also
+    publish ``online``/``offline`` to ``boards/{id}/status`` (the latter
+    usually as their last will). Both update the presence table on flush.
+    """
+
+    TOKEN_CACHE_SIZE = 4096
+
+    def __init__(
+        self,
+        batch_size: int = 500,
+        interval: float = 1.0,
+    ) -> None:
+        self.batch_size = batch_size
+        self.interval = interval
+        self.received = 0
+        self.rejected = 0
+        self.stored = 0
+        # (board id, pin number) -> (value, fingerprint of the sender key)
+        self._pending: dict[tuple[int, int], tuple[str, str]] = {}
+        self._tokens: OrderedDict[str, dict] = OrderedDict()
+        # board id -> whether it is online
+        self._presence: dict[int, bool] = {}
+        # Boards that published ``online`` to their status topic
+        self._announced: set[int] = set()
+        self._last_flush = time.monotonic()
+
+    def _read_token(self, token: str) -> Optional[dict]:
+        payload = self._tokens.get(token)
+        if payload is not None:
+            expired = time.time() - payload['issued'] > \
+                settings.DEVICE_SESSION_TTL
+            if expired:
+                del self._tokens[token]
+                return None
+
+            self._tokens.move_to_end(token)
+            return payload
+
+        payload = read_session_token(token)
+        if payload is not None:
+            self._tokens[token] = payload
+            if len(self._tokens) > self.TOKEN_CACHE_SIZE:
+                self._tokens.popitem(last=False)
+
+        return payload
+
+    def _reject(self, reason: str, topic: str) -> None:
+        self.rejected += 1
+        logger.debug('Rejected report on "%s": %s', topic, reason)
+
+    def handle(self, topic: str, payload: bytes) -> None:
+        self.received += 1
+
+        match = STATUS_TOPIC_REGEX.match(topic)
+        if match:
+            return self._handle_status(int(match.group(1)), payload, topic)
+
+        match = REPORT_TOPIC_REGEX.match(topic)
+        if not match:
+            return self._reject('unknown topic', topic)
+
+        board_id = int(match.group(1))
+        try:
+            report = json.loads(payload)
+            token = report['token']
+            pins = report['pins']
+        except (JSONDecodeError, KeyError, TypeError):
+            return self._reject('malformed report', topic)
+
+        if not isinstance(token, str) or not isinstance(pins, list):
+            return self._reject('malformed report', topic)
+
+        session = self._read_token(token)
+        if session is None or session['board'] != board_id:
+            return self._reject('invalid token', topic)
+
+        self._presence[board_id] = True
+        for pin in pins:
+            try:
+                key = (board_id, int(pin['number']))
+                self._pending[key] = (str(pin['value']), session['key'])
+            except (KeyError, TypeError, ValueError):
+                self._reject('malformed pin', topic)
+
+        if self.should_flush():
+            self.flush()
+
+    def _handle_status(
+        self,
+        board_id: int,
+        payload: bytes,
+        topic: str,
+    ) -> None:
+        online = STATUS_PAYLOADS.get(payload.strip().lower())
+        if online is None:
+            return self._reject('unknown status', topic)
+
+        self._presence[board_id] = online
+        if online:
+            self._announced.add(board_id)
+        else:
+            self._announced.discard(board_id)
+
+    def should_flush(self) -> bool:
+        elapsed = time.monotonic() - self._last_flush
+        return bool(self._pending or self._presence) and (
+            len(self._pending) >= self.batch_size or
+            elapsed >= self.interval
+        )
+
+    def _were_offline(self, statuses: dict[int, bool]) -> set[int]:
+        """Boards back online that the presence table saw offline.
+
+        A board missing from it counts as offline: its entry expired after
+        ``BOARD_PRESENCE_TIMEOUT`` without heartbeats, as after a power loss.
+        """
+        online = {board for board, status in statuses.items() if status}
+        entries = presence.read(online)
+        return {
+            board
+            for board in online
+            if board not in entries or not entries[board]['online']
+        }
+
+    def _registered_boards(self, board_ids: set[int]) -> dict[int, str]:
+        boards = Board.objects.filter(
+            pk__in=board_ids,
+            status=Board.Status.ACTIVATED,
+        ).values_list('pk', 'secret')
+
+        return {pk: fingerprint(secret) for pk, secret in boards}
+
+    def flush(self) -> int:
+        """Store the buffered reports, return how many pins changed."""
+        pending, self._pending = self._pending, {}
+        self._last_flush = time.monotonic()
+
+        statuses, self._presence = self._presence, {}
+        announced, self._announced = self._announced, set()
+        reconnected = announced | self._were_offline(statuses)
+        presence.mark(statuses)
+
+        if not pending:
+            reconciliation.schedule(reconnected)
+            return 0
+
+        # The fingerprint changes with the secret, so reports signed with a
+        # token issued before a secret rotation are refused here
+        boards = self._registered_boards({board for board, _ in pending})
+        accepted = {
+            key: value
+            for key, (value, sender) in pending.items()
+            if boards.get(key[0]) == sender
+        }
+        self.rejected += len(pending) - len(accepted)
+
+        pins = Pin.objects.filter(
+            board_id__in={board for board, _ in accepted},
+            number__in={number for _, number in accepted},
+        ).only('pk', 'board_id', 'number', 'value', 'is_digital',
+               'reported_value')
+
+        now = timezone.now()
+        changed, mismatched = [], set()
+        for pin in pins:
+            value = accepted.get((pin.board_id, pin.number))
+            if value is None:
+                continue
+
+            if not is_valid_pin_value(value, pin.is_digital):
+                self.rejected += 1
+                continue
+
+            if value != pin.value:
+                mismatched.add(pin.board_id)
+            if value == pin.reported_value:
+                continue
+
+            pin.reported_value = value
+            pin.reported = now
+            changed.append(pin)
+
+        with transaction.atomic():
+            Pin.objects.bulk_update(
+                changed,
+                ['reported_value', 'reported'],
+                batch_size=self.batch_size,
+            )
+
+        versions.bump({pin.board_id for pin in changed}, pins=True)
+        reconciliation.schedule(reconnected | mismatched)
+        self.stored += len(changed)
+        return len(changed)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            'received': self.received,
+            'rejected': self.rejected,
+            'stored': self.stored,
+            'pending': len(self._pending),
+        }
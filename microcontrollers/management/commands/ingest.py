@@ -0,0 +1,136 @@
+import time
+import socket
+import logging
+from contextlib import suppress
+from typing import Optional
+import paho.mqtt.client as mqtt
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from ...ingest import (
+    Ingestor,
+    REPORT_TOPIC,
+    STATUS_TOPIC,
+    subscription_topic,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Store the pin reports published by the registered boards'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--group',
+            default=settings.INGEST_SHARED_GROUP,
+            help=(
+                'MQTT shared subscription group, every process started with '
+                'the same group receives a share of the reports'
+            ),
+        )
+        parser.add_argument(
+            '--worker',
+            type=int,
+            default=0,
+            help=(
+                'Index of this process among those of the group running on '
+                'the same host, part of its MQTT client id'
+            ),
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.INGEST_BATCH_SIZE,
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.INGEST_FLUSH_INTERVAL,
+            help='Maximum seconds a report waits before being stored',
+        )
+
+    @staticmethod
+    def client_id(group: str, worker: int) -> str:
+        """Stable id of a group member, so the broker keeps its session."""
+        return f'ingest-{group}-{socket.gethostname()}-{worker}'
+
+    def make_client(self, group: Optional[str], worker: int) -> mqtt.Client:
+        # Members of a group keep a persistent session, to get the reports
+        # published while they reconnect
+        if group:
+            return mqtt.Client(
+                mqtt.CallbackAPIVersion.VERSION2,
+                client_id=self.client_id(group, worker),
+                clean_session=False,
+            )
+
+        return mqtt.Client(
+            mqtt.CallbackAPIVersion.VERSION2,
+            clean_session=True,
+        )
+
+    def handle(self, *args, **options):
+        # Presence, reconciliations and versions are read by other processes
+        if not settings.CACHE_SHARED:
+            raise CommandError(
+                'The ingest needs a cache shared with the API and the '
+                'workers, set CACHE_REDIS_URL',
+            )
+
+        ingestor = Ingestor(
+            batch_size=options['batch_size'],
+            interval=options['interval'],
+        )
+        topics = [
+            subscription_topic(options['group'], topic)
+            for topic in (REPORT_TOPIC, STATUS_TOPIC)
+        ]
+
+        def on_connect(client, userdata, flags, reason, properties):
+            if not reason.is_failure:
+                client.subscribe([(topic, 1) for topic in topics])
+                logger.info('Subscribed to %s', ', '.join(topics))
+
+        def on_message(client, userdata, message):
+            ingestor.handle(message.topic, message.payload)
+
+        client = self.make_client(options['group'], options['worker'])
+        client.username_pw_set(
+            settings.MQTT_BROKER_USERNAME,
+            settings.MQTT_BROKER_PASSWORD,
+        )
+        client.on_connect = on_connect
+        client.on_message = on_message
+        client.reconnect_delay_set(min_delay=1, max_delay=30)
+
+        try:
+            client.connect(
+                host=settings.MQTT_BROKER_HOST,
+                port=int(settings.MQTT_BROKER_PORT),
+            )
+        except OSError as e:
+            raise CommandError(f'Could not connect to the broker: {e}') from e
+
+        try:
+            # Flushes run between network iterations, so the buffer is never
+            # touched by two threads
+            while True:
+                rc = client.loop(timeout=min(options['interval'], 1.0))
+                if rc != mqtt.MQTT_ERR_SUCCESS:
+                    logger.warning(
+                        'Broker connection lost (%s), reconnecting',
+                        mqtt.error_string(rc),
+                    )
+                    time.sleep(1)
+                    with suppress(OSError):
+                        client.reconnect()
+
+                if ingestor.should_flush():
+                    ingestor.flush()
+                    logger.info('Ingest stats: %s', ingestor.stats())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            ingestor.flush()
+            client.disconnect()
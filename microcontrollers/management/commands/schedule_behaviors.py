@@ -0,0 +1,66 @@
+import time
+import socket
+import logging
+from celery import current_app
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from kombu import Queue
+from ...scheduler import BEHAVIOR_EXCHANGE, BehaviorScheduler
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Fire the periodic pin and scene behaviors'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reload-interval',
+            type=float,
+            default=settings.BEHAVIOR_SCHEDULER_RELOAD_INTERVAL,
+            help=(
+                'Seconds between full reloads of the schedule, which catch '
+                'the changes whose announcement was lost'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        scheduler = BehaviorScheduler(app=current_app)
+
+        def on_message(body, message):
+            scheduler.apply(body)
+            message.ack()
+
+        connection_errors = current_app.connection().connection_errors
+        while True:
+            try:
+                self._run(scheduler, on_message, options['reload_interval'])
+            except KeyboardInterrupt:
+                return
+            except connection_errors as e:
+                logger.warning('Broker connection lost (%s), reconnecting', e)
+                time.sleep(1)
+
+    def _run(self, scheduler, on_message, reload_interval: float) -> None:
+        with current_app.connection_for_read() as connection:
+            # Subscribed before loading, so no change falls in between
+            queue = Queue(
+                exchange=BEHAVIOR_EXCHANGE,
+                exclusive=True,
+                auto_delete=True,
+            )
+            with connection.Consumer(queue, callbacks=[on_message]):
+                scheduler.load()
+                reloaded = time.monotonic()
+
+                while True:
+                    delay = scheduler.tick()
+                    try:
+                        connection.drain_events(timeout=delay)
+                    except socket.timeout:
+                        pass
+
+                    if time.monotonic() - reloaded >= reload_interval:
+                        scheduler.load()
+                        reloaded = time.monotonic()
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('microcontrollers', '0002_auto_20210123_1735'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='board',
+            name='payload_format',
+            field=models.CharField(choices=[('json', 'JSON'), ('binary', 'Binary')], default='json', max_length=6),
+        ),
+    ]
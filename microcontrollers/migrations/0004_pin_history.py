@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('microcontrollers', '0003_board_payload_format'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PinHistory',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('value', models.CharField(max_length=4)),
+                ('recorded', models.DateTimeField()),
+                ('pin', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='microcontrollers.pin')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['pin', 'recorded'], name='microcontro_pin_id_5c4637_idx'), models.Index(fields=['recorded'], name='microcontro_recorde_a8c3fc_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PinRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.PositiveIntegerField(choices=[(60, 'Minute'), (3600, 'Hour')])),
+                ('bucket', models.DateTimeField()),
+                ('samples', models.PositiveIntegerField(default=0)),
+                ('minimum', models.PositiveIntegerField(null=True)),
+                ('maximum', models.PositiveIntegerField(null=True)),
+                ('total', models.BigIntegerField(default=0)),
+                ('on_seconds', models.FloatField(default=0)),
+                ('pin', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='microcontrollers.pin')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['resolution', 'bucket'], name='microcontro_resolut_93e93d_idx')],
+                'constraints': [models.UniqueConstraint(fields=('pin', 'resolution', 'bucket'), name='unique rollup bucket per pin')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('microcontrollers', '0004_pin_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='board',
+            name='last_seen',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('microcontrollers', '0005_board_last_seen'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pin',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:39
+
+import django.db.models.deletion
+import microcontrollers.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_celery_beat', '0019_alter_periodictasks_options'),
+        ('microcontrollers', '0006_pin_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Scene',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('description', models.CharField(blank=True, max_length=512, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SceneAssignment',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.CharField(max_length=4, validators=[microcontrollers.validators.validate_pin_value])),
+                ('pin', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='microcontrollers.pin')),
+                ('scene', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='assignments', to='microcontrollers.scene')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='scene',
+            name='pins',
+            field=models.ManyToManyField(through='microcontrollers.SceneAssignment', to='microcontrollers.pin'),
+        ),
+        migrations.CreateModel(
+            name='PeriodicSceneBehavior',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='django_celery_beat.periodictask')),
+                ('scene', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='microcontrollers.scene')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created'], name='microcontro_created_a4ee7b_idx'), models.Index(fields=['updated'], name='microcontro_updated_f8e24b_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='sceneassignment',
+            constraint=models.UniqueConstraint(fields=('scene', 'pin'), name='unique pin per scene'),
+        ),
+        migrations.AddIndex(
+            model_name='scene',
+            index=models.Index(fields=['created'], name='microcontro_created_5ff232_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scene',
+            index=models.Index(fields=['updated'], name='microcontro_updated_84331d_idx'),
+        ),
+    ]
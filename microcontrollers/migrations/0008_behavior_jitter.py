@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:42
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('microcontrollers', '0007_scenes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='periodicpinbehavior',
+            name='jitter',
+            field=models.PositiveIntegerField(default=0, help_text='Seconds the firing may be delayed to smooth the load', validators=[django.core.validators.MaxValueValidator(3600)]),
+        ),
+        migrations.AddField(
+            model_name='periodicscenebehavior',
+            name='jitter',
+            field=models.PositiveIntegerField(default=0, help_text='Seconds the firing may be delayed to smooth the load', validators=[django.core.validators.MaxValueValidator(3600)]),
+        ),
+    ]
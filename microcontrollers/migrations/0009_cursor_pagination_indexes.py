@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_celery_beat', '0019_alter_periodictasks_options'),
+        ('microcontrollers', '0008_behavior_jitter'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='board',
+            name='microcontro_created_f475de_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='periodicpinbehavior',
+            name='microcontro_created_33a912_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='pin',
+            name='microcontro_created_113565_idx',
+        ),
+        migrations.AddIndex(
+            model_name='board',
+            index=models.Index(fields=['created', 'id'], name='microcontro_created_2f6350_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='periodicpinbehavior',
+            index=models.Index(fields=['created', 'id'], name='microcontro_created_981868_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pin',
+            index=models.Index(fields=['created', 'id'], name='microcontro_created_abcede_idx'),
+        ),
+    ]
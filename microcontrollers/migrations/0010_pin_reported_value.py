@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('microcontrollers', '0009_cursor_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pin',
+            name='reported',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pin',
+            name='reported_value',
+            field=models.CharField(blank=True, max_length=4, null=True),
+        ),
+    ]
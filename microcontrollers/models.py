@@ -1,11 +1,17 @@
+from collections import defaultdict
 from argon2 import PasswordHasher
-from argon2.exceptions import HashingError, VerifyMismatchError
+from argon2.exceptions import HashingError
+from django.core.validators import MaxValueValidator
 from django.db import models, transaction
+from django.utils import timezone
 from django_celery_beat.models import PeriodicTask
 from cloudroom.mqtt import Manager as MQTTManager
 from .exceptions import HashSecretError
 from .validators import validate_pin_value
-from .utils import build_topic
+from .verification import verify_secret
+
+
+MAX_BEHAVIOR_JITTER = 60 * 60
 
 
 class Board(models.Model):
@@ -14,6 +20,10 @@ class Board(models.Model):
         ACTIVATED = 2
         BLOCKED = 3
 
+    class PayloadFormat(models.TextChoices):
+        JSON = 'json', 'JSON'
+        BINARY = 'binary'
+
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
@@ -23,8 +33,15 @@ class Board(models.Model):
         choices=Status.choices,
         default=Status.DEACTIVATED,
     )
+    payload_format = models.CharField(
+        max_length=6,
+        choices=PayloadFormat.choices,
+        default=PayloadFormat.JSON,
+    )
+    last_seen = models.DateTimeField(null=True, blank=True)
 
-    def _hash_secret(self, secret: str) -> str:
+    @staticmethod
+    def _hash_secret(secret: str) -> str:
         ph = PasswordHasher()
         try:
             hash = ph.hash(secret)
@@ -34,13 +51,11 @@ class Board(models.Model):
         return hash
 
     def verify_secret(self, secret: str) -> bool:
-        ph = PasswordHasher()
-        try:
-            ph.verify(self.secret, secret)
-        except VerifyMismatchError:
+        match, needs_rehash = verify_secret(hash=self.secret, secret=secret)
+        if not match:
             return False
 
-        if ph.check_needs_rehash(self.secret):  # pragma: no cover
+        if needs_rehash:  # pragma: no cover
             self.secret = self._hash_secret(secret=secret)
             self.save()
 
@@ -55,6 +70,9 @@ class Board(models.Model):
 
     @transaction.atomic()
     def save(self, *args, **kwargs):
+        from .notifications import forget_payload_format
+        from .versions import bump
+
         if not self.pk:
             manager = MQTTManager()
             manager.create_user(username=self.name, password=self.secret)
@@ -62,11 +80,20 @@ class Board(models.Model):
             self.secret = self._hash_secret(secret=self.secret)
 
         super().save(*args, **kwargs)
+        transaction.on_commit(lambda: forget_payload_format(self.pk))
+        transaction.on_commit(lambda: bump([self.pk]))
 
     @transaction.atomic()
     def delete(self, **kwargs) -> tuple[int, dict[str, int]]:
+        from .twin import forget
+        from .versions import bump
+
         manager = MQTTManager()
         manager.delete_user(username=self.name)
+        pk = self.pk
+        transaction.on_commit(lambda: forget(pk))
+        # Its pins are deleted along
+        transaction.on_commit(lambda: bump([pk], pins=True))
         return super().delete(**kwargs)
 
     def __str__(self):  # pragma: no cover
@@ -74,7 +101,8 @@ class Board(models.Model):
 
     class Meta:
         indexes = [
-            models.Index(fields=['created']),
+            # Keyset of the cursor pagination
+            models.Index(fields=['created', 'id']),
             models.Index(fields=['updated']),
             models.Index(fields=['status']),
         ]
@@ -90,24 +118,145 @@ class Pin(models.Model):
     value = models.CharField(max_length=4, validators=[validate_pin_value])
     is_digital = models.BooleanField(default=True)
     description = models.CharField(max_length=512, null=True, blank=True)
+    # Bumped on every change, lets boards drop notifications arriving late
+    version = models.PositiveIntegerField(default=0)
+    # Last value the board reported for the pin, ``value`` is the desired one
+    reported_value = models.CharField(max_length=4, null=True, blank=True)
+    reported = models.DateTimeField(null=True, blank=True)
 
     def __str__(self) -> str:  # pragma: no cover
         return f'Pin #{self.number} - "{self.name}"; from {self.board}'
 
+    @property
+    def state(self) -> dict:
+        """What the board is told about the pin."""
+        return {
+            'number': self.number,
+            'value': self.value,
+            'is_digital': self.is_digital,
+            'version': self.version,
+        }
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_value = instance.__dict__.get('value')
+        return instance
+
     @transaction.atomic()
     def save(self, *args, **kwargs) -> None:
-        from .tasks import notify_board
+        from . import feed, twin
+        from .history import record_changes
+        from .notifications import notify_pin_change
+        from .versions import bump
+
+        adding = self._state.adding
+        changed = adding or \
+            self.value != getattr(self, '_stored_value', None)
+
+        if not adding:
+            # Read under a lock, so concurrent saves each take the next one
+            stored = Pin.objects.select_for_update().filter(
+                pk=self.pk,
+            ).values_list('version', flat=True).first()
+            if stored is not None:
+                self.version = stored
 
-        topic = build_topic(board_id=self.board.pk)
-        transaction.on_commit(lambda: notify_board.delay(
-            topic=topic,
+        self.version += 1
+        result = super().save(*args, **kwargs)
+
+        # Taken now, later changes to the instance are not the committed state
+        state, updated = self.state, self.updated.timestamp()
+        transaction.on_commit(lambda: notify_pin_change(
+            board_id=self.board_id,
             pin_id=self.pk,
+            state=state,
+            changed=updated,
         ))
-        return super().save(*args, **kwargs)
+        if adding:
+            transaction.on_commit(lambda: twin.forget(self.board_id))
+        else:
+            transaction.on_commit(
+                lambda: twin.update(self.board_id, {self.pk: state}),
+            )
+        transaction.on_commit(lambda: bump([self.board_id], pins=True))
+        feed.publish([{'board_id': self.board_id} | state])
+
+        if changed:
+            record_changes([self])
+            self._stored_value = self.value
+
+        return result
+
+    @transaction.atomic()
+    def delete(self, **kwargs) -> tuple[int, dict[str, int]]:
+        from .twin import forget
+        from .versions import bump
+
+        board_id = self.board_id
+        transaction.on_commit(lambda: forget(board_id))
+        transaction.on_commit(lambda: bump([board_id], pins=True))
+        return super().delete(**kwargs)
+
+    @classmethod
+    @transaction.atomic()
+    def bulk_save(cls, pins: list['Pin']) -> None:
+        """Store pins changed in memory with one UPDATE.
+
+        Value changes go to the history and every board is notified once
+        for all of its pins, after the commit.
+        """
+        from .feed import publish
+        from .history import record_changes
+        from .notifications import notify_pins_change
+        from .twin import update_pins
+        from .versions import bump
+
+        if not pins:
+            return
+
+        # Locked in pk order, so concurrent bulk saves cannot deadlock
+        stored = dict(
+            cls.objects.select_for_update().filter(
+                pk__in=[pin.pk for pin in pins],
+            ).order_by('pk').values_list('pk', 'version')
+        )
+
+        now = timezone.now()
+        for pin in pins:
+            pin.updated = now
+            pin.version = stored.get(pin.pk, pin.version) + 1
+
+        cls.objects.bulk_update(
+            pins,
+            ['value', 'is_digital', 'updated', 'version'],
+        )
+
+        changed = [
+            pin
+            for pin in pins
+            if pin.value != getattr(pin, '_stored_value', None)
+        ]
+        record_changes(changed, at=now)
+        for pin in changed:
+            pin._stored_value = pin.value
+
+        boards = defaultdict(list)
+        for pin in pins:
+            boards[pin.board_id].append(pin.pk)
+
+        def notify():
+            update_pins(pins)
+            bump(boards, pins=True)
+            for board_id, pin_ids in boards.items():
+                notify_pins_change(board_id=board_id, pin_ids=pin_ids)
+
+        transaction.on_commit(notify)
+        publish([{'board_id': pin.board_id} | pin.state for pin in pins])
 
     class Meta:
         indexes = [
-            models.Index(fields=['created']),
+            models.Index(fields=['created', 'id']),
             models.Index(fields=['updated']),
             models.Index(fields=['number']),
             models.Index(fields=['value']),
@@ -138,14 +287,132 @@ class PeriodicPinBehavior(models.Model):
 
     task = models.ForeignKey(PeriodicTask, on_delete=models.CASCADE)
     pin = models.ForeignKey(Pin, on_delete=models.CASCADE)
+    jitter = models.PositiveIntegerField(
+        default=0,
+        validators=[MaxValueValidator(MAX_BEHAVIOR_JITTER)],
+        help_text='Seconds the firing may be delayed to smooth the load',
+    )
 
     @transaction.atomic()
     def delete(self, *args, **kwargs) -> tuple[int, dict[str, int]]:
+        from .scheduler import DELETE, announce
+
+        announce(self, DELETE)
         self.task.delete()
         return super().delete(*args, **kwargs)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created', 'id']),
+            models.Index(fields=['updated']),
+        ]
+
+
+class Scene(models.Model):
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    name = models.CharField(max_length=50, unique=True)
+    description = models.CharField(max_length=512, null=True, blank=True)
+    pins = models.ManyToManyField(Pin, through='SceneAssignment')
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f'Scene #{self.pk} - "{self.name}"'
+
     class Meta:
         indexes = [
             models.Index(fields=['created']),
             models.Index(fields=['updated']),
         ]
+
+
+class SceneAssignment(models.Model):
+    scene = models.ForeignKey(
+        Scene,
+        on_delete=models.CASCADE,
+        related_name='assignments',
+    )
+    pin = models.ForeignKey(Pin, on_delete=models.CASCADE)
+    value = models.CharField(max_length=4, validators=[validate_pin_value])
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['scene', 'pin'],
+                name='unique pin per scene',
+            ),
+        ]
+
+
+class PeriodicSceneBehavior(models.Model):
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    task = models.ForeignKey(PeriodicTask, on_delete=models.CASCADE)
+    scene = models.ForeignKey(Scene, on_delete=models.CASCADE)
+    jitter = models.PositiveIntegerField(
+        default=0,
+        validators=[MaxValueValidator(MAX_BEHAVIOR_JITTER)],
+        help_text='Seconds the firing may be delayed to smooth the load',
+    )
+
+    @transaction.atomic()
+    def delete(self, *args, **kwargs) -> tuple[int, dict[str, int]]:
+        from .scheduler import DELETE, announce
+
+        announce(self, DELETE)
+        self.task.delete()
+        return super().delete(*args, **kwargs)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created']),
+            models.Index(fields=['updated']),
+        ]
+
+
+class PinHistory(models.Model):
+    id = models.BigAutoField(primary_key=True)
+    pin = models.ForeignKey(Pin, on_delete=models.CASCADE)
+    value = models.CharField(max_length=4)
+    recorded = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['pin', 'recorded']),
+            models.Index(fields=['recorded']),
+        ]
+
+
+class PinRollup(models.Model):
+    class Resolution(models.IntegerChoices):
+        MINUTE = 60
+        HOUR = 60 * 60
+
+    pin = models.ForeignKey(Pin, on_delete=models.CASCADE)
+    resolution = models.PositiveIntegerField(choices=Resolution.choices)
+    bucket = models.DateTimeField()
+
+    samples = models.PositiveIntegerField(default=0)
+    minimum = models.PositiveIntegerField(null=True)
+    maximum = models.PositiveIntegerField(null=True)
+    total = models.BigIntegerField(default=0)
+    on_seconds = models.FloatField(default=0)
+
+    @property
+    def average(self):
+        if self.minimum is None or not self.samples:
+            return None
+
+        return self.total / self.samples
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['resolution', 'bucket']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['pin', 'resolution', 'bucket'],
+                name='unique rollup bucket per pin',
+            ),
+        ]
@@ -0,0 +1,238 @@
+from hashlib import blake2b
+from typing import Any, Hashable, Optional
+from django.conf import settings
+from django.core.cache import cache, caches
+from .utils import build_topic
+
+
+class SlotBuffer:
+    """Items written by many processes, read in order by one flusher.
+
+    Every item takes the next slot of a sequence (``incr`` is atomic on the
+    shared cache), so concurrent writers never overwrite each other. The
+    reader only advances over contiguous slots: a slot reserved but not
+    written yet is picked up by the next flush, and skipped if it is still
+    empty by then (its writer died between both calls).
+    """
+
+    def __init__(self, prefix: str, ttl: int) -> None:
+        self._prefix = prefix
+        self._sequence_key = f'{self._prefix}:sequence'
+        self._flushed_key = f'{self._prefix}:flushed'
+        self._pending_key = f'{self._prefix}:pending'
+        self._gap_key = f'{self._prefix}:gap'
+        self._ttl = ttl
+
+    def _slot_key(self, slot: int) -> str:
+        return f'{self._prefix}:slot:{slot}'
+
+    def push_many(self, items: list[Hashable]) -> bool:
+        """Buffer items, return ``True`` if a flush must be scheduled.
+
+        All their slots are reserved at once.
+        """
+        cache.add(self._sequence_key, 0, timeout=None)
+        last = cache.incr(self._sequence_key, len(items))
+        cache.set_many(
+            {
+                self._slot_key(slot): item
+                for slot, item in enumerate(
+                    items,
+                    start=last - len(items) + 1,
+                )
+            },
+            timeout=self._ttl,
+        )
+        return cache.add(self._pending_key, True, timeout=self._ttl)
+
+    def peek(self) -> tuple[list[Hashable], int]:
+        """Return the distinct buffered items and the last slot read."""
+        # New changes must schedule another flush from now on
+        cache.delete(self._pending_key)
+
+        flushed = cache.get(self._flushed_key, 0)
+        sequence = cache.get(self._sequence_key, 0)
+        keys = [
+            self._slot_key(slot)
+            for slot in range(flushed + 1, sequence + 1)
+        ]
+        slots = cache.get_many(keys)
+
+        gap = cache.get(self._gap_key)
+        items = []
+        for slot, key in enumerate(keys, start=flushed + 1):
+            if key not in slots and slot != gap:
+                cache.set(self._gap_key, slot, timeout=self._ttl)
+                break
+
+            if key in slots:
+                items.append(slots[key])
+
+            flushed = slot
+
+        return list(dict.fromkeys(items)), flushed
+
+    def commit(self, flushed: int) -> bool:
+        """Mark slots as sent, return ``True`` if a flush must follow."""
+        cache.set(self._flushed_key, flushed, timeout=None)
+        if cache.get(self._sequence_key, 0) <= flushed:
+            return False
+
+        return cache.add(self._pending_key, True, timeout=self._ttl)
+
+
+class PinChangeBuffer(SlotBuffer):
+    """Pins of a board changed since its last notification."""
+
+    def __init__(self, board_id: int) -> None:
+        super().__init__(
+            prefix=f'notifications:board:{board_id}',
+            ttl=settings.BOARD_NOTIFICATION_BUFFER_TTL,
+        )
+
+    def push(self, pin_id: int) -> bool:
+        """Buffer the change, return ``True`` if a flush must be scheduled."""
+        return self.push_many([pin_id])
+
+
+class PublishedDigests:
+    """Digest of the last state published for each pin of a board.
+
+    Lives in its own cache alias, which bounds its memory (LRU culling on the
+    local memory backend, ``maxmemory`` plus TTL on Redis) and is shared by
+    every worker when backed by Redis.
+    """
+
+    SUPPRESSED_KEY = 'notifications:suppressed'
+
+    def __init__(self, board_id: int, codec: str) -> None:
+        self._cache = caches[settings.BOARD_NOTIFICATION_DIGEST_CACHE]
+        self._board_id = board_id
+        self._codec = codec
+        self._ttl = settings.BOARD_NOTIFICATION_DIGEST_TTL
+
+    def _key(self, pin: dict[str, Any]) -> str:
+        return f'notifications:digest:{self._board_id}:{pin["number"]}'
+
+    def _digest(self, pin: dict[str, Any]) -> str:
+        state = f'{self._codec}:{pin["value"]}:{pin["is_digital"]}'
+        return blake2b(state.encode(), digest_size=8).hexdigest()
+
+    def _is_new(self, pin: dict[str, Any], published: Any) -> bool:
+        if not isinstance(published, tuple):
+            return published != self._digest(pin)
+
+        # A state older than the published one arrived late, drop it too
+        digest, version = published
+        return digest != self._digest(pin) and \
+            pin.get('version', version) >= version
+
+    def changed(self, pins: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Return the pins whose state differs from the published one."""
+        published = self._cache.get_many([self._key(pin) for pin in pins])
+        changed = [
+            pin
+            for pin in pins
+            if self._is_new(pin, published.get(self._key(pin)))
+        ]
+
+        suppressed = len(pins) - len(changed)
+        if suppressed:
+            self._cache.add(self.SUPPRESSED_KEY, 0, timeout=None)
+            self._cache.incr(self.SUPPRESSED_KEY, suppressed)
+
+        return changed
+
+    def remember(self, pins: list[dict[str, Any]]) -> None:
+        self._cache.set_many(
+            {
+                self._key(pin): (self._digest(pin), pin.get('version', 0))
+                for pin in pins
+            },
+            timeout=self._ttl,
+        )
+
+    @classmethod
+    def suppressed(cls) -> int:
+        digests = caches[settings.BOARD_NOTIFICATION_DIGEST_CACHE]
+        return digests.get(cls.SUPPRESSED_KEY, 0)
+
+
+def payload_format(board_id: int) -> str:
+    """Codec of a board, cached so publishing needs no database read."""
+    key = f'notifications:payload-format:{board_id}'
+    codec = cache.get(key)
+    if codec is None:
+        from .models import Board
+
+        codec = Board.objects.values_list('payload_format', flat=True).get(
+            pk=board_id,
+        )
+        cache.set(key, codec, timeout=settings.BOARD_NOTIFICATION_DIGEST_TTL)
+
+    return codec
+
+
+def forget_payload_format(board_id: int) -> None:
+    cache.delete(f'notifications:payload-format:{board_id}')
+
+
+def schedule_flush(board_id: int, countdown: Optional[float] = None) -> None:
+    from .tasks import flush_board_notifications
+
+    if countdown is None:
+        countdown = settings.BOARD_NOTIFICATION_WINDOW
+
+    flush_board_notifications.apply_async(
+        kwargs={'board_id': board_id},
+        countdown=countdown,
+    )
+
+
+def notify_pin_change(
+    board_id: int,
+    pin_id: int,
+    state: Optional[dict[str, Any]] = None,
+    changed: Optional[float] = None,
+) -> None:
+    """Schedule the notification of a committed pin change.
+
+    With ``BOARD_NOTIFICATION_WINDOW`` set, the changes of a board are
+    collected during the window and sent together in one message. Otherwise,
+    with ``BOARD_NOTIFICATION_INLINE_STATE`` set, the committed ``state`` of
+    the pin (and the timestamp it ``changed``) travels in the task message,
+    so the worker publishes it without reading the database.
+    """
+    from .tasks import notify_board, publish_pin_state
+
+    if not settings.BOARD_NOTIFICATION_WINDOW:
+        if settings.BOARD_NOTIFICATION_INLINE_STATE and state is not None:
+            publish_pin_state.delay(
+                board_id=board_id,
+                state=state,
+                changed=changed,
+            )
+        else:
+            notify_board.delay(
+                topic=build_topic(board_id=board_id),
+                pin_id=pin_id,
+            )
+        return
+
+    if PinChangeBuffer(board_id).push(pin_id):
+        schedule_flush(board_id)
+
+
+def notify_pins_change(board_id: int, pin_ids: list[int]) -> None:
+    """Schedule one notification for many committed changes of a board."""
+    from .tasks import notify_board_pins
+
+    if len(pin_ids) == 1:
+        return notify_pin_change(board_id=board_id, pin_id=pin_ids[0])
+
+    if not settings.BOARD_NOTIFICATION_WINDOW:
+        notify_board_pins.delay(board_id=board_id, pin_ids=pin_ids)
+        return
+
+    if PinChangeBuffer(board_id).push_many(pin_ids):
+        schedule_flush(board_id)
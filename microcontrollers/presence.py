@@ -0,0 +1,112 @@
+import time
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+from django.conf import settings
+from django.core.cache import cache
+from . import versions
+from .models import Board
+from .notifications import SlotBuffer
+
+
+PUBLISH = 'publish'
+DEFER = 'defer'
+SKIP = 'skip'
+
+
+def _key(board_id: int) -> str:
+    return f'presence:board:{board_id}'
+
+
+def _marked() -> SlotBuffer:
+    # Batches of boards marked since the last flush, gone with their entries
+    return SlotBuffer(
+        prefix='presence:marked',
+        ttl=settings.BOARD_PRESENCE_TIMEOUT,
+    )
+
+
+def mark(boards: dict[int, bool], seen: Optional[float] = None) -> None:
+    """Store whether each board is online, as of ``seen`` (a timestamp).
+
+    Entries expire after ``BOARD_PRESENCE_TIMEOUT``, so a board that stops
+    sending heartbeats is considered offline without a disconnect event.
+    """
+    if not boards:
+        return
+
+    seen = seen or time.time()
+    cache.set_many(
+        {
+            _key(board_id): {'online': online, 'seen': seen}
+            for board_id, online in boards.items()
+        },
+        timeout=settings.BOARD_PRESENCE_TIMEOUT,
+    )
+    _marked().push_many([tuple(boards)])
+
+
+def read(board_ids: Iterable[int]) -> dict[int, dict]:
+    board_ids = list(board_ids)
+    entries = cache.get_many([_key(board_id) for board_id in board_ids])
+    return {
+        board_id: entries[_key(board_id)]
+        for board_id in board_ids
+        if _key(board_id) in entries
+    }
+
+
+def online(board_ids: Iterable[int]) -> set[int]:
+    return {
+        board_id
+        for board_id, entry in read(board_ids).items()
+        if entry['online']
+    }
+
+
+def is_online(board_id: int) -> bool:
+    return board_id in online([board_id])
+
+
+def delivery(board_id: int, changed: datetime) -> str:
+    """What to do with a notification for a board, as of its policy.
+
+    Returns ``PUBLISH``, ``DEFER`` or ``SKIP``. Deferred notifications are
+    published anyway once ``BOARD_OFFLINE_DEFER_MAX`` seconds have passed
+    since the change, as the retained message still reaches the board when
+    it reconnects.
+    """
+    policy = settings.BOARD_OFFLINE_POLICY
+    if policy == PUBLISH or is_online(board_id):
+        return PUBLISH
+
+    age = time.time() - changed.timestamp()
+    if policy == DEFER and age > settings.BOARD_OFFLINE_DEFER_MAX:
+        return PUBLISH
+
+    return policy
+
+
+def flush() -> int:
+    """Copy the presence table to ``Board.last_seen``, one UPDATE for all.
+
+    Only the boards marked since the previous flush are read.
+    """
+    marked = _marked()
+    batches, flushed = marked.peek()
+    entries = read({board_id for batch in batches for board_id in batch})
+    boards = Board.objects.filter(pk__in=entries).only('pk', 'last_seen')
+
+    changed = []
+    for board in boards:
+        seen = datetime.fromtimestamp(
+            entries[board.pk]['seen'],
+            tz=timezone.utc,
+        )
+        if board.last_seen is None or board.last_seen < seen:
+            board.last_seen = seen
+            changed.append(board)
+
+    Board.objects.bulk_update(changed, ['last_seen'], batch_size=1000)
+    versions.bump(board.pk for board in changed)
+    marked.commit(flushed)
+    return len(changed)
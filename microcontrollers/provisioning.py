@@ -0,0 +1,114 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from typing import NamedTuple, Optional
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from cloudroom.mqtt import Manager as MQTTManager
+from cloudroom.mqtt.exceptions import BrokerRequestError
+from . import versions
+from .exceptions import HashSecretError
+from .models import Board
+
+
+EXISTING_NAME = 'A board with this name already exists'
+
+
+class ProvisioningResult(NamedTuple):
+    name: str
+    board: Optional[Board] = None
+    error: Optional[str] = None
+
+
+def _provision(name: str, secret: str) -> str:
+    """Create the broker user of a board, return the hash of its secret."""
+    manager = MQTTManager()
+    manager.create_user(username=name, password=secret)
+    try:
+        manager.grant_user_permissions(username=name)
+        return Board._hash_secret(secret)
+    except (BrokerRequestError, HashSecretError):
+        with suppress(BrokerRequestError):
+            manager.delete_user(username=name)
+        raise
+
+
+def _deprovision(names: list[str]) -> None:
+    manager = MQTTManager()
+
+    def delete(name: str) -> None:
+        with suppress(BrokerRequestError):
+            manager.delete_user(username=name)
+
+    with ThreadPoolExecutor(settings.BOARD_PROVISIONING_WORKERS) as executor:
+        list(executor.map(delete, names))
+
+
+def _existing_names(boards: list[Board]) -> set[str]:
+    return set(Board.objects.filter(
+        name__in=[board.name for board in boards],
+    ).values_list('name', flat=True))
+
+
+def _insert(boards: list[Board]) -> None:
+    with transaction.atomic():
+        Board.objects.bulk_create(boards)
+        # bulk_create skips Board.save, which bumps them otherwise
+        transaction.on_commit(lambda: versions.bump(
+            board.pk for board in boards
+        ))
+
+
+def provision_boards(boards: list[Board]) -> list[ProvisioningResult]:
+    """Register many unsaved boards, holding their plain secrets.
+
+    Broker users are created and secrets hashed (argon2 releases the GIL)
+    by a pool of ``BOARD_PROVISIONING_WORKERS`` threads, then every
+    provisioned board is inserted with one ``bulk_create``. A board failing
+    on the broker, or whose name was taken meanwhile, is reported in its
+    result and left out of the insert, the others go on. Results follow the
+    order of ``boards``.
+    """
+    existing = _existing_names(boards)
+
+    errors = {name: EXISTING_NAME for name in existing}
+    pending = [board for board in boards if board.name not in existing]
+
+    with ThreadPoolExecutor(settings.BOARD_PROVISIONING_WORKERS) as executor:
+        futures = [
+            executor.submit(_provision, board.name, board.secret)
+            for board in pending
+        ]
+
+        provisioned = []
+        for board, future in zip(pending, futures):
+            try:
+                board.secret = future.result()
+            except (BrokerRequestError, HashSecretError) as e:
+                errors[board.name] = str(e)
+            else:
+                provisioned.append(board)
+
+    while provisioned:
+        try:
+            _insert(provisioned)
+            break
+        except IntegrityError:
+            # A board with the same name was created meanwhile: its broker
+            # user belongs to that board now, the rest of the batch is
+            # inserted again
+            taken = _existing_names(provisioned)
+            if not taken:
+                _deprovision([board.name for board in provisioned])
+                raise
+
+            errors.update({name: EXISTING_NAME for name in taken})
+            provisioned = [
+                board for board in provisioned if board.name not in taken
+            ]
+
+    return [
+        ProvisioningResult(name=board.name, error=errors[board.name])
+        if board.name in errors else
+        ProvisioningResult(name=board.name, board=board)
+        for board in boards
+    ]
@@ -0,0 +1,45 @@
+from typing import Iterable
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, QuerySet
+from .models import Pin
+
+
+def _key(board_id: int) -> str:
+    return f'reconciliation:board:{board_id}'
+
+
+def mismatched(board_id: int) -> QuerySet:
+    """Pins whose reported value differs from the desired one.
+
+    Pins the board never reported are left out, their state was not
+    confirmed nor denied.
+    """
+    return Pin.objects.filter(
+        board_id=board_id,
+        reported_value__isnull=False,
+    ).exclude(
+        reported_value=F('value'),
+    ).order_by('number')
+
+
+def schedule(board_ids: Iterable[int]) -> None:
+    """Reconcile the boards after ``BOARD_RECONCILIATION_DELAY``.
+
+    At most one reconciliation per board is waiting at a time, the triggers
+    arriving meanwhile are covered by it.
+    """
+    from .tasks import reconcile_board
+
+    delay = settings.BOARD_RECONCILIATION_DELAY
+    for board_id in board_ids:
+        if cache.add(_key(board_id), True, timeout=delay * 2 + 60):
+            reconcile_board.apply_async(
+                kwargs={'board_id': board_id},
+                countdown=delay,
+            )
+
+
+def started(board_id: int) -> None:
+    """Let new triggers schedule another reconciliation of the board."""
+    cache.delete(_key(board_id))
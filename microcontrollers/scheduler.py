@@ -0,0 +1,335 @@
+import json
+import heapq
+import random
+import itertools
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, NamedTuple, Optional
+from celery import current_app
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django_celery_beat.schedulers import DatabaseScheduler
+from kombu import Exchange
+from kombu.exceptions import OperationalError
+from .models import PeriodicPinBehavior, PeriodicSceneBehavior
+
+
+logger = logging.getLogger(__name__)
+
+BEHAVIOR_EXCHANGE = Exchange(
+    'microcontrollers.behaviors',
+    type='fanout',
+    durable=False,
+)
+BEHAVIOR_MODELS = {
+    model._meta.model_name: model
+    for model in (PeriodicPinBehavior, PeriodicSceneBehavior)
+}
+UPSERT = 'upsert'
+DELETE = 'delete'
+STATS_KEY = 'scheduler:stats'
+# Behaviors running this task in the same tick are sent as batches of
+# BATCH_TASK, grouped by board
+SINGLE_TASK = 'microcontrollers.tasks.change_pin_value'
+BATCH_TASK = 'microcontrollers.tasks.change_pin_values'
+
+
+def announce(behavior, action: str) -> None:
+    """Tell the running schedulers, after the commit, a behavior changed."""
+    message = {
+        'kind': behavior._meta.model_name,
+        'id': behavior.pk,
+        'action': action,
+    }
+
+    def publish():
+        try:
+            with current_app.producer_pool.acquire(block=True) as producer:
+                producer.publish(
+                    message,
+                    exchange=BEHAVIOR_EXCHANGE,
+                    declare=[BEHAVIOR_EXCHANGE],
+                    retry=True,
+                    retry_policy={'max_retries': 2},
+                )
+        except (OperationalError, OSError):
+            # Picked up by the next full reload of the schedulers
+            logger.warning('Could not announce %s', message, exc_info=True)
+
+    transaction.on_commit(publish)
+
+
+class Entry(NamedTuple):
+    key: tuple[str, int]
+    task: str
+    args: list
+    kwargs: dict[str, Any]
+    schedule: Any
+    jitter: int = 0
+    # Board of a batchable behavior, None when it is sent on its own
+    group: Optional[int] = None
+
+
+class BehaviorScheduler:
+    """Fires the periodic pin and scene behaviors from a min-heap.
+
+    The heap holds ``(next fire time, sequence, key)`` items, so a tick only
+    pops what is due instead of walking every behavior. Changes are applied
+    one behavior at a time with ``upsert`` and ``delete``; a removed or
+    replaced entry stays in the heap and is dropped when it is popped.
+
+    A behavior with a jitter fires up to that many seconds after its
+    schedule, and the pin changes due in the same tick go out in one message
+    per board (and per ``BEHAVIOR_BATCH_SIZE`` changes), so round crontabs
+    do not all hit the workers on the same second.
+    """
+
+    def __init__(self, app=None) -> None:
+        self.app = app or current_app
+        self.fired = 0
+        self._entries: dict[tuple[str, int], Entry] = {}
+        self._heap: list[tuple[datetime, int, tuple[str, int]]] = []
+        # Sequence of the heap item that is current for each key
+        self._current: dict[tuple[str, int], int] = {}
+        # Scheduled time of each key, before the jitter
+        self._due: dict[tuple[str, int], datetime] = {}
+        self._sequence = itertools.count()
+
+    def _queryset(self, model):
+        queryset = model.objects.select_related(
+            'task__crontab',
+            'task__interval',
+            'task__solar',
+            'task__clocked',
+        ).filter(task__enabled=True)
+
+        if model is PeriodicPinBehavior:
+            queryset = queryset.select_related('pin')
+
+        return queryset
+
+    def _entry(self, kind: str, behavior) -> Entry:
+        task = behavior.task
+        kwargs = json.loads(task.kwargs or '{}')
+
+        group = None
+        if kind == 'periodicpinbehavior' and task.task == SINGLE_TASK:
+            group = behavior.pin.board_id
+
+        return Entry(
+            key=(kind, behavior.pk),
+            task=task.task,
+            args=json.loads(task.args or '[]'),
+            kwargs=kwargs,
+            schedule=task.schedule,
+            jitter=behavior.jitter,
+            group=group,
+        )
+
+    @staticmethod
+    def _next_due(schedule, last_run_at: datetime) -> datetime:
+        now = schedule.now()
+        due = now + schedule.remaining_estimate(last_run_at)
+        if due < now:
+            # Runs missed while the scheduler was down are not caught up
+            due = now + schedule.remaining_estimate(now)
+        # now() above and the one inside remaining_estimate() differ by some
+        # microseconds, which would leave due just before the boundary
+        if due.microsecond:
+            due += timedelta(microseconds=1_000_000 - due.microsecond)
+
+        return due
+
+    def _push(
+        self,
+        entry: Entry,
+        last_run_at: datetime,
+        due: Optional[datetime] = None,
+    ) -> None:
+        if due is None:
+            due = self._next_due(entry.schedule, last_run_at)
+
+        fire_at = due + timedelta(seconds=random.uniform(0, entry.jitter))
+        sequence = next(self._sequence)
+        self._entries[entry.key] = entry
+        self._current[entry.key] = sequence
+        self._due[entry.key] = due
+        heapq.heappush(self._heap, (fire_at, sequence, entry.key))
+
+    def _schedule(
+        self,
+        entry: Entry,
+        previous: Optional[Entry],
+        due: Optional[datetime],
+    ) -> None:
+        """Push an entry, keeping the pending run of an unchanged schedule.
+
+        Reloads and announcements often land on the second a run is due, a
+        due time computed again from now would skip that run.
+        """
+        if previous is None or previous.schedule != entry.schedule:
+            due = None
+
+        self._push(entry, entry.schedule.now(), due=due)
+
+    def load(self) -> None:
+        """Rebuild the whole schedule from the database."""
+        entries, due = dict(self._entries), dict(self._due)
+        self._entries.clear()
+        self._current.clear()
+        self._due.clear()
+        self._heap.clear()
+
+        for kind, model in BEHAVIOR_MODELS.items():
+            for behavior in self._queryset(model):
+                entry = self._entry(kind, behavior)
+                self._schedule(
+                    entry,
+                    entries.get(entry.key),
+                    due.get(entry.key),
+                )
+
+        logger.info('Loaded %d behaviors', len(self._entries))
+
+    def upsert(self, kind: str, pk: int) -> None:
+        behavior = self._queryset(BEHAVIOR_MODELS[kind]).filter(pk=pk).first()
+        if behavior is None:
+            return self.delete(kind, pk)
+
+        entry = self._entry(kind, behavior)
+        self._schedule(
+            entry,
+            self._entries.get(entry.key),
+            self._due.get(entry.key),
+        )
+
+    def delete(self, kind: str, pk: int) -> None:
+        self._entries.pop((kind, pk), None)
+        self._current.pop((kind, pk), None)
+        self._due.pop((kind, pk), None)
+
+    def apply(self, message: dict[str, Any]) -> None:
+        """Apply a change published by ``announce``."""
+        if message.get('kind') not in BEHAVIOR_MODELS:
+            return
+
+        if message.get('action') == DELETE:
+            self.delete(message['kind'], message['id'])
+        else:
+            self.upsert(message['kind'], message['id'])
+
+    def _send(self, task: str, args: list, kwargs: dict[str, Any]) -> None:
+        try:
+            self.app.send_task(task, args=args, kwargs=kwargs)
+        except Exception:  # pragma: no cover
+            logger.exception('Could not send %s with %s', task, kwargs)
+
+    def _dispatch(self, entries: list[Entry]) -> int:
+        """Send the due entries, return how many messages it took."""
+        sent = 0
+        batches = defaultdict(list)
+        for entry in entries:
+            if entry.group is None:
+                self._send(entry.task, entry.args, entry.kwargs)
+                sent += 1
+            else:
+                batches[entry.group].append(entry)
+
+        size = settings.BEHAVIOR_BATCH_SIZE
+        for batch in batches.values():
+            for i in range(0, len(batch), size):
+                chunk = batch[i:i + size]
+                if len(chunk) == 1:
+                    self._send(chunk[0].task, chunk[0].args, chunk[0].kwargs)
+                else:
+                    changes = [entry.kwargs for entry in chunk]
+                    self._send(BATCH_TASK, [], {'changes': changes})
+                sent += 1
+
+        return sent
+
+    def tick(self, now: Optional[datetime] = None) -> float:
+        """Fire the due behaviors, return seconds until the next one."""
+        started = time.perf_counter()
+        due_entries, latencies = [], []
+
+        while self._heap:
+            due, sequence, key = self._heap[0]
+            if self._current.get(key) != sequence:
+                # Deleted or replaced since it was pushed
+                heapq.heappop(self._heap)
+                continue
+
+            entry = self._entries[key]
+            current = now or entry.schedule.now()
+            if due > current:
+                break
+
+            heapq.heappop(self._heap)
+            due_entries.append(entry)
+            latencies.append((current - due).total_seconds())
+            # From the fire time, so the next run is after the one just done
+            self._push(entry, current)
+
+        if due_entries:
+            messages = self._dispatch(due_entries)
+            self.fired += len(due_entries)
+            self._report(
+                len(due_entries),
+                messages,
+                latencies,
+                time.perf_counter() - started,
+            )
+
+        return self.next_delay()
+
+    def next_delay(self, maximum: float = 60.0) -> float:
+        while self._heap:
+            due, sequence, key = self._heap[0]
+            if self._current.get(key) == sequence:
+                now = self._entries[key].schedule.now()
+                return min(max((due - now).total_seconds(), 0), maximum)
+
+            heapq.heappop(self._heap)
+
+        return maximum
+
+    def _report(
+        self,
+        fired: int,
+        messages: int,
+        latencies: list[float],
+        elapsed: float,
+    ) -> None:
+        stats = {
+            'fired': fired,
+            'messages': messages,
+            'max_latency': max(latencies),
+            'mean_latency': sum(latencies) / len(latencies),
+            'tick_duration': elapsed,
+            'behaviors': len(self._entries),
+        }
+        cache.set(STATS_KEY, stats, timeout=None)
+        logger.info('Scheduler tick: %s', stats)
+
+    @staticmethod
+    def stats() -> Optional[dict[str, Any]]:
+        """Latency metrics of the last tick that fired something."""
+        return cache.get(STATS_KEY)
+
+
+class BeatScheduler(DatabaseScheduler):
+    """Database scheduler of celery beat, without the behaviors.
+
+    Pin and scene behaviors are fired by ``./manage.py schedule_behaviors``,
+    so beat only loads the remaining periodic tasks.
+    """
+
+    def enabled_models_qs(self):
+        return super().enabled_models_qs().filter(
+            periodicpinbehavior__isnull=True,
+            periodicscenebehavior__isnull=True,
+        )
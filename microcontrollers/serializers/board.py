@@ -1,16 +1,31 @@
 import string
 import random
+from functools import cached_property
+from django.conf import settings
+from django.db import IntegrityError
+from django.urls import reverse
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from cloudroom.mqtt.exceptions import BrokerRequestError
-from ..exceptions import BrokerConnectionError
+from ..exceptions import (
+    BrokerConnectionError,
+    SecretVerificationUnavailable,
+    VerificationPoolFull,
+)
 from ..models import Board
+from ..provisioning import provision_boards
+from ..verification import (
+    check_session_token,
+    issue_session_token,
+    session_expires_in,
+)
 
 
 class BaseSerializer(serializers.ModelSerializer):
     SECRET_SIZE = 50
 
-    def generate_secret(self) -> str:
+    @staticmethod
+    def generate_secret() -> str:
         c = ''.join([string.ascii_letters, string.digits])
         secret = random.choices(c, k=BaseSerializer.SECRET_SIZE)
         secret = ''.join(secret)
@@ -25,17 +40,40 @@ class BaseSerializer(serializers.ModelSerializer):
         return data
 
 
+class PinUrlsField(serializers.Field):
+    """Links to the pins of a board, without a ``reverse()`` per pin.
+
+    The detail URL is reversed once per field with a placeholder for the
+    primary key, which is then replaced for every pin. Prefetch ``pin_set``
+    to keep it at one query per page.
+    """
+    PLACEHOLDER = '__pk__'
+
+    def __init__(self, view_name: str, **kwargs):
+        self.view_name = view_name
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    @cached_property
+    def template(self) -> str:
+        url = reverse(self.view_name, kwargs={'pk': self.PLACEHOLDER})
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def to_representation(self, value):
+        return [
+            self.template.replace(self.PLACEHOLDER, str(pin.pk))
+            for pin in value.all()
+        ]
+
+
 class BoardSerializer(BaseSerializer):
-    pins = serializers.HyperlinkedRelatedField(
-        many=True,
-        read_only=True,
-        view_name='pin-detail',
-        source='pin_set'
-    )
+    pins = PinUrlsField(view_name='pin-detail', source='pin_set')
 
     class Meta:
         model = Board
         exclude = ['secret']
+        read_only_fields = ['last_seen']
 
 
 class CreateBoardSerializer(BaseSerializer):
@@ -60,7 +98,64 @@ class CreateBoardSerializer(BaseSerializer):
 
     class Meta:
         model = Board
-        fields = ['name', 'status']
+        fields = ['name', 'status', 'payload_format']
+
+
+class ProvisionBoardSerializer(BaseSerializer):
+    class Meta:
+        model = Board
+        fields = ['name', 'status', 'payload_format']
+        # Checked for the whole batch at once by provision_boards
+        extra_kwargs = {'name': {'validators': []}}
+
+
+class BulkCreateBoardSerializer(serializers.Serializer):
+    boards = ProvisionBoardSerializer(
+        many=True,
+        allow_empty=False,
+        max_length=settings.BOARD_PROVISIONING_MAX_BATCH,
+    )
+
+    def validate_boards(self, boards):
+        names = [board['name'] for board in boards]
+        if len(set(names)) != len(names):
+            raise ValidationError('Board names must be unique')
+
+        return boards
+
+    def create(self, validated_data):
+        self.secrets = {}
+        boards = []
+        for data in validated_data['boards']:
+            secret = BaseSerializer.generate_secret()
+            self.secrets[data['name']] = secret
+            boards.append(Board(**data, secret=secret))
+
+        try:
+            return provision_boards(boards)
+        except IntegrityError as e:
+            raise ValidationError('Board names must be unique') from e
+
+    def to_representation(self, instance):
+        return {
+            'boards': [
+                {
+                    'name': result.name,
+                    'error': result.error,
+                }
+                if result.error else
+                {
+                    'id': result.board.pk,
+                    'name': result.name,
+                    'secret': self.secrets[result.name],
+                }
+                for result in instance
+            ],
+        }
+
+    @property
+    def failed(self) -> int:
+        return sum(1 for result in self.instance if result.error)
 
 
 class UpdateBoardSerializer(BoardSerializer):
@@ -70,19 +165,48 @@ class UpdateBoardSerializer(BoardSerializer):
     class Meta:
         model = Board
         exclude = ['secret', 'name']
+        read_only_fields = ['last_seen']
 
 
 class SecretValidationSerializer(BaseSerializer):
+    token = serializers.CharField(required=False)
+
     def validate_secret(self, value):
-        match = self.instance.verify_secret(value)
+        try:
+            match = self.instance.verify_secret(value)
+        except VerificationPoolFull as e:
+            raise SecretVerificationUnavailable from e
+
         if not match:
             raise ValidationError('Invalid secret')
 
         return value
 
+    def validate_token(self, value):
+        if not check_session_token(self.instance, value):
+            raise ValidationError('Invalid or expired token')
+
+        return value
+
+    def validate(self, attrs):
+        if 'token' not in attrs and 'secret' not in attrs:
+            raise ValidationError('Either secret or token is required')
+
+        # A valid token spares the argon2 verification for its lifetime
+        if 'token' not in attrs:
+            attrs['token'] = issue_session_token(self.instance)
+
+        return attrs
+
+    @property
+    def session(self) -> dict:
+        token = self.validated_data['token']
+        return {'token': token, 'expires_in': session_expires_in(token)}
+
     class Meta:
         model = Board
-        fields = ['secret']
+        fields = ['secret', 'token']
+        extra_kwargs = {'secret': {'required': False}}
 
 
 class UpdateSecretSerializer(BaseSerializer):
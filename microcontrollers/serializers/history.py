@@ -0,0 +1,39 @@
+from rest_framework import serializers
+from ..history import RAW, RESOLUTIONS
+from ..models import PinHistory, PinRollup
+
+
+class HistoryQuerySerializer(serializers.Serializer):
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+    resolution = serializers.ChoiceField(
+        choices=[RAW, *RESOLUTIONS],
+        required=False,
+    )
+
+    def validate(self, data):
+        if data['start'] >= data['end']:
+            raise serializers.ValidationError('start must be before end')
+
+        return data
+
+
+class PinHistorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PinHistory
+        fields = ['value', 'recorded']
+
+
+class PinRollupSerializer(serializers.ModelSerializer):
+    average = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = PinRollup
+        fields = [
+            'bucket',
+            'samples',
+            'minimum',
+            'maximum',
+            'average',
+            'on_seconds',
+        ]
@@ -1,8 +1,11 @@
 from rest_framework import serializers
 from django.db import transaction
-from celery import current_app
-from cloudroom.serializers.celery import PeriodicTaskSerializer
+from cloudroom.serializers.celery import (
+    PeriodicTaskSerializer,
+    registered_tasks,
+)
 from ..models import PeriodicPinBehavior
+from ..scheduler import UPSERT, announce
 
 
 class PeriodicPinBehaviorSerializer(serializers.ModelSerializer):
@@ -13,14 +16,7 @@ class PeriodicPinBehaviorSerializer(serializers.ModelSerializer):
     )
 
     def __init__(self, *args, **kwargs):
-        current_module = __package__.split('.')[0]
-        current_app.loader.import_default_modules()
-        tasks = list(sorted(
-            name
-            for name in current_app.tasks
-            if name.startswith(current_module)
-        ))
-        self._tasks = tasks
+        self._tasks = registered_tasks(__package__.split('.')[0])
         super().__init__(*args, **kwargs)
 
     def get_fields(self):
@@ -44,7 +40,8 @@ class CreatePeriodicPinBehaviorSerializer(PeriodicPinBehaviorSerializer):
         task.save()
 
         data = validated_data | {'task': task.instance}
-        periodic_behavior = PeriodicPinBehavior.objects.create(**data)
+        periodic_behavior = self.Meta.model.objects.create(**data)
+        announce(periodic_behavior, UPSERT)
         return periodic_behavior
 
 
@@ -1,8 +1,10 @@
 import re
+from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer
 from rest_framework.serializers import ValidationError
 from rest_framework.validators import UniqueTogetherValidator
 from ..models import Pin
+from ..validators import validate_pin_value
 
 
 class PinSerializer(ModelSerializer):
@@ -26,6 +28,7 @@ class PinSerializer(ModelSerializer):
     class Meta:
         model = Pin
         fields = '__all__'
+        read_only_fields = ['version', 'reported_value', 'reported']
         validators = [
             UniqueTogetherValidator(
                 queryset=model.objects.all(),
@@ -37,7 +40,7 @@ class PinSerializer(ModelSerializer):
 class BasicPinInfoSerializer(ModelSerializer):
     class Meta:
         model = Pin
-        fields = ['number', 'value', 'is_digital']
+        fields = ['number', 'value', 'is_digital', 'version']
 
 
 class UpdatePinSerializer(PinSerializer):
@@ -47,3 +50,54 @@ class UpdatePinSerializer(PinSerializer):
     class Meta:
         model = Pin
         exclude = ['number', 'board']
+        read_only_fields = ['version', 'reported_value', 'reported']
+
+
+class PinChangeSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    value = serializers.CharField(
+        max_length=4,
+        validators=[validate_pin_value],
+    )
+    is_digital = serializers.BooleanField(required=False)
+
+
+class BulkPinUpdateSerializer(serializers.Serializer):
+    pins = PinChangeSerializer(many=True, allow_empty=False)
+
+    def validate_pins(self, changes):
+        ids = [change['id'] for change in changes]
+        if len(set(ids)) != len(ids):
+            raise ValidationError('A pin can only be changed once')
+
+        self._pins = Pin.objects.in_bulk(ids)
+
+        errors = {}
+        for change in changes:
+            pin = self._pins.get(change['id'])
+            if pin is None:
+                errors[change['id']] = 'Pin not found'
+                continue
+
+            is_digital = change.get('is_digital', pin.is_digital)
+            if (change['value'] in ('ON', 'OFF')) != is_digital:
+                errors[change['id']] = 'Invalid value for the pin type'
+
+        if errors:
+            raise ValidationError(errors)
+
+        return changes
+
+    def create(self, validated_data):
+        pins = []
+        for change in validated_data['pins']:
+            pin = self._pins[change['id']]
+            pin.value = change['value']
+            pin.is_digital = change.get('is_digital', pin.is_digital)
+            pins.append(pin)
+
+        Pin.bulk_save(pins)
+        return pins
+
+    def to_representation(self, instance):
+        return {'pins': PinSerializer(instance, many=True).data}
@@ -0,0 +1,94 @@
+from django.db import transaction
+from rest_framework import serializers
+from rest_framework.serializers import ValidationError
+from ..models import PeriodicSceneBehavior, Scene, SceneAssignment
+from .periodic_behavior import (
+    CreatePeriodicPinBehaviorSerializer,
+    PeriodicPinBehaviorSerializer,
+)
+
+
+class SceneAssignmentSerializer(serializers.ModelSerializer):
+    def validate(self, data):
+        is_digital = data['value'] in ('ON', 'OFF')
+        if is_digital != data['pin'].is_digital:
+            raise ValidationError('Invalid value for the pin type')
+
+        return data
+
+    class Meta:
+        model = SceneAssignment
+        fields = ['pin', 'value']
+
+
+class SceneSerializer(serializers.ModelSerializer):
+    assignments = SceneAssignmentSerializer(many=True)
+
+    def validate_assignments(self, assignments):
+        pins = [assignment['pin'].pk for assignment in assignments]
+        if len(set(pins)) != len(pins):
+            raise ValidationError('A pin can only be assigned once')
+
+        return assignments
+
+    def _assign(self, scene, assignments) -> None:
+        SceneAssignment.objects.bulk_create(
+            SceneAssignment(scene=scene, **assignment)
+            for assignment in assignments
+        )
+
+    @transaction.atomic()
+    def create(self, validated_data):
+        assignments = validated_data.pop('assignments')
+        scene = Scene.objects.create(**validated_data)
+        self._assign(scene, assignments)
+        return scene
+
+    @transaction.atomic()
+    def update(self, instance, validated_data):
+        assignments = validated_data.pop('assignments', None)
+        instance = super().update(instance, validated_data)
+
+        if assignments is not None:
+            instance.assignments.all().delete()
+            self._assign(instance, assignments)
+
+        return instance
+
+    class Meta:
+        model = Scene
+        exclude = ['pins']
+
+
+class PeriodicSceneBehaviorSerializer(PeriodicPinBehaviorSerializer):
+    pin_url = None
+    scene_url = serializers.HyperlinkedRelatedField(
+        view_name='scene-detail',
+        source='scene',
+        read_only=True,
+    )
+
+    class Meta:
+        model = PeriodicSceneBehavior
+        fields = '__all__'
+
+
+class CreatePeriodicSceneBehaviorSerializer(
+    PeriodicSceneBehaviorSerializer,
+    CreatePeriodicPinBehaviorSerializer,
+):
+    pin_url = None
+
+    class Meta:
+        model = PeriodicSceneBehavior
+        fields = '__all__'
+
+
+class CreateWithoutShowingSceneFieldSerializer(
+    CreatePeriodicSceneBehaviorSerializer,
+):
+    scene = None
+
+    class Meta:
+        model = PeriodicSceneBehavior
+        exclude = ['scene']
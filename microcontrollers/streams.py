@@ -0,0 +1,77 @@
+import json
+import asyncio
+from typing import Any, AsyncIterator, Optional
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from .feed import SNAPSHOT, Subscription, hub, snapshot
+
+
+def _authenticate(request) -> Optional[Any]:
+    request = Request(
+        request,
+        authenticators=[
+            authentication()
+            for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+        ],
+    )
+    try:
+        user = request.user
+    except APIException:
+        return None
+
+    return user if user.is_authenticated else None
+
+
+def _event(name: str, data: dict[str, Any]) -> str:
+    return f'event: {name}\ndata: {json.dumps(data)}\n\n'
+
+
+async def _stream(subscription: Subscription) -> AsyncIterator[str]:
+    try:
+        # Subscribed first, so no change falls between both
+        yield _event('snapshot', await sync_to_async(snapshot)())
+
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    subscription.get(),
+                    timeout=settings.PIN_CHANGE_FEED_KEEPALIVE,
+                )
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+
+            if event is SNAPSHOT:
+                yield _event('snapshot', await sync_to_async(snapshot)())
+            else:
+                yield _event('change', event)
+    finally:
+        hub.unsubscribe(subscription)
+
+
+async def pin_changes(request):
+    """Server-sent events of the committed pin changes.
+
+    Starts with a ``snapshot`` event holding the state of every board, then
+    sends a ``change`` event per pin change. A client too slow to read them
+    gets a new ``snapshot`` instead of the events it missed.
+    """
+    user = await sync_to_async(_authenticate)(request)
+    if user is None:
+        return JsonResponse(
+            {'detail': 'Authentication credentials were not provided.'},
+            status=403,
+        )
+
+    response = StreamingHttpResponse(
+        _stream(hub.subscribe()),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Sent as they come, not buffered by a reverse proxy
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,8 +1,24 @@
+import logging
+from datetime import datetime, timezone
+from typing import Iterable
 from celery import shared_task
+from django.conf import settings
 from cloudroom.mqtt import Manager as MQTTManager
 from cloudroom.mqtt.exceptions import BrokerPublishError
-from .models import Pin
+from . import history, presence, reconciliation
+from .models import Pin, SceneAssignment
+from .notifications import (
+    PinChangeBuffer,
+    PublishedDigests,
+    payload_format,
+    schedule_flush,
+)
 from .serializers.pin import BasicPinInfoSerializer
+from .utils import build_topic
+from .validators import is_valid_pin_value
+
+
+logger = logging.getLogger(__name__)
 
 
 @shared_task(
@@ -10,10 +26,166 @@ from .serializers.pin import BasicPinInfoSerializer
     max_retries=5,
 )
 def notify_board(topic: str, pin_id: int) -> None:
-    pin = Pin.objects.get(pk=pin_id)
+    pin = Pin.objects.select_related('board').get(pk=pin_id)
+
+    delivery = presence.delivery(board_id=pin.board_id, changed=pin.updated)
+    if delivery == presence.SKIP:
+        return
+    if delivery == presence.DEFER:
+        notify_board.apply_async(
+            kwargs={'topic': topic, 'pin_id': pin_id},
+            countdown=settings.BOARD_OFFLINE_DEFER_DELAY,
+        )
+        return
+
     payload = BasicPinInfoSerializer(pin).data
+    digests = PublishedDigests(
+        board_id=pin.board_id,
+        codec=pin.board.payload_format,
+    )
+    if not digests.changed([payload]):
+        return
+
+    manager = MQTTManager()
+    manager.publish(
+        topic=topic,
+        payload=payload,
+        codec=pin.board.payload_format,
+    )
+    digests.remember([payload])
+
+
+@shared_task(
+    autoretry_for=[BrokerPublishError],
+    max_retries=5,
+)
+def publish_pin_state(board_id: int, state: dict, changed: float) -> None:
+    """Publish a pin state taken when it was committed, without the DB."""
+    delivery = presence.delivery(
+        board_id=board_id,
+        changed=datetime.fromtimestamp(changed, tz=timezone.utc),
+    )
+    if delivery == presence.SKIP:
+        return
+    if delivery == presence.DEFER:
+        publish_pin_state.apply_async(
+            kwargs={'board_id': board_id, 'state': state, 'changed': changed},
+            countdown=settings.BOARD_OFFLINE_DEFER_DELAY,
+        )
+        return
+
+    codec = payload_format(board_id)
+    digests = PublishedDigests(board_id=board_id, codec=codec)
+    if not digests.changed([state]):
+        return
+
+    manager = MQTTManager()
+    manager.publish(
+        topic=build_topic(board_id=board_id),
+        payload=state,
+        codec=codec,
+    )
+    digests.remember([state])
+
+
+def _publish_pins(board_id: int, pins: Iterable[Pin]) -> None:
+    """Send the pins whose state was not published yet, in one message."""
+    codec = payload_format(board_id)
+    digests = PublishedDigests(board_id=board_id, codec=codec)
+    changed = digests.changed(BasicPinInfoSerializer(pins, many=True).data)
+    if not changed:
+        return
+
+    manager = MQTTManager()
+    manager.publish(
+        topic=build_topic(board_id=board_id),
+        payload={'pins': changed},
+        codec=codec,
+    )
+    digests.remember(changed)
+
+
+@shared_task(
+    autoretry_for=[BrokerPublishError],
+    max_retries=5,
+)
+def flush_board_notifications(board_id: int) -> None:
+    buffer = PinChangeBuffer(board_id)
+    pin_ids, flushed = buffer.peek()
+
+    # Values are read now, so a pin changed twice is sent with its latest one
+    pins = Pin.objects.filter(pk__in=pin_ids).order_by('number')
+    delivery = presence.PUBLISH
+    if pins:
+        delivery = presence.delivery(
+            board_id=board_id,
+            changed=min(pin.updated for pin in pins),
+        )
+
+    if delivery == presence.DEFER:
+        # Slots stay unflushed, the deferred flush picks them up again
+        schedule_flush(board_id, countdown=settings.BOARD_OFFLINE_DEFER_DELAY)
+        return
+
+    if pins and delivery == presence.PUBLISH:
+        _publish_pins(board_id, pins)
+
+    if buffer.commit(flushed):
+        schedule_flush(board_id)
+
+
+@shared_task(
+    autoretry_for=[BrokerPublishError],
+    max_retries=5,
+)
+def notify_board_pins(board_id: int, pin_ids: list) -> None:
+    """Publish many pins of a board in one message, without a window."""
+    pins = Pin.objects.filter(pk__in=pin_ids).order_by('number')
+    if not pins:
+        return
+
+    delivery = presence.delivery(
+        board_id=board_id,
+        changed=min(pin.updated for pin in pins),
+    )
+    if delivery == presence.SKIP:
+        return
+    if delivery == presence.DEFER:
+        notify_board_pins.apply_async(
+            kwargs={'board_id': board_id, 'pin_ids': pin_ids},
+            countdown=settings.BOARD_OFFLINE_DEFER_DELAY,
+        )
+        return
+
+    _publish_pins(board_id, pins)
+
+
+@shared_task(
+    autoretry_for=[BrokerPublishError],
+    max_retries=5,
+)
+def reconcile_board(board_id: int) -> int:
+    """Publish the desired state of the pins a board reported otherwise."""
+    reconciliation.started(board_id)
+
+    # An offline board is reconciled again when it reconnects. Presence is
+    # only known from a shared cache, otherwise the board is assumed online
+    pins = list(reconciliation.mismatched(board_id))
+    online = not settings.CACHE_SHARED or presence.is_online(board_id)
+    if not pins or not online:
+        return 0
+
+    states = [pin.state for pin in pins]
+    codec = payload_format(board_id)
     manager = MQTTManager()
-    manager.publish(topic=topic, payload=payload)
+    manager.publish(
+        topic=build_topic(board_id=board_id),
+        payload={'pins': states},
+        codec=codec,
+    )
+    # Sent even if the digests hold the same states, the board missed them
+    PublishedDigests(board_id=board_id, codec=codec).remember(states)
+    return len(states)
 
 
 @shared_task
@@ -21,3 +193,54 @@ def change_pin_value(pin_id: int, value: str) -> None:
     pin = Pin.objects.get(pk=pin_id)
     pin.value = value
     pin.save()
+
+
+@shared_task
+def change_pin_values(changes: list) -> None:
+    """Batched ``change_pin_value``, ``changes`` holds its kwargs."""
+    pins = Pin.objects.in_bulk({change['pin_id'] for change in changes})
+
+    changed = {}
+    # In order, so the last valid change of a pin wins
+    for change in changes:
+        pin, value = pins.get(change['pin_id']), change['value']
+        if pin is None:
+            continue
+
+        # Same outcome as the check constraint failing a single change, an
+        # invalid one would roll back the whole batch
+        if is_valid_pin_value(value, pin.is_digital):
+            pin.value = value
+            changed[pin.pk] = pin
+        else:
+            logger.warning('Invalid value %r for pin %d', value, pin.pk)
+
+    Pin.bulk_save(list(changed.values()))
+
+
+@shared_task
+def apply_scene(scene_id: int) -> None:
+    assignments = SceneAssignment.objects.filter(
+        scene_id=scene_id,
+    ).select_related('pin')
+
+    pins = []
+    for assignment in assignments:
+        pin = assignment.pin
+        fits = (assignment.value in ('ON', 'OFF')) == pin.is_digital
+        # Pins whose type changed since the scene was saved are left as is
+        if fits and pin.value != assignment.value:
+            pin.value = assignment.value
+            pins.append(pin)
+
+    Pin.bulk_save(pins)
+
+
+@shared_task
+def prune_pin_history() -> int:
+    return history.prune()
+
+
+@shared_task
+def flush_board_presence() -> int:
+    return presence.flush()
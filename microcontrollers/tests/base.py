@@ -9,6 +9,11 @@ from ..serializers.periodic_behavior import CreatePeriodicPinBehaviorSerializer
 
 
 class BaseMicrocontrollerTest(ABC):
+    @pytest.fixture(autouse=True)
+    def shared_cache(self, settings):
+        # Tests run in one process, every part of it sees the same cache
+        settings.CACHE_SHARED = True
+
     @pytest.fixture
     def board_data(self, faker):
         def generate_data(**overwrite):
@@ -1,8 +1,30 @@
+import threading
+from concurrent.futures import Future
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from ..models import Board
+from cloudroom.mqtt.exceptions import BrokerRequestError
+from .. import provisioning, verification
+from ..models import Board, Pin
 from .base import BaseMicrocontrollerTest
 
 
+class SyncExecutor:
+    def __init__(self, workers) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        pass
+
+    def submit(self, func, *args) -> Future:
+        future = Future()
+        future.set_result(func(*args))
+        return future
+
+
 class TestBoards(BaseMicrocontrollerTest):
     def _list_url(self) -> str:
         return reverse('board-list')
@@ -19,6 +41,9 @@ class TestBoards(BaseMicrocontrollerTest):
     def _pins_url(self, pk: int) -> str:
         return reverse('board-pins', kwargs={'pk': pk})
 
+    def _bulk_url(self) -> str:
+        return reverse('board-bulk-create')
+
     def test_unauthenticated_access(self, client, board, board_data):
         list_url = self._list_url()
         detail_url = self._detail_url(pk=board[0].pk)
@@ -171,7 +196,72 @@ class TestBoards(BaseMicrocontrollerTest):
             {'secret': secret},
             content_type='application/json',
         )
-        assert resp.status_code == 204
+        assert resp.status_code == 200
+        assert resp.json()['expires_in'] > 0
+
+        resp = admin_client.post(
+            validate_secret_url,
+            {'token': resp.json()['token']},
+            content_type='application/json',
+        )
+        assert resp.status_code == 200
+
+    def test_validate_invalid_token(self, admin_client, board):
+        validate_secret_url = self._validate_secret_url(pk=board[0].pk)
+
+        resp = admin_client.post(
+            validate_secret_url,
+            {'token': 'invalid token'},
+            content_type='application/json',
+        )
+        assert resp.status_code == 400
+
+        resp = admin_client.post(
+            validate_secret_url,
+            {},
+            content_type='application/json',
+        )
+        assert resp.status_code == 400
+
+    def test_validate_token_after_secret_update(self, admin_client, board):
+        pk = board[0].pk
+        validate_secret_url = self._validate_secret_url(pk=pk)
+        resp = admin_client.post(
+            validate_secret_url,
+            {'secret': board[1]['secret']},
+            content_type='application/json',
+        )
+        token = resp.json()['token']
+
+        admin_client.patch(self._update_secret_url(pk=pk))
+
+        resp = admin_client.post(
+            validate_secret_url,
+            {'token': token},
+            content_type='application/json',
+        )
+        assert resp.status_code == 400
+
+    def test_validate_secret_with_saturated_pool(
+        self,
+        admin_client,
+        board,
+        monkeypatch,
+    ):
+        slots = threading.BoundedSemaphore(1)
+        slots.acquire()
+        monkeypatch.setattr(
+            verification,
+            '_get_executor',
+            lambda: (None, slots),
+        )
+
+        resp = admin_client.post(
+            self._validate_secret_url(pk=board[0].pk),
+            {'secret': board[1]['secret']},
+            content_type='application/json',
+        )
+        assert resp.status_code == 503
 
     def test_validate_old_secret(self, admin_client, board):
         pk = board[0].pk
@@ -195,3 +285,213 @@ class TestBoards(BaseMicrocontrollerTest):
         assert resp.status_code == 200
         data = resp.json()
         assert isinstance(data, list)
+
+    def _list_queries(self, admin_client, boards: int, pins: int) -> int:
+        # Not provisioned, only listed
+        created = Board.objects.bulk_create(
+            Board(name=f'budget-{boards}-{n}', secret='secret')
+            for n in range(boards)
+        )
+        Pin.objects.bulk_create(
+            Pin(board=board, name=f'pin-{n}', number=n, value='OFF')
+            for board in created
+            for n in range(pins)
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            resp = admin_client.get(self._list_url())
+        assert resp.status_code == 200
+
+        data = resp.json()['results'][0]
+        assert data['pins'] == [
+            'http://testserver' + reverse('pin-detail', kwargs={'pk': pk})
+            for pk in Pin.objects.filter(board_id=data['id'])
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        ]
+        return len(queries)
+
+    def test_list_query_budget(self, admin_client, db):
+        few = self._list_queries(admin_client, boards=1, pins=2)
+        many = self._list_queries(admin_client, boards=10, pins=20)
+
+        assert many == few
+
+    def test_board_payload_format(self, admin_client, board_data):
+        list_url = self._list_url()
+
+        resp = admin_client.post(
+            list_url,
+            board_data(payload_format=Board.PayloadFormat.BINARY.value),
+            content_type='application/json',
+        )
+        assert resp.status_code == 201
+
+        detail_url = self._detail_url(pk=resp.json()['id'])
+        resp = admin_client.get(detail_url)
+        assert resp.json()['payload_format'] == 'binary'
+
+        resp = admin_client.patch(
+            detail_url,
+            {'payload_format': 'xml'},
+            content_type='application/json',
+        )
+        assert resp.status_code == 400
+
+        resp = admin_client.delete(detail_url)
+        assert resp.status_code == 204
+
+    def test_bulk_create(self, admin_client, board_data):
+        boards = [
+            {'name': board_data()['name'], 'status': Board.Status.ACTIVATED}
+            for _ in range(3)
+        ]
+
+        resp = admin_client.post(
+            self._bulk_url(),
+            {'boards': boards},
+            content_type='application/json',
+        )
+        assert resp.status_code == 201
+
+        results = resp.json()['boards']
+        assert [r['name'] for r in results] == [b['name'] for b in boards]
+        for result in results:
+            created = Board.objects.get(pk=result['id'])
+            assert created.verify_secret(result['secret'])
+
+    def test_bulk_create_partial_failure(
+        self,
+        admin_client,
+        board,
+        board_data,
+        monkeypatch,
+    ):
+        provision = provisioning._provision
+        failing = board_data()['name']
+
+        def fake_provision(name, secret):
+            if name == failing:
+                raise BrokerRequestError(code=500, body={})
+
+            return provision(name, secret)
+
+        monkeypatch.setattr(provisioning, '_provision', fake_provision)
+
+        names = [failing, board[0].name, board_data()['name']]
+        resp = admin_client.post(
+            self._bulk_url(),
+            {'boards': [{'name': name} for name in names]},
+            content_type='application/json',
+        )
+        assert resp.status_code == 207
+
+        failed, existing, created = resp.json()['boards']
+        assert 'error' in failed and 'error' in existing
+        assert Board.objects.filter(pk=created['id']).exists()
+        assert not Board.objects.filter(name=failing).exists()
+
+    def test_conditional_get_after_bulk_create(
+        self,
+        admin_client,
+        board_data,
+        django_capture_on_commit_callbacks,
+    ):
+        resp = admin_client.get(self._list_url())
+        etag = resp['ETag']
+
+        with django_capture_on_commit_callbacks(execute=True):
+            resp = admin_client.post(
+                self._bulk_url(),
+                {'boards': [{'name': board_data()['name']}]},
+                content_type='application/json',
+            )
+        assert resp.status_code == 201
+
+        resp = admin_client.get(self._list_url(), HTTP_IF_NONE_MATCH=etag)
+        assert resp.status_code == 200
+        assert resp['ETag'] != etag
+
+    def test_bulk_create_name_taken_meanwhile(
+        self,
+        admin_client,
+        board_data,
+        monkeypatch,
+    ):
+        taken, free = board_data()['name'], board_data()['name']
+        deprovisioned = []
+        monkeypatch.setattr(provisioning, '_deprovision', deprovisioned.extend)
+
+        def fake_provision(name, secret):
+            if name == taken:
+                # Created by another request once the names were checked
+                Board.objects.bulk_create([Board(name=name, secret='x')])
+
+            return Board._hash_secret(secret)
+
+        monkeypatch.setattr(provisioning, '_provision', fake_provision)
+        # Provisioned in this thread, which holds the test transaction
+        monkeypatch.setattr(provisioning, 'ThreadPoolExecutor', SyncExecutor)
+
+        resp = admin_client.post(
+            self._bulk_url(),
+            {'boards': [{'name': taken}, {'name': free}]},
+            content_type='application/json',
+        )
+        assert resp.status_code == 207
+
+        failed, created = resp.json()['boards']
+        assert 'error' in failed
+        assert Board.objects.filter(pk=created['id'], name=free).exists()
+        # The broker user of the other board is left alone
+        assert deprovisioned == []
+
+    def test_bulk_create_repeated_names(self, admin_client, board_data):
+        name = board_data()['name']
+        resp = admin_client.post(
+            self._bulk_url(),
+            {'boards': [{'name': name}, {'name': name}]},
+            content_type='application/json',
+        )
+        assert resp.status_code == 400
+
+    def test_conditional_get(
+        self,
+        admin_client,
+        pin,
+        monkeypatch,
+        django_capture_on_commit_callbacks,
+    ):
+        monkeypatch.setattr(
+            'microcontrollers.notifications.notify_pin_change',
+            lambda **kwargs: None,
+        )
+        pin = pin[0]
+        url = self._pins_url(pin.board_id)
+
+        resp = admin_client.get(url)
+        assert resp.status_code == 200
+        etag = resp['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            resp = admin_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert resp.status_code == 304
+        assert not any(
+            'microcontrollers_pin' in query['sql']
+            for query in queries.captured_queries
+        )
+
+        with django_capture_on_commit_callbacks(execute=True):
+            pin.value = 'OFF'
+            pin.save()
+
+        resp = admin_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert resp.status_code == 200
+        assert resp['ETag'] != etag
+
+    def test_no_etag_without_shared_cache(self, admin_client, pin, settings):
+        settings.CACHE_SHARED = False
+
+        resp = admin_client.get(self._pins_url(pin[0].board_id))
+        assert resp.status_code == 200
+        assert 'ETag' not in resp
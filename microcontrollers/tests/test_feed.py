@@ -0,0 +1,59 @@
+import asyncio
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+from ..feed import SNAPSHOT, ChangeFeedHub, Subscription, snapshot
+from .base import BaseMicrocontrollerTest
+
+
+class TestFeed(BaseMicrocontrollerTest):
+    @pytest.fixture
+    def hub(self, monkeypatch, settings):
+        settings.PIN_CHANGE_FEED_BUFFER = 2
+        # No broker consumer, messages are dispatched by the tests
+        monkeypatch.setattr(ChangeFeedHub, '_consume', lambda self: None)
+        return ChangeFeedHub()
+
+    def test_slow_subscription_gets_snapshot(self):
+        async def run():
+            subscription = Subscription(asyncio.get_running_loop(), size=2)
+            subscription.put([{'number': n} for n in range(3)])
+            # Ignored until the snapshot is read
+            subscription.put([{'number': 3}])
+            assert await subscription.get() is SNAPSHOT
+
+            subscription.put([{'number': 4}])
+            assert await subscription.get() == {'number': 4}
+            return subscription.dropped
+
+        assert asyncio.run(run()) == 3
+
+    def test_slow_subscription_does_not_block_others(self, hub):
+        async def run():
+            slow, fast = hub.subscribe(), hub.subscribe()
+            received = []
+            for number in range(4):
+                hub.dispatch([{'number': number}])
+                # Lets the loop run the queued puts
+                await asyncio.sleep(0)
+                received.append(await fast.get())
+
+            hub.unsubscribe(slow)
+            hub.unsubscribe(fast)
+            return await slow.get(), received
+
+        first, received = asyncio.run(run())
+        assert first is SNAPSHOT
+        assert received == [{'number': n} for n in range(4)]
+
+    def test_snapshot(self, pin):
+        cache.clear()
+        pin = pin[0]
+
+        boards = snapshot()['boards']
+        assert [board['id'] for board in boards] == [pin.board_id]
+        assert boards[0]['pins'] == [pin.state]
+
+    def test_unauthenticated_access(self, client, db):
+        resp = client.get(reverse('pin-changes'))
+        assert resp.status_code == 403
@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta, timezone
+from django.urls import reverse
+from django.utils.timezone import now
+from ..history import bucket_start, prune, record_changes
+from ..models import Pin, PinHistory, PinRollup
+from .base import BaseMicrocontrollerTest
+
+
+class TestPinHistory(BaseMicrocontrollerTest):
+    def _history_url(pk: int) -> str:
+        return reverse('pin-history', kwargs={'pk': pk})
+
+    def test_record_value_changes(self, pin):
+        pin = pin[0]
+        pin.value = 'OFF' if pin.value == 'ON' else 'ON'
+        pin.save()
+        pin.description = 'Unchanged value'
+        pin.save()
+
+        values = PinHistory.objects.filter(pin=pin).order_by('recorded')
+        assert [sample.value for sample in values] == ['ON', pin.value]
+
+    def test_analog_rollup(self, pin_data):
+        data = pin_data(is_digital=False, value='10')
+        board_id = data.pop('board')
+        pin = Pin.objects.create(board_id=board_id, **data)
+        at = datetime(2030, 1, 1, 12, 30, tzinfo=timezone.utc)
+
+        for value in ['30', '20']:
+            pin.value = value
+            record_changes([pin], at=at)
+
+        rollup = PinRollup.objects.get(
+            pin=pin,
+            resolution=PinRollup.Resolution.MINUTE,
+            bucket=at,
+        )
+        assert rollup.samples == 2
+        assert (rollup.minimum, rollup.maximum) == (20, 30)
+        assert rollup.average == 25
+
+    def test_digital_on_time(self, pin):
+        pin = pin[0]
+        start = datetime(2030, 1, 1, 12, 0, 30, tzinfo=timezone.utc)
+        PinHistory.objects.filter(pin=pin).delete()
+
+        pin.value = 'ON'
+        record_changes([pin], at=start)
+        pin.value = 'OFF'
+        record_changes([pin], at=start + timedelta(seconds=90))
+
+        rollups = PinRollup.objects.filter(
+            pin=pin,
+            resolution=PinRollup.Resolution.MINUTE,
+            bucket__gte=bucket_start(start, PinRollup.Resolution.MINUTE),
+        ).order_by('bucket')
+        assert [r.on_seconds for r in rollups] == [30, 60]
+
+        hour = PinRollup.objects.get(
+            pin=pin,
+            resolution=PinRollup.Resolution.HOUR,
+            bucket=bucket_start(start, PinRollup.Resolution.HOUR),
+        )
+        assert hour.on_seconds == 90
+
+    def test_prune(self, pin):
+        pin = pin[0]
+        old = now() - timedelta(days=400)
+        record_changes([pin], at=old)
+        record_changes([pin], at=now())
+
+        assert prune() > 0
+        assert not PinHistory.objects.filter(recorded__lte=old).exists()
+        assert not PinRollup.objects.filter(bucket__lte=old).exists()
+        assert PinHistory.objects.filter(pin=pin).exists()
+
+    def test_history_resolution(self, admin_client, pin):
+        pin = pin[0]
+        url = TestPinHistory._history_url(pk=pin.pk)
+        end = now() + timedelta(minutes=1)
+
+        resp = admin_client.get(url, {
+            'start': (end - timedelta(hours=1)).isoformat(),
+            'end': end.isoformat(),
+        })
+        assert resp.status_code == 200
+        assert resp.json()['resolution'] == 'raw'
+        assert resp.json()['results'][0]['value'] == pin.value
+
+        resp = admin_client.get(url, {
+            'start': (end - timedelta(days=20)).isoformat(),
+            'end': end.isoformat(),
+        })
+        assert resp.json()['resolution'] == 'hour'
+        bucket = bucket_start(now(), PinRollup.Resolution.HOUR)
+        last = resp.json()['results'][-1]['bucket']
+        assert datetime.fromisoformat(last) == bucket
+
+    def test_history_invalid_range(self, admin_client, pin):
+        url = TestPinHistory._history_url(pk=pin[0].pk)
+        resp = admin_client.get(url, {
+            'start': now().isoformat(),
+            'end': (now() - timedelta(hours=1)).isoformat(),
+        })
+        assert resp.status_code == 400
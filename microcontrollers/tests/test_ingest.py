@@ -0,0 +1,176 @@
+import json
+import pytest
+from .. import presence
+from ..ingest import Ingestor, subscription_topic
+from ..management.commands.ingest import Command as IngestCommand
+from ..models import Board
+from ..verification import issue_session_token
+from .base import BaseMicrocontrollerTest
+
+
+class TestIngest(BaseMicrocontrollerTest):
+    def report(self, board: Board, pins: list[dict], token: str = '') -> bytes:
+        return json.dumps({
+            'token': token or issue_session_token(board),
+            'pins': pins,
+        }).encode()
+
+    def test_subscription_topic(self):
+        assert subscription_topic() == 'boards/+/reports'
+        assert subscription_topic('ingest') == '$share/ingest/boards/+/reports'
+
+    def test_group_client_keeps_its_session(self, monkeypatch):
+        monkeypatch.setattr('socket.gethostname', lambda: 'host')
+        command = IngestCommand()
+
+        client = command.make_client('ingest', 1)
+        assert client._client_id == b'ingest-ingest-host-1'
+        assert client._clean_session is False
+
+        assert command.make_client(None, 0)._clean_session is True
+
+    def test_store_report(self, pin):
+        pin = pin[0]
+        value = 'OFF' if pin.value == 'ON' else 'ON'
+        ingestor = Ingestor()
+
+        ingestor.handle(
+            f'boards/{pin.board.pk}/reports',
+            self.report(pin.board, [{'number': pin.number, 'value': value}]),
+        )
+        assert ingestor.flush() == 1
+
+        pin.refresh_from_db()
+        assert pin.reported_value == value
+        # The desired value is left as is
+        assert pin.value != value
+
+    def test_latest_report_wins(self, pin):
+        pin = pin[0]
+        ingestor = Ingestor()
+        topic = f'boards/{pin.board.pk}/reports'
+
+        for value in ['OFF', 'ON', 'OFF']:
+            pins = [{'number': pin.number, 'value': value}]
+            ingestor.handle(topic, self.report(pin.board, pins))
+        ingestor.flush()
+
+        pin.refresh_from_db()
+        assert pin.reported_value == 'OFF'
+
+    @pytest.mark.parametrize('payload', [b'not json', b'[]', b'{"pins": []}'])
+    def test_reject_malformed_report(self, pin, payload):
+        ingestor = Ingestor()
+        ingestor.handle(f'boards/{pin[0].board.pk}/reports', payload)
+        assert ingestor.stats()['rejected'] == 1
+
+    def test_reject_token_from_other_board(self, pin, board_data):
+        pin = pin[0]
+        other = Board.objects.create(**board_data())
+        ingestor = Ingestor()
+
+        ingestor.handle(
+            f'boards/{pin.board.pk}/reports',
+            self.report(other, [{'number': pin.number, 'value': 'OFF'}]),
+        )
+
+        assert ingestor.stats()['rejected'] == 1
+        assert ingestor.flush() == 0
+        other.delete()
+
+    def test_reject_token_after_secret_update(self, pin):
+        pin = pin[0]
+        token = issue_session_token(pin.board)
+        pin.board.update_secret('new secret')
+        ingestor = Ingestor()
+
+        ingestor.handle(
+            f'boards/{pin.board.pk}/reports',
+            self.report(pin.board, [{'number': pin.number, 'value': 'OFF'}],
+                        token=token),
+        )
+
+        assert ingestor.flush() == 0
+
+    def test_reject_deactivated_board(self, pin):
+        pin = pin[0]
+        pin.board.status = Board.Status.DEACTIVATED
+        pin.board.save()
+        ingestor = Ingestor()
+
+        ingestor.handle(
+            f'boards/{pin.board.pk}/reports',
+            self.report(pin.board, [{'number': pin.number, 'value': 'OFF'}]),
+        )
+
+        assert ingestor.flush() == 0
+
+    def test_reject_invalid_value(self, pin):
+        pin = pin[0]
+        ingestor = Ingestor()
+
+        ingestor.handle(
+            f'boards/{pin.board.pk}/reports',
+            self.report(pin.board, [{'number': pin.number, 'value': '512'}]),
+        )
+
+        assert ingestor.flush() == 0
+        assert ingestor.stats()['rejected'] == 1
+
+    @pytest.fixture
+    def scheduled(self, monkeypatch):
+        scheduled = set()
+        monkeypatch.setattr(
+            'microcontrollers.reconciliation.schedule',
+            scheduled.update,
+        )
+        return scheduled
+
+    def test_mismatched_report_is_reconciled(self, pin, scheduled):
+        pin = pin[0]
+        ingestor = Ingestor()
+        topic = f'boards/{pin.board.pk}/reports'
+
+        pins = [{'number': pin.number, 'value': pin.value}]
+        # Not in the presence table yet, as after a power loss
+        ingestor.handle(topic, self.report(pin.board, pins))
+        ingestor.flush()
+        assert scheduled == {pin.board.pk}
+
+        scheduled.clear()
+        ingestor.handle(topic, self.report(pin.board, pins))
+        ingestor.flush()
+        assert scheduled == set()
+
+        pins = [{'number': pin.number, 'value': 'OFF'}]
+        ingestor.handle(topic, self.report(pin.board, pins))
+        ingestor.flush()
+        assert scheduled == {pin.board.pk}
+
+    def test_reconnected_board_is_reconciled(self, pin, scheduled):
+        board = pin[0].board
+        ingestor = Ingestor()
+
+        ingestor.handle(f'boards/{board.pk}/status', b'offline')
+        ingestor.flush()
+        assert scheduled == set()
+
+        ingestor.handle(f'boards/{board.pk}/status', b'online')
+        ingestor.flush()
+        assert scheduled == {board.pk}
+
+    def test_report_of_offline_board_is_reconciled(self, pin, scheduled):
+        pin = pin[0]
+        ingestor = Ingestor()
+        topic = f'boards/{pin.board.pk}/reports'
+        pins = [{'number': pin.number, 'value': pin.value}]
+
+        presence.mark({pin.board.pk: False})
+        ingestor.handle(topic, self.report(pin.board, pins))
+        ingestor.flush()
+        assert scheduled == {pin.board.pk}
+
+        scheduled.clear()
+        ingestor.handle(topic, self.report(pin.board, pins))
+        ingestor.flush()
+        assert scheduled == set()
@@ -1,4 +1,9 @@
+import json
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls.base import reverse
+from django_celery_beat.models import CrontabSchedule, PeriodicTask
 from .base import BaseMicrocontrollerTest
 from ..models import PeriodicPinBehavior
 
@@ -91,3 +96,31 @@ class TestPeriodicBehavior(BaseMicrocontrollerTest):
         data = resp.json()
         assert isinstance(data, dict)
         assert data['id'] == pk
+
+    def _create_behaviors(self, pin, count: int) -> None:
+        for n in range(count):
+            task = PeriodicTask.objects.create(
+                name=f'behavior-{count}-{n}',
+                task='microcontrollers.tasks.change_pin_value',
+                kwargs=json.dumps({'pin_id': pin.pk, 'value': 'ON'}),
+                crontab=CrontabSchedule.objects.create(minute=str(n % 60)),
+            )
+            PeriodicPinBehavior.objects.create(pin=pin, task=task)
+
+    @pytest.mark.parametrize('url_name', ['list', 'pin'])
+    def test_list_query_count(self, admin_client, pin, url_name):
+        pin = pin[0]
+        url = self.list_url() if url_name == 'list' else reverse(
+            'pin-periodic-behaviors',
+            kwargs={'pk': pin.pk},
+        )
+
+        queries = []
+        for count in (1, 10):
+            self._create_behaviors(pin, count)
+            with CaptureQueriesContext(connection) as captured:
+                resp = admin_client.get(url)
+            assert resp.status_code == 200
+            queries.append(len(captured))
+
+        assert queries[0] == queries[1]
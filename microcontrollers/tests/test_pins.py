@@ -1,6 +1,8 @@
 import json
 import pytest
 from django.urls import reverse
+from .. import presence
+from ..models import Pin
 from .base import BaseMicrocontrollerTest
 
 
@@ -14,6 +16,10 @@ class TestPins(BaseMicrocontrollerTest):
     def _periodic_tasks_url(pk: int) -> str:
         return reverse('pin-periodic-behaviors', kwargs={'pk': pk})
 
+    @staticmethod
+    def _bulk_url() -> str:
+        return reverse('pin-bulk')
+
     def test_unauthenticated_access(self, client, pin, pin_data):
         list_url = TestPins._list_url()
         detail_url = TestPins._detail_url(pk=pin[0].pk)
@@ -389,3 +395,157 @@ class TestPins(BaseMicrocontrollerTest):
             content_type='application/json',
         )
         assert resp.status_code == 400
+
+    def test_bulk_update(
+        self,
+        admin_client,
+        monkeypatch,
+        django_capture_on_commit_callbacks,
+        pin,
+        pin_data,
+    ):
+        digital = pin[0]
+        data = pin_data(is_digital=False, value='10')
+        board = data.pop('board')
+        analog = Pin.objects.create(board_id=board, **data)
+
+        notified = []
+        monkeypatch.setattr(
+            'microcontrollers.notifications.notify_pins_change',
+            lambda board_id, pin_ids: notified.append((board_id, pin_ids)),
+        )
+
+        with django_capture_on_commit_callbacks(execute=True):
+            resp = admin_client.patch(
+                TestPins._bulk_url(),
+                {'pins': [
+                    {'id': digital.pk, 'value': 'OFF'},
+                    {'id': analog.pk, 'value': '512'},
+                ]},
+                content_type='application/json',
+            )
+        assert resp.status_code == 200
+        assert len(resp.json()['pins']) == 2
+
+        digital.refresh_from_db()
+        analog.refresh_from_db()
+        assert (digital.value, analog.value) == ('OFF', '512')
+        assert notified == [(board, [digital.pk, analog.pk])]
+
+    @pytest.mark.parametrize('change', [
+        {'value': 'ON'},
+        {'value': '512', 'is_digital': True},
+        {'value': '512', 'id': 0},
+    ])
+    def test_bulk_update_invalid_change(
+        self,
+        admin_client,
+        pin,
+        pin_data,
+        change,
+    ):
+        pin = pin[0]
+        value = pin.value
+        data = pin_data(is_digital=False, value='10')
+        analog = Pin.objects.create(board_id=data.pop('board'), **data)
+
+        resp = admin_client.patch(
+            TestPins._bulk_url(),
+            {'pins': [
+                {'id': pin.pk, 'value': 'OFF'},
+                {'id': analog.pk, **change},
+            ]},
+            content_type='application/json',
+        )
+        assert resp.status_code == 400
+
+        # Nothing is applied when a single change is invalid
+        pin.refresh_from_db()
+        assert pin.value == value
+
+    def test_bulk_update_same_pin_twice(self, admin_client, pin):
+        pin = pin[0]
+        resp = admin_client.patch(
+            TestPins._bulk_url(),
+            {'pins': [
+                {'id': pin.pk, 'value': 'OFF'},
+                {'id': pin.pk, 'value': 'ON'},
+            ]},
+            content_type='application/json',
+        )
+        assert resp.status_code == 400
+
+    def test_stale_pin_takes_next_version(self, pin):
+        pin = pin[0]
+        stale = Pin.objects.get(pk=pin.pk)
+
+        pin.value = 'OFF'
+        pin.save()
+        stale.value = 'ON'
+        stale.save()
+        assert stale.version == pin.version + 1
+
+        Pin.bulk_save([pin])
+        assert pin.version == stale.version + 1
+
+    def test_presence_keeps_pins_etag(self, admin_client, pin):
+        board = pin[0].board
+        resp = admin_client.get(TestPins._list_url())
+        etag = resp['ETag']
+
+        presence.mark({board.pk: True})
+        presence.flush()
+
+        resp = admin_client.get(TestPins._list_url(), HTTP_IF_NONE_MATCH=etag)
+        assert resp.status_code == 304
+
+    def test_cursor_pagination(self, admin_client, board, monkeypatch):
+        monkeypatch.setattr(
+            'cloudroom.pagination.CreatedCursorPagination.page_size',
+            2,
+        )
+        Pin.objects.bulk_create(
+            Pin(board=board[0], name=f'pin-{n}', number=n, value='OFF')
+            for n in range(5)
+        )
+
+        ids = []
+        url = TestPins._list_url() + '?pagination=cursor'
+        while url:
+            resp = admin_client.get(url)
+            assert resp.status_code == 200
+            data = resp.json()
+            # No count, it would scan the whole table
+            assert 'count' not in data
+            ids.extend(result['id'] for result in data['results'])
+            url = data['next']
+
+        expected = Pin.objects.order_by('-created', '-id')
+        assert ids == list(expected.values_list('id', flat=True))
+
+    def test_cursor_pagination_same_created(
+        self,
+        admin_client,
+        board,
+        monkeypatch,
+    ):
+        monkeypatch.setattr(
+            'cloudroom.pagination.CreatedCursorPagination.page_size',
+            2,
+        )
+        Pin.objects.bulk_create(
+            Pin(board=board[0], name=f'pin-{n}', number=n, value='OFF')
+            for n in range(5)
+        )
+        Pin.objects.update(created=Pin.objects.earliest('created').created)
+
+        ids = []
+        url = TestPins._list_url() + '?pagination=cursor'
+        while url:
+            resp = admin_client.get(url)
+            assert resp.status_code == 200
+            ids.extend(result['id'] for result in resp.json()['results'])
+            url = resp.json()['next']
+
+        expected = Pin.objects.order_by('-created', '-id')
+        assert ids == list(expected.values_list('id', flat=True))
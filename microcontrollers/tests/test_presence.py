@@ -0,0 +1,107 @@
+from datetime import timedelta
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils.timezone import now
+from .. import presence
+from ..ingest import Ingestor
+from ..tasks import notify_board
+from ..utils import build_topic
+from .base import BaseMicrocontrollerTest
+
+
+class TestPresence(BaseMicrocontrollerTest):
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.clear()
+        yield
+        cache.clear()
+
+    def test_mark_and_flush(self, board):
+        board = board[0]
+        assert not presence.is_online(board.pk)
+
+        presence.mark({board.pk: True})
+        assert presence.is_online(board.pk)
+        assert presence.flush() == 1
+
+        board.refresh_from_db()
+        assert board.last_seen is not None
+        # Nothing new since the last flush
+        assert presence.flush() == 0
+
+    def test_offline_status(self, board):
+        board = board[0]
+        ingestor = Ingestor()
+
+        ingestor.handle(f'boards/{board.pk}/status', b'online')
+        ingestor.flush()
+        assert presence.is_online(board.pk)
+
+        ingestor.handle(f'boards/{board.pk}/status', b'offline')
+        ingestor.flush()
+        assert not presence.is_online(board.pk)
+
+        ingestor.handle(f'boards/{board.pk}/status', b'sleeping')
+        assert ingestor.stats()['rejected'] == 1
+
+    def test_online_filter(self, admin_client, board, board_data):
+        board = board[0]
+        resp = admin_client.post(reverse('board-list'), data=board_data())
+        offline_id = resp.json()['id']
+        presence.mark({board.pk: True})
+        presence.flush()
+
+        resp = admin_client.get(reverse('board-list'), {'online': 'true'})
+        assert [b['id'] for b in resp.json()['results']] == [board.pk]
+
+        resp = admin_client.get(reverse('board-list'), {'online': 'false'})
+        assert board.pk not in [b['id'] for b in resp.json()['results']]
+        assert offline_id in [b['id'] for b in resp.json()['results']]
+
+    def test_flush_marked_boards_only(self, board, django_assert_num_queries):
+        board = board[0]
+        presence.mark({board.pk: True})
+        assert presence.flush() == 1
+
+        # Still online, but not marked again
+        with django_assert_num_queries(0):
+            assert presence.flush() == 0
+
+    def test_online_filter_offline_status(self, admin_client, board):
+        board = board[0]
+        presence.mark({board.pk: True})
+        presence.flush()
+        presence.mark({board.pk: False})
+
+        resp = admin_client.get(reverse('board-list'), {'online': 'true'})
+        assert resp.json()['results'] == []
+
+    def test_delivery_policy(self, settings, board):
+        board = board[0]
+
+        settings.BOARD_OFFLINE_POLICY = presence.PUBLISH
+        assert presence.delivery(board.pk, now()) == presence.PUBLISH
+
+        settings.BOARD_OFFLINE_POLICY = presence.SKIP
+        assert presence.delivery(board.pk, now()) == presence.SKIP
+
+        settings.BOARD_OFFLINE_POLICY = presence.DEFER
+        assert presence.delivery(board.pk, now()) == presence.DEFER
+        old = now() - timedelta(seconds=settings.BOARD_OFFLINE_DEFER_MAX + 1)
+        assert presence.delivery(board.pk, old) == presence.PUBLISH
+
+        presence.mark({board.pk: True})
+        assert presence.delivery(board.pk, now()) == presence.PUBLISH
+
+    def test_skip_offline_board(self, settings, monkeypatch, pin):
+        pin = pin[0]
+        settings.BOARD_OFFLINE_POLICY = presence.SKIP
+        published = []
+        monkeypatch.setattr(
+            'cloudroom.mqtt.Manager.publish',
+            lambda self, **kwargs: published.append(kwargs),
+        )
+
+        notify_board(topic=build_topic(board_id=pin.board.pk), pin_id=pin.pk)
+        assert published == []
@@ -0,0 +1,98 @@
+import json
+import pytest
+from django.urls import reverse
+from ..models import Pin, PeriodicSceneBehavior, Scene, SceneAssignment
+from ..tasks import apply_scene
+from .base import BaseMicrocontrollerTest
+
+
+class TestScenes(BaseMicrocontrollerTest):
+    def _list_url(self) -> str:
+        return reverse('scene-list')
+
+    def _periodic_behaviors_url(self, pk: int) -> str:
+        return reverse('scene-periodic-behaviors', kwargs={'pk': pk})
+
+    @pytest.fixture
+    def scene(self, db, pin, pin_data):
+        data = pin_data(is_digital=False, value='10')
+        analog = Pin.objects.create(board_id=data.pop('board'), **data)
+
+        scene = Scene.objects.create(name='Night')
+        SceneAssignment.objects.bulk_create([
+            SceneAssignment(scene=scene, pin=pin[0], value='OFF'),
+            SceneAssignment(scene=scene, pin=analog, value='0'),
+        ])
+        return scene
+
+    def test_unauthenticated_access(self, client):
+        resp = client.get(self._list_url())
+        assert resp.status_code == 403
+
+    def test_create_scene(self, admin_client, pin):
+        resp = admin_client.post(
+            self._list_url(),
+            {
+                'name': 'Away',
+                'assignments': [{'pin': pin[0].pk, 'value': 'OFF'}],
+            },
+            content_type='application/json',
+        )
+        assert resp.status_code == 201
+        assert resp.json()['assignments'] == [
+            {'pin': pin[0].pk, 'value': 'OFF'},
+        ]
+
+    @pytest.mark.parametrize('value', ['512', 'ABC'])
+    def test_create_scene_with_invalid_value(self, admin_client, pin, value):
+        resp = admin_client.post(
+            self._list_url(),
+            {
+                'name': 'Away',
+                'assignments': [{'pin': pin[0].pk, 'value': value}],
+            },
+            content_type='application/json',
+        )
+        assert resp.status_code == 400
+
+    def test_apply_scene(
+        self,
+        scene,
+        monkeypatch,
+        django_capture_on_commit_callbacks,
+    ):
+        notified = []
+        monkeypatch.setattr(
+            'microcontrollers.notifications.notify_pins_change',
+            lambda board_id, pin_ids: notified.append((board_id, pin_ids)),
+        )
+
+        with django_capture_on_commit_callbacks(execute=True):
+            apply_scene(scene_id=scene.pk)
+
+        for assignment in scene.assignments.select_related('pin'):
+            assert assignment.pin.value == assignment.value
+
+        # Both pins belong to the same board
+        assert len(notified) == 1
+        assert len(notified[0][1]) == 2
+
+    def test_schedule_scene(self, admin_client, scene):
+        resp = admin_client.post(
+            self._periodic_behaviors_url(pk=scene.pk),
+            {
+                'task': {
+                    'name': 'night',
+                    'task': 'microcontrollers.tasks.apply_scene',
+                    'kwargs': json.dumps({'scene_id': scene.pk}),
+                    'enabled': True,
+                    'crontab': {'hour': '23', 'minute': '0'},
+                },
+            },
+            content_type='application/json',
+        )
+        assert resp.status_code == 201
+        assert PeriodicSceneBehavior.objects.filter(scene=scene).exists()
+
+        resp = admin_client.get(self._periodic_behaviors_url(pk=scene.pk))
+        assert len(resp.json()) == 1
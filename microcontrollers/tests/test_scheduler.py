@@ -0,0 +1,145 @@
+import json
+from datetime import timedelta
+import pytest
+from django_celery_beat.models import CrontabSchedule, PeriodicTask
+from ..models import PeriodicPinBehavior, Pin
+from ..scheduler import BATCH_TASK, DELETE, UPSERT, BehaviorScheduler
+from .base import BaseMicrocontrollerTest
+
+
+class FakeApp:
+    def __init__(self) -> None:
+        self.sent = []
+
+    def send_task(self, name, args, kwargs):
+        self.sent.append((name, kwargs))
+
+
+class TestBehaviorScheduler(BaseMicrocontrollerTest):
+    @pytest.fixture
+    def scheduler(self, db):
+        return BehaviorScheduler(app=FakeApp())
+
+    def _key(self, behavior) -> tuple[str, int]:
+        return behavior._meta.model_name, behavior.pk
+
+    def test_fire_due_behaviors(self, scheduler, periodic_pin):
+        behavior = periodic_pin[0]
+        scheduler.load()
+        assert 0 <= scheduler.next_delay() <= 60
+
+        # Every crontab field defaults to "*", so it fires every minute
+        later = behavior.task.schedule.now() + timedelta(minutes=1)
+        scheduler.tick(now=later)
+        assert scheduler.app.sent == [
+            (
+                'microcontrollers.tasks.change_pin_value',
+                {'pin_id': behavior.pin.pk, 'value': 'ON'},
+            ),
+        ]
+        assert scheduler.stats()['fired'] == 1
+
+        # Rescheduled after the fire, not fired twice in the same minute
+        scheduler.tick(now=later)
+        assert len(scheduler.app.sent) == 1
+
+    def test_late_tick_fires_once(self, scheduler, periodic_pin):
+        behavior = periodic_pin[0]
+        scheduler.load()
+        due = scheduler._due[self._key(behavior)]
+
+        # Many runs were missed, only one is sent and the next is ahead
+        later = due + timedelta(minutes=10, seconds=30)
+        scheduler.tick(now=later)
+        scheduler.tick(now=later)
+        assert len(scheduler.app.sent) == 1
+        assert scheduler._due[self._key(behavior)] > later
+
+    def test_reload_keeps_pending_run(self, scheduler, periodic_pin):
+        behavior = periodic_pin[0]
+        kind, pk = self._key(behavior)
+        scheduler.load()
+
+        # Due right now, as when a reload follows the wait for the next run
+        entry = scheduler._entries[(kind, pk)]
+        due = entry.schedule.now().replace(second=0, microsecond=0)
+        scheduler._push(entry, due, due=due)
+
+        scheduler.load()
+        scheduler.apply({'kind': kind, 'id': pk, 'action': UPSERT})
+        assert scheduler._due[(kind, pk)] == due
+
+        scheduler.tick(now=due)
+        assert len(scheduler.app.sent) == 1
+
+    def test_incremental_changes(self, scheduler, periodic_pin):
+        behavior = periodic_pin[0]
+        kind, pk = self._key(behavior)
+        later = behavior.task.schedule.now() + timedelta(minutes=1)
+
+        scheduler.apply({'kind': kind, 'id': pk, 'action': UPSERT})
+        scheduler.apply({'kind': kind, 'id': pk, 'action': UPSERT})
+        scheduler.tick(now=later)
+        # The replaced heap item is skipped
+        assert len(scheduler.app.sent) == 1
+
+        scheduler.apply({'kind': kind, 'id': pk, 'action': DELETE})
+        scheduler.tick(now=later + timedelta(minutes=1))
+        assert len(scheduler.app.sent) == 1
+
+    def test_disabled_behavior_is_not_loaded(self, scheduler, periodic_pin):
+        task = periodic_pin[0].task
+        task.enabled = False
+        task.save()
+
+        scheduler.load()
+        scheduler.tick(now=task.schedule.now() + timedelta(minutes=1))
+        assert scheduler.app.sent == []
+
+    def _behaviors(self, board, count: int) -> None:
+        crontab = CrontabSchedule.objects.create()
+        for number in range(count):
+            pin = Pin.objects.create(
+                board=board,
+                name=f'pin-{number}',
+                number=number,
+                value='OFF',
+            )
+            task = PeriodicTask.objects.create(
+                name=f'toggle-{number}',
+                task='microcontrollers.tasks.change_pin_value',
+                kwargs=json.dumps({'pin_id': pin.pk, 'value': 'ON'}),
+                crontab=crontab,
+            )
+            PeriodicPinBehavior.objects.create(pin=pin, task=task)
+
+    def test_same_tick_changes_are_batched(self, scheduler, board, settings):
+        settings.BEHAVIOR_BATCH_SIZE = 2
+        self._behaviors(board[0], count=3)
+        scheduler.load()
+
+        scheduler.tick(now=max(scheduler._due.values()))
+
+        # A batch of two changes and the one left over
+        (batch, batch_kwargs), (single, _) = scheduler.app.sent
+        assert batch == BATCH_TASK
+        assert len(batch_kwargs['changes']) == 2
+        assert single == 'microcontrollers.tasks.change_pin_value'
+        assert scheduler.stats()['fired'] == 3
+        assert scheduler.stats()['messages'] == 2
+
+    def test_jitter_delays_without_drifting(self, scheduler, periodic_pin):
+        behavior = periodic_pin[0]
+        behavior.jitter = 30
+        behavior.save()
+
+        scheduler.load()
+        key = self._key(behavior)
+        due = scheduler._due[key]
+        fire_at = min(item[0] for item in scheduler._heap)
+        assert due <= fire_at <= due + timedelta(seconds=30)
+
+        scheduler.tick(now=due + timedelta(seconds=30))
+        assert len(scheduler.app.sent) == 1
+        # The next run follows the schedule, not the jittered fire time
+        assert scheduler._due[key] == due + timedelta(minutes=1)
@@ -3,8 +3,23 @@ import pytest
 import paho.mqtt.subscribe as subscribe
 from cloudroom.mqtt import Manager as MQTTManager
 from .base import BaseMicrocontrollerTest
+from .. import presence
+from ..models import Pin
 from ..utils import build_topic
-from ..tasks import notify_board, change_pin_value
+from ..notifications import (
+    PinChangeBuffer,
+    PublishedDigests,
+    notify_pins_change,
+    payload_format,
+)
+from ..tasks import (
+    notify_board,
+    change_pin_value,
+    change_pin_values,
+    flush_board_notifications,
+    publish_pin_state,
+    reconcile_board,
+)
 from ..serializers.pin import BasicPinInfoSerializer
 
 
@@ -18,6 +33,35 @@ class TestTasks(BaseMicrocontrollerTest):
 
         assert pin.value == value
 
+    def test_change_pin_values(self, pin):
+        pin = pin[0]
+        change_pin_values(changes=[
+            {'pin_id': pin.pk, 'value': 'OFF'},
+            # Not a digital value, skipped
+            {'pin_id': pin.pk, 'value': '512'},
+        ])
+
+        pin.refresh_from_db()
+
+        assert pin.value == 'OFF'
+
+    def test_change_pin_values_invalid_analog(self, pin, pin_data):
+        pin = pin[0]
+        data = pin_data(is_digital=False, value='10')
+        analog = Pin.objects.create(board_id=data.pop('board'), **data)
+
+        change_pin_values(changes=[
+            {'pin_id': pin.pk, 'value': 'OFF'},
+            # Not a number, the batch goes on without it
+            {'pin_id': analog.pk, 'value': 'abc'},
+        ])
+
+        pin.refresh_from_db()
+        analog.refresh_from_db()
+
+        assert pin.value == 'OFF'
+        assert analog.value == '10'
+
     @pytest.mark.timeout(10)
     def test_notify_board(self, pin):
         manager = MQTTManager()
@@ -41,3 +85,171 @@ class TestTasks(BaseMicrocontrollerTest):
 
         assert msg.topic == topic
         assert json.loads(msg.payload) == payload
+
+    def test_pin_change_buffer(self, pin):
+        pin = pin[0]
+        buffer = PinChangeBuffer(board_id=pin.board.pk)
+
+        assert buffer.push(pin_id=pin.pk)
+        assert not buffer.push(pin_id=pin.pk)
+
+        pin_ids, flushed = buffer.peek()
+        assert pin_ids == [pin.pk]
+        assert not buffer.commit(flushed)
+        assert buffer.peek()[0] == []
+
+    def test_pin_change_buffer_push_many(self, pin):
+        pin = pin[0]
+        buffer = PinChangeBuffer(board_id=pin.board.pk)
+        # Drop what other tests left in the buffer of this board
+        buffer.commit(buffer.peek()[1])
+
+        assert buffer.push_many([pin.pk, pin.pk + 1])
+        assert buffer.peek()[0] == [pin.pk, pin.pk + 1]
+
+    @pytest.mark.timeout(10)
+    def test_flush_board_notifications(self, pin):
+        manager = MQTTManager()
+
+        pin = pin[0]
+        topic = build_topic(board_id=pin.board.pk)
+        PinChangeBuffer(board_id=pin.board.pk).push(pin_id=pin.pk)
+
+        pin.value = 'OFF' if pin.value == 'ON' else 'ON'
+        pin.save()
+        flush_board_notifications(board_id=pin.board.pk)
+
+        msg = subscribe.simple(
+            topics=topic,
+            msg_count=1,
+            qos=1,
+            hostname=manager._hostname,
+            port=manager._port,
+            auth={
+                'username': manager._username,
+                'password': manager._password,
+            },
+        )
+
+        payload = {'pins': [BasicPinInfoSerializer(pin).data]}
+        assert json.loads(msg.payload) == payload
+
+    def test_notify_pins_change_without_window(self, pin, settings,
+                                               monkeypatch):
+        pin = pin[0]
+        sent = []
+        settings.BOARD_NOTIFICATION_WINDOW = 0
+        monkeypatch.setattr(
+            'microcontrollers.tasks.notify_board_pins.delay',
+            lambda **kwargs: sent.append(kwargs),
+        )
+
+        notify_pins_change(board_id=pin.board.pk, pin_ids=[pin.pk, pin.pk])
+
+        assert sent == [{'board_id': pin.board.pk, 'pin_ids': [pin.pk] * 2}]
+        assert PinChangeBuffer(board_id=pin.board.pk).peek()[0] == []
+
+    @pytest.mark.timeout(10)
+    def test_notify_board_skips_unchanged_state(self, pin):
+        pin = pin[0]
+        topic = build_topic(board_id=pin.board.pk)
+        suppressed = PublishedDigests.suppressed()
+
+        notify_board(topic=topic, pin_id=pin.pk)
+        notify_board(topic=topic, pin_id=pin.pk)
+        assert PublishedDigests.suppressed() == suppressed + 1
+
+        change_pin_value(
+            pin_id=pin.pk,
+            value='OFF' if pin.value == 'ON' else 'ON',
+        )
+        notify_board(topic=topic, pin_id=pin.pk)
+        assert PublishedDigests.suppressed() == suppressed + 1
+
+    @pytest.mark.timeout(10)
+    def test_publish_pin_state(self, pin, django_assert_num_queries):
+        manager = MQTTManager()
+
+        pin = pin[0]
+        topic = build_topic(board_id=pin.board.pk)
+        state = {**pin.state, 'version': pin.version + 1}
+        payload_format(pin.board.pk)
+
+        with django_assert_num_queries(0):
+            publish_pin_state(
+                board_id=pin.board.pk,
+                state=state,
+                changed=pin.updated.timestamp(),
+            )
+
+        msg = subscribe.simple(
+            topics=topic,
+            msg_count=1,
+            qos=1,
+            hostname=manager._hostname,
+            port=manager._port,
+            auth={
+                'username': manager._username,
+                'password': manager._password,
+            },
+        )
+        assert json.loads(msg.payload) == state
+
+    def test_late_state_is_dropped(self, pin):
+        pin = pin[0]
+        digests = PublishedDigests(board_id=pin.board.pk, codec='json')
+        newer = {**pin.state, 'value': 'OFF', 'version': pin.version + 2}
+        older = {**pin.state, 'value': 'ON', 'version': pin.version + 1}
+
+        digests.remember([newer])
+        assert digests.changed([older]) == []
+
+    def test_save_bumps_version(self, pin):
+        pin = pin[0]
+        version = pin.version
+
+        change_pin_value(pin_id=pin.pk, value=pin.value)
+        pin.refresh_from_db()
+        assert pin.version == version + 1
+
+    def test_reconcile_board(self, pin, pin_data, monkeypatch):
+        pin = pin[0]
+        data = pin_data(is_digital=False, value='10')
+        other = Pin.objects.create(board_id=data.pop('board'), **data)
+
+        published = []
+        monkeypatch.setattr(
+            MQTTManager,
+            'publish',
+            lambda self, topic, payload, codec: published.append(payload),
+        )
+        monkeypatch.setattr(presence, 'is_online', lambda board_id: True)
+
+        # Reported as desired, or never reported
+        other.reported_value = other.value
+        other.save()
+        assert reconcile_board(board_id=pin.board_id) == 0
+
+        Pin.objects.filter(pk=pin.pk).update(reported_value='OFF')
+        assert reconcile_board(board_id=pin.board_id) == 1
+
+        pin.refresh_from_db()
+        assert published == [{'pins': [pin.state]}]
+
+    def test_reconcile_board_without_shared_cache(
+        self,
+        pin,
+        monkeypatch,
+        settings,
+    ):
+        pin = pin[0]
+        settings.CACHE_SHARED = False
+        monkeypatch.setattr(
+            MQTTManager,
+            'publish',
+            lambda self, topic, payload, codec: None,
+        )
+
+        # Presence is unknown, the board is not taken for offline
+        Pin.objects.filter(pk=pin.pk).update(reported_value='OFF')
+        assert reconcile_board(board_id=pin.board_id) == 1
@@ -0,0 +1,113 @@
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+from .. import twin, versions
+from ..models import Pin
+from .base import BaseMicrocontrollerTest
+
+
+class TestTwin(BaseMicrocontrollerTest):
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.clear()
+        yield
+        cache.clear()
+
+    @pytest.fixture(autouse=True)
+    def skip_notifications(self, monkeypatch):
+        monkeypatch.setattr(
+            'microcontrollers.notifications.notify_pin_change',
+            lambda **kwargs: None,
+        )
+
+    def test_snapshot_rebuilt_on_miss(self, pin, django_assert_num_queries):
+        pin = pin[0]
+
+        with django_assert_num_queries(1):
+            snapshot = twin.snapshot(pin.board_id)
+        assert snapshot['pins'] == [pin.state]
+
+        with django_assert_num_queries(0):
+            assert twin.snapshot(pin.board_id) == snapshot
+
+    def test_save_updates_in_place(
+        self,
+        pin,
+        django_capture_on_commit_callbacks,
+        django_assert_num_queries,
+    ):
+        pin = pin[0]
+        version = twin.snapshot(pin.board_id)['version']
+
+        with django_capture_on_commit_callbacks(execute=True):
+            pin.value = 'OFF'
+            pin.save()
+
+        with django_assert_num_queries(0):
+            snapshot = twin.snapshot(pin.board_id)
+        assert snapshot['pins'] == [pin.state]
+        assert snapshot['version'] == version + 1
+
+    def test_late_state_is_dropped(self, pin):
+        pin = pin[0]
+        old = pin.state
+        twin.snapshot(pin.board_id)
+
+        newer = old | {'version': old['version'] + 1}
+        twin.update(pin.board_id, {pin.pk: newer})
+        twin.update(pin.board_id, {pin.pk: old})
+
+        state = twin.snapshot(pin.board_id)['pins'][0]
+        assert state['version'] == old['version'] + 1
+
+    def test_rebuild_keeps_newer_state(self, pin):
+        pin = pin[0]
+        newer = pin.state | {'version': pin.version + 1}
+        # Committed while the board had no snapshot
+        twin.update(pin.board_id, {pin.pk: newer})
+
+        assert twin.snapshot(pin.board_id)['pins'] == [newer]
+
+    def test_database_without_shared_cache(self, pin, settings):
+        pin = pin[0]
+        twin.snapshot(pin.board_id)
+        settings.CACHE_SHARED = False
+
+        # As a worker would, its process not sharing the cache of the API
+        Pin.objects.filter(pk=pin.pk).update(value='OFF')
+
+        state = twin.snapshot(pin.board_id)['pins'][0]
+        assert state['value'] == 'OFF'
+
+    def test_new_pin_rebuilds(
+        self,
+        pin,
+        pin_data,
+        django_capture_on_commit_callbacks,
+    ):
+        board_id = pin[0].board_id
+        twin.snapshot(board_id)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            data = pin_data(is_digital=False, value='10')
+            Pin.objects.create(board_id=data.pop('board'), **data)
+
+        assert len(twin.snapshot(board_id)['pins']) == 2
+
+    def test_fleet_state(self, admin_client, pin):
+        pin = pin[0]
+
+        resp = admin_client.get(reverse('board-fleet-state'))
+        assert resp.status_code == 200
+        assert resp.json()['results'] == [
+            {
+                'id': pin.board_id,
+                'version': versions.read(pin.board_id),
+                'pins': [pin.state],
+            },
+        ]
+
+        resp = admin_client.get(
+            reverse('board-pins', kwargs={'pk': pin.board_id}),
+        )
+        assert resp.json() == [pin.state]
@@ -0,0 +1,154 @@
+from collections import defaultdict
+from typing import Iterable
+from django.conf import settings
+from django.core.cache import cache
+from . import versions
+from .models import Pin
+
+
+def _board_key(board_id: int) -> str:
+    return f'twin:board:{board_id}'
+
+
+def _pin_key(pin_id: int) -> str:
+    return f'twin:pin:{pin_id}'
+
+
+def _merge(states: dict[int, dict]) -> dict[int, dict]:
+    """Store the pin states newer than the cached ones, return the newest.
+
+    States are written after the commit, so one arriving late must not
+    overwrite a newer one. This is best-effort: the read and the write are
+    not one atomic step, two commits of a pin stored at the same time may
+    leave the older state until the pin changes again or its entry expires.
+    Boards and feed clients compare the versions themselves.
+    """
+    keys = {pin_id: _pin_key(pin_id) for pin_id in states}
+    cached = cache.get_many(keys.values())
+
+    newest = {}
+    for pin_id, state in states.items():
+        current = cached.get(keys[pin_id])
+        if current and current['version'] > state['version']:
+            newest[pin_id] = current
+        else:
+            newest[pin_id] = state
+
+    cache.set_many(
+        {
+            keys[pin_id]: state
+            for pin_id, state in newest.items()
+            if state is states[pin_id]
+        },
+        timeout=settings.BOARD_TWIN_TIMEOUT,
+    )
+    return newest
+
+
+def update(board_id: int, states: dict[int, dict]) -> None:
+    """Write the committed states of some pins of a board, by pin id.
+
+    States are stored even when the board has no snapshot yet: one being
+    rebuilt from a read taken before the commit keeps them, as the newest.
+    """
+    if states and settings.CACHE_SHARED:
+        _merge(states)
+
+
+def update_pins(pins: Iterable[Pin]) -> None:
+    boards = defaultdict(dict)
+    for pin in pins:
+        boards[pin.board_id][pin.pk] = pin.state
+
+    for board_id, states in boards.items():
+        update(board_id, states)
+
+
+def forget(board_id: int) -> None:
+    """Drop the pin list of a board, after a pin is created or deleted."""
+    cache.delete(_board_key(board_id))
+
+
+def _read(board_ids: list[int]) -> dict[int, dict[int, dict]]:
+    """States of the pins of each board, by pin id, from the database."""
+    pins = {board_id: {} for board_id in board_ids}
+    queryset = Pin.objects.filter(board_id__in=board_ids).order_by('number')
+    for pin in queryset:
+        pins[pin.board_id][pin.pk] = pin.state
+
+    return pins
+
+
+def _rebuild(
+    board_ids: list[int],
+    board_versions: dict[int, int],
+) -> dict[int, dict]:
+    pins = _read(board_ids)
+    newest = _merge({
+        pin_id: state
+        for states in pins.values()
+        for pin_id, state in states.items()
+    })
+    cache.set_many(
+        {
+            _board_key(board_id): list(states)
+            for board_id, states in pins.items()
+        },
+        timeout=settings.BOARD_TWIN_TIMEOUT,
+    )
+
+    return {
+        board_id: {
+            'version': board_versions[board_id],
+            'pins': [newest[pin_id] for pin_id in states],
+        }
+        for board_id, states in pins.items()
+    }
+
+
+def snapshots(board_ids: Iterable[int]) -> dict[int, dict]:
+    """Desired state of the pins of each board, with the board version.
+
+    Read from the cache in three round trips; the boards missing from it are
+    rebuilt with one query. Without a shared cache, the workers changing pins
+    could not update it, so every read goes to the database.
+    """
+    board_ids = list(board_ids)
+    board_versions = versions.read_many(board_ids)
+    if not settings.CACHE_SHARED:
+        return {
+            board_id: {
+                'version': board_versions[board_id],
+                'pins': list(states.values()),
+            }
+            for board_id, states in _read(board_ids).items()
+        }
+
+    indexes = cache.get_many([_board_key(pk) for pk in board_ids])
+    found = cache.get_many([
+        _pin_key(pin_id)
+        for pin_ids in indexes.values()
+        for pin_id in pin_ids
+    ])
+
+    result, missing = {}, []
+    for board_id in board_ids:
+        pin_ids = indexes.get(_board_key(board_id))
+        keys = [_pin_key(pin_id) for pin_id in pin_ids or ()]
+        if pin_ids is None or any(key not in found for key in keys):
+            missing.append(board_id)
+            continue
+
+        result[board_id] = {
+            'version': board_versions[board_id],
+            'pins': [found[key] for key in keys],
+        }
+
+    if missing:
+        result |= _rebuild(missing, board_versions)
+
+    return result
+
+
+def snapshot(board_id: int) -> dict:
+    return snapshots([board_id])[board_id]
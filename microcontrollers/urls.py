@@ -1,14 +1,18 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import streams, views
 
 
 router = DefaultRouter()
 router.register(r'boards', views.BoardViewSet)
 router.register(r'pins', views.PinViewSet)
 router.register(r'periodic-pins', views.PeriodicPins)
+router.register(r'scenes', views.SceneViewSet)
+router.register(r'periodic-scenes', views.PeriodicScenes)
 
 
 urlpatterns = [
+    # Before the router, which would take "changes" for a pin id
+    path('pins/changes/', streams.pin_changes, name='pin-changes'),
     path('', include(router.urls)),
 ]
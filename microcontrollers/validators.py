@@ -1,4 +1,5 @@
 import re
+from typing import Any
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
 
@@ -10,3 +11,19 @@ def validate_pin_value(value):
             raise ValidationError(_('Pin value must be between 0 and 1023'))
     elif not re.search(r'^ON|OFF$', value):
         raise ValidationError(_('Pin value must be ON or OFF'))
+
+
+def is_valid_pin_value(value: Any, is_digital: bool) -> bool:
+    """Whether a pin of this type takes the value, as its check constraint."""
+    if not isinstance(value, str):
+        return False
+
+    if is_digital:
+        return value in ('ON', 'OFF')
+
+    try:
+        validate_pin_value(value)
+    except ValidationError:
+        return False
+
+    return re.fullmatch(r'\d{1,4}', value) is not None
@@ -0,0 +1,113 @@
+import os
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from hashlib import blake2b
+from typing import Optional
+from argon2 import PasswordHasher
+from argon2.exceptions import VerifyMismatchError
+from django.conf import settings
+from django.core import signing
+from .exceptions import VerificationPoolFull
+
+
+SESSION_TOKEN_SALT = 'microcontrollers.device-session'
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_slots: Optional[threading.BoundedSemaphore] = None
+_executor_lock = threading.Lock()
+
+
+def _verify(hash: str, secret: str) -> tuple[bool, bool]:
+    ph = PasswordHasher()
+    try:
+        ph.verify(hash, secret)
+    except VerifyMismatchError:
+        return False, False
+
+    return True, ph.check_needs_rehash(hash)
+
+
+def _get_executor() -> tuple[ProcessPoolExecutor, threading.BoundedSemaphore]:
+    global _executor, _executor_pid, _slots
+
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            workers = settings.SECRET_VERIFICATION_WORKERS
+            _executor = ProcessPoolExecutor(max_workers=workers)
+            _executor_pid = os.getpid()
+            _slots = threading.BoundedSemaphore(
+                workers + settings.SECRET_VERIFICATION_QUEUE_DEPTH,
+            )
+
+        return _executor, _slots
+
+
+def verify_secret(hash: str, secret: str) -> tuple[bool, bool]:
+    """Check a secret against its argon2 hash in the verification pool.
+
+    Returns whether it matches and whether the hash needs to be rehashed.
+    Raises ``VerificationPoolFull`` right away instead of queueing when every
+    worker is busy and the queue is at its configured depth.
+    """
+    executor, slots = _get_executor()
+    if not slots.acquire(blocking=False):
+        raise VerificationPoolFull
+
+    try:
+        future = executor.submit(_verify, hash, secret)
+    except BaseException:
+        slots.release()
+        raise
+
+    # Held until the job ends, a timed out one still occupies its worker
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return future.result(timeout=settings.SECRET_VERIFICATION_TIMEOUT)
+    except TimeoutError as e:
+        raise VerificationPoolFull from e
+
+
+def fingerprint(hash: str) -> str:
+    # Changes with the secret, so rotating it revokes the open sessions
+    return blake2b(hash.encode(), digest_size=8).hexdigest()
+
+
+def issue_session_token(board) -> str:
+    return signing.dumps(
+        {
+            'board': board.pk,
+            'key': fingerprint(board.secret),
+            'issued': int(time.time()),
+        },
+        salt=SESSION_TOKEN_SALT,
+        compress=True,
+    )
+
+
+def read_session_token(token: str) -> Optional[dict]:
+    """Return the token payload, ``None`` if it is forged or expired."""
+    try:
+        return signing.loads(
+            token,
+            salt=SESSION_TOKEN_SALT,
+            max_age=settings.DEVICE_SESSION_TTL,
+        )
+    except signing.BadSignature:
+        return None
+
+
+def check_session_token(board, token: str) -> bool:
+    payload = read_session_token(token)
+    return (
+        payload is not None and
+        payload['board'] == board.pk and
+        payload['key'] == fingerprint(board.secret)
+    )
+
+
+def session_expires_in(token: str) -> int:
+    payload = read_session_token(token) or {'issued': 0}
+    expiration = payload['issued'] + settings.DEVICE_SESSION_TTL
+    return max(int(expiration - time.time()), 0)
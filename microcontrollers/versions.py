@@ -0,0 +1,66 @@
+import time
+from typing import Iterable, Optional, Union
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import quote_etag
+
+
+# Scope of the lists spanning every board
+FLEET = 'fleet'
+# Scope of the pins of every board, left alone by board-only changes such as
+# presence
+PINS = 'pins'
+
+Scope = Union[int, str]
+
+
+def _key(scope: Scope) -> str:
+    return f'versions:{scope}'
+
+
+def _initial() -> int:
+    # Seeded with the clock, so a counter lost with the cache restarts
+    # above every value it had before
+    return time.time_ns()
+
+
+def bump(board_ids: Iterable[int], pins: bool = False) -> None:
+    """Change the version of the boards, and of the fleet, after a commit.
+
+    ``pins`` tells that pins of these boards changed too.
+    """
+    board_ids = list(board_ids)
+    if not board_ids:
+        return
+
+    for scope in [*board_ids, FLEET, *([PINS] if pins else [])]:
+        try:
+            cache.incr(_key(scope))
+        except ValueError:
+            cache.add(_key(scope), _initial(), timeout=None)
+
+
+def read_many(scopes: Iterable[Scope]) -> dict[Scope, int]:
+    scopes = list(scopes)
+    found = cache.get_many([_key(scope) for scope in scopes])
+
+    missing = [scope for scope in scopes if _key(scope) not in found]
+    if missing:
+        for scope in missing:
+            cache.add(_key(scope), _initial(), timeout=None)
+        found |= cache.get_many([_key(scope) for scope in missing])
+
+    return {scope: found[_key(scope)] for scope in scopes}
+
+
+def read(scope: Scope) -> int:
+    """Version of a board, or of the fleet, with one cache lookup."""
+    return read_many([scope])[scope]
+
+
+def etag(scope: Scope) -> Optional[str]:
+    """ETag of a scope, ``None`` unless every process shares the cache."""
+    if not settings.CACHE_SHARED:
+        return None
+
+    return quote_etag(f'{scope}-{read(scope)}')
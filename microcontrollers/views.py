@@ -1,3 +1,8 @@
+from datetime import timedelta
+from typing import Optional
+from django.conf import settings
+from django.db.models import Prefetch
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.viewsets import ModelViewSet, GenericViewSet
 from rest_framework.mixins import (
@@ -8,24 +13,90 @@ from rest_framework.mixins import (
 )
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from cloudroom.decorators import conditional
 from cloudroom.mqtt.exceptions import BrokerRequestError
-from .serializers import board, pin, periodic_behavior
+from cloudroom.pagination import SelectablePaginationMixin
+from .serializers import board, pin, periodic_behavior, history, scene
+from . import presence, twin, versions
+from .history import RAW, read_history
 from .exceptions import BrokerConnectionError
-from .models import Board, Pin, PeriodicPinBehavior
+from .models import (
+    Board,
+    Pin,
+    PeriodicPinBehavior,
+    PeriodicSceneBehavior,
+    Scene,
+)
+from .tasks import apply_scene
+
+
+def _board_etag(view, request, pk, **kwargs) -> Optional[str]:
+    try:
+        return versions.etag(int(pk))
+    except ValueError:
+        return None
+
+
+def _fleet_etag(view, request, *args, **kwargs) -> Optional[str]:
+    # Presence is kept apart from the versions
+    if 'online' in request.query_params:
+        return None
 
+    return versions.etag(versions.FLEET)
 
-class BoardViewSet(ModelViewSet):
+
+def _pins_etag(view, request, *args, **kwargs) -> Optional[str]:
+    return versions.etag(versions.PINS)
+
+
+class BoardViewSet(SelectablePaginationMixin, ModelViewSet):
     queryset = Board.objects.all().order_by('-created')
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            # Only the primary keys are needed to link the pins
+            queryset = queryset.prefetch_related(Prefetch(
+                'pin_set',
+                queryset=Pin.objects.only('pk', 'board').order_by('pk'),
+            ))
+
+        online = self.request.query_params.get('online')
+        if self.action != 'list' or online not in ('true', 'false'):
+            return queryset
+
+        # Only the boards seen lately, as of the last presence flush, may be
+        # online; the presence table tells which of them still are
+        seen = timezone.now() - timedelta(
+            seconds=settings.BOARD_PRESENCE_TIMEOUT +
+            settings.BOARD_PRESENCE_FLUSH_INTERVAL,
+        )
+        board_ids = presence.online(
+            queryset.filter(last_seen__gte=seen).values_list('pk', flat=True),
+        )
+        if online == 'true':
+            return queryset.filter(pk__in=board_ids)
+
+        return queryset.exclude(pk__in=board_ids)
+
     def get_serializer_class(self):
         return {
             'update': board.UpdateBoardSerializer,
             'partial_update': board.UpdateBoardSerializer,
             'create': board.CreateBoardSerializer,
+            'bulk_create': board.BulkCreateBoardSerializer,
             'validate_secret': board.SecretValidationSerializer,
             'generate_new_secret': board.UpdateSecretSerializer,
         }.get(self.action) or board.BoardSerializer
 
+    @conditional(_fleet_etag)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional(_board_etag)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def create(self, request):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -38,6 +109,17 @@ class BoardViewSet(ModelViewSet):
         except BrokerRequestError as e:  # pragma: no cover
             raise BrokerConnectionError from e
 
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk_create(self, request):
+        serializer = board.BulkCreateBoardSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        # Each board reports its own outcome when only some of them failed
+        code = status.HTTP_207_MULTI_STATUS \
+            if serializer.failed else status.HTTP_201_CREATED
+        return Response(serializer.data, status=code)
+
     @action(methods=['POST'], detail=True, url_path='validate-secret')
     def validate_secret(self, request, pk):
         serializer = board.SecretValidationSerializer(
@@ -45,8 +127,8 @@ class BoardViewSet(ModelViewSet):
             data=request.data,
         )
         serializer.is_valid(raise_exception=True)
-
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        presence.mark({serializer.instance.pk: True})
+        return Response(serializer.session)
 
     @action(methods=['PATCH'], detail=True, url_path='generate-new-secret')
     def generate_new_secret(self, request, pk):
@@ -60,30 +142,59 @@ class BoardViewSet(ModelViewSet):
         return Response({'secret': serializer.secret})
 
     @action(methods=['GET'], detail=True)
+    @conditional(_board_etag)
     def pins(self, request, pk):
-        serializer = pin.BasicPinInfoSerializer(
-            self.get_object().pin_set.all(),
-            many=True,
+        return Response(twin.snapshot(self.get_object().pk)['pins'])
+
+    @action(methods=['GET'], detail=False, url_path='fleet-state')
+    @conditional(_fleet_etag)
+    def fleet_state(self, request):
+        boards = self.paginate_queryset(
+            self.get_queryset().only('pk', 'created'),
         )
-        return Response(serializer.data)
+        snapshots = twin.snapshots(instance.pk for instance in boards)
+        return self.get_paginated_response([
+            {'id': instance.pk} | snapshots[instance.pk]
+            for instance in boards
+        ])
 
 
-class PinViewSet(ModelViewSet):
+class PinViewSet(SelectablePaginationMixin, ModelViewSet):
     queryset = Pin.objects.all().order_by('-created')
 
     def get_serializer_class(self):
         return {
             'update': pin.UpdatePinSerializer,
             'partial_update': pin.UpdatePinSerializer,
+            'bulk': pin.BulkPinUpdateSerializer,
             'periodic_behaviors':
                 periodic_behavior.PeriodicPinBehaviorSerializer,
             'create_behavior':
                 periodic_behavior.CreateWithoutShowingPinFieldSerializer,
         }.get(self.action) or pin.PinSerializer
 
+    # The board of a pin is not known without reading it, so the pins share
+    # the version of all the pins
+    @conditional(_pins_etag)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional(_pins_etag)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(methods=['PATCH'], detail=False)
+    def bulk(self, request):
+        serializer = pin.BulkPinUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
+
     @action(methods=['GET'], detail=True, url_path='periodic-behaviors')
     def periodic_behaviors(self, request, pk):
-        data = self.get_object().periodicpinbehavior_set.all()
+        data = self.get_object().periodicpinbehavior_set.select_related(
+            'task__crontab',
+        )
         serializer = periodic_behavior.PeriodicPinBehaviorSerializer(
             data,
             many=True,
@@ -101,17 +212,91 @@ class PinViewSet(ModelViewSet):
         serializer.save(pin=self.get_object())
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(methods=['GET'], detail=True)
+    def history(self, request, pk):
+        query = history.HistoryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        resolution, samples = read_history(
+            pin=self.get_object(),
+            **query.validated_data,
+        )
+        serializer_class = history.PinHistorySerializer \
+            if resolution == RAW else history.PinRollupSerializer
+        return Response({
+            'resolution': resolution,
+            'results': serializer_class(samples, many=True).data,
+        })
+
 
 class PeriodicPins(
+    SelectablePaginationMixin,
     GenericViewSet,
     ListModelMixin,
     CreateModelMixin,
     RetrieveModelMixin,
     DestroyModelMixin,
 ):
-    queryset = PeriodicPinBehavior.objects.all().order_by('-created')
+    # The task and its crontab are nested in every serialized behavior
+    queryset = PeriodicPinBehavior.objects.select_related(
+        'task__crontab',
+    ).order_by('-created')
 
     def get_serializer_class(self):
         return {
             'create': periodic_behavior.CreatePeriodicPinBehaviorSerializer,
         }.get(self.action) or periodic_behavior.PeriodicPinBehaviorSerializer
+
+
+class SceneViewSet(ModelViewSet):
+    queryset = Scene.objects.all().order_by('-created')
+
+    def get_serializer_class(self):
+        return {
+            'periodic_behaviors': scene.PeriodicSceneBehaviorSerializer,
+            'create_behavior': scene.CreateWithoutShowingSceneFieldSerializer,
+        }.get(self.action) or scene.SceneSerializer
+
+    @action(methods=['POST'], detail=True)
+    def apply(self, request, pk):
+        apply_scene.delay(scene_id=self.get_object().pk)
+        return Response(status=status.HTTP_202_ACCEPTED)
+
+    @action(methods=['GET'], detail=True, url_path='periodic-behaviors')
+    def periodic_behaviors(self, request, pk):
+        data = self.get_object().periodicscenebehavior_set.select_related(
+            'task__crontab',
+        )
+        serializer = scene.PeriodicSceneBehaviorSerializer(
+            data,
+            many=True,
+            context={'request': request},
+        )
+        return Response(serializer.data)
+
+    @periodic_behaviors.mapping.post
+    def create_behavior(self, request, pk):
+        serializer = scene.CreateWithoutShowingSceneFieldSerializer(
+            data=request.data,
+            context={'request': request},
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save(scene=self.get_object())
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class PeriodicScenes(
+    GenericViewSet,
+    ListModelMixin,
+    CreateModelMixin,
+    RetrieveModelMixin,
+    DestroyModelMixin,
+):
+    queryset = PeriodicSceneBehavior.objects.select_related(
+        'task__crontab',
+    ).order_by('-created')
+
+    def get_serializer_class(self):
+        return {
+            'create': scene.CreatePeriodicSceneBehaviorSerializer,
+        }.get(self.action) or scene.PeriodicSceneBehaviorSerializer